@@ -1,13 +1,42 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, g, jsonify, make_response, redirect, Response, stream_with_context
 from flask_cors import CORS
-from models import db, Submission
+from models import db, Submission, SubmissionReceipt, IdempotencyKey
 from auth import auth_bp, jwt_required, get_current_user
+from listing import parse_listing_args, run_listing, ListingError
+from search import install_search_index
+from export import EXPORT_FORMATS, generate_export
+from rollups import record_submissions, get_stats
+from counters import SearchCountCache, GenerationCache, seed_counters, increment_total, listing_etag
+from ingest import IngestRequest, SubmissionRejected, save_upload
+from blobs import store_blobs, reference_blobs
+from storage import STORAGE_BACKENDS, create_storage, get_storage
+from thumbnails import ThumbnailWorker
+from downloads import OFFLOAD_MODES, send_upload
+from variants import VariantCache, VariantError, RENDER_ERRORS, parse_variant
+from staticfiles import StaticAssets
+from zipindex import ZipMemberError, get_manifest, read_manifest, find_member, open_member
+from bulk import parse_manifest, create_submissions
+from resumable import resumable_bp, claim_upload, UploadReaper
+from directupload import direct_bp, claim_direct_upload
+from writebehind import SubmissionQueue, SubmissionWriter, queue_payload
+from idempotency import (
+    IDEMPOTENCY_HEADER, SubmissionReplayed, idempotency_key, request_fingerprint, find_response, record_response
+)
+from validation import (
+    SubmissionError, SubmissionPrecheck, validate_fields, validate_file, additional_screenshot_extension
+)
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import NotFound
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.exc import IntegrityError
 import os
+import re
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
-from sqlalchemy import or_
 import sys
 
 # Set up logging to see errors
@@ -19,6 +48,8 @@ load_dotenv()
 
 def create_app():
     app = Flask(__name__)
+    # Stream uploaded file parts straight into the upload folder while hashing them
+    app.request_class = IngestRequest
     
     try:
         # Configuration
@@ -59,6 +90,74 @@ def create_app():
         # Use absolute path for upload folder
         app.config['UPLOAD_FOLDER'] = os.path.abspath(os.path.join(backend_dir, upload_folder_name))
         app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size (increased for project files)
+        # Seconds a cached listing count for a search string is reused
+        app.config['SEARCH_COUNT_TTL'] = int(os.environ.get('SEARCH_COUNT_TTL', '30'))
+        # Seconds a worker trusts its cached submissions generation for ETag checks
+        app.config['GENERATION_TTL'] = float(os.environ.get('GENERATION_TTL', '1'))
+        # Background threads generating screenshot thumbnails (0 disables them)
+        app.config['THUMBNAIL_WORKERS'] = int(os.environ.get('THUMBNAIL_WORKERS', '2'))
+        # Threads syncing and moving the files of a submission into place. This only
+        # pays off where fsync is slow (network volumes, spinning disks); on local
+        # SSDs bench_uploads.py measures no difference from 1
+        app.config['UPLOAD_WORKERS'] = int(os.environ.get('UPLOAD_WORKERS', '4'))
+        # fsync stored uploads (and the upload folder) before the submission commits
+        app.config['UPLOAD_FSYNC'] = os.environ.get('UPLOAD_FSYNC', 'true').lower() == 'true'
+        # Resumable project uploads: largest accepted zip, advertised chunk size
+        # and hours an unsubmitted upload is kept
+        app.config['RESUMABLE_MAX_SIZE'] = int(os.environ.get('RESUMABLE_MAX_SIZE', str(500 * 1024 * 1024)))
+        app.config['RESUMABLE_CHUNK_SIZE'] = int(os.environ.get('RESUMABLE_CHUNK_SIZE', str(5 * 1024 * 1024)))
+        app.config['RESUMABLE_TTL'] = float(os.environ.get('RESUMABLE_TTL', '24'))
+        # Bounds on the disk unauthenticated resumable uploads can claim: open
+        # uploads per client address and bytes declared by all open uploads
+        app.config['RESUMABLE_MAX_PER_CLIENT'] = int(os.environ.get('RESUMABLE_MAX_PER_CLIENT', '3'))
+        app.config['RESUMABLE_MAX_PENDING'] = int(os.environ.get('RESUMABLE_MAX_PENDING', str(5 * 1024 * 1024 * 1024)))
+        # Seconds between sweeps for expired resumable uploads (0 disables the thread)
+        app.config['RESUMABLE_EXPIRY_INTERVAL'] = float(os.environ.get('RESUMABLE_EXPIRY_INTERVAL', '600'))
+        # Write-behind submissions: queue file, largest group commit and seconds
+        # the writer waits for the rest of a burst before committing
+        app.config['SUBMIT_WRITE_BEHIND'] = os.environ.get('SUBMIT_WRITE_BEHIND', 'false').lower() == 'true'
+        app.config['SUBMIT_QUEUE_PATH'] = os.path.join(backend_dir, os.environ.get('SUBMIT_QUEUE_PATH', 'submission_queue.db'))
+        app.config['SUBMIT_QUEUE_BATCH'] = int(os.environ.get('SUBMIT_QUEUE_BATCH', '100'))
+        app.config['SUBMIT_QUEUE_DELAY'] = float(os.environ.get('SUBMIT_QUEUE_DELAY', '0.05'))
+        # Hours a write-behind receipt (or a failed queue entry) can still be looked up
+        app.config['SUBMIT_RECEIPT_TTL'] = float(os.environ.get('SUBMIT_RECEIPT_TTL', '168'))
+        # Times the writer tries a queued submission before marking it failed
+        app.config['SUBMIT_QUEUE_ATTEMPTS'] = int(os.environ.get('SUBMIT_QUEUE_ATTEMPTS', '5'))
+        # Hours the response to a submission is replayed for its Idempotency-Key
+        app.config['IDEMPOTENCY_TTL'] = float(os.environ.get('IDEMPOTENCY_TTL', '24'))
+        # Let the front-end server send upload bodies: 'x-accel' (nginx) or 'x-sendfile'
+        app.config['UPLOAD_OFFLOAD'] = os.environ.get('UPLOAD_OFFLOAD', '').lower() or None
+        if app.config['UPLOAD_OFFLOAD'] not in (None,) + OFFLOAD_MODES:
+            logger.warning(f"Unknown UPLOAD_OFFLOAD {app.config['UPLOAD_OFFLOAD']!r}, sending uploads directly")
+            app.config['UPLOAD_OFFLOAD'] = None
+        # nginx `internal` location that aliases the upload folder
+        app.config['UPLOAD_ACCEL_PREFIX'] = os.environ.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+        # Bytes of resized image variants kept on disk (0 serves originals only)
+        app.config['VARIANT_CACHE_SIZE'] = int(os.environ.get('VARIANT_CACHE_SIZE', str(512 * 1024 * 1024)))
+        # Built frontend, indexed once at startup
+        app.config['STATIC_FOLDER'] = os.path.normpath(os.path.join(backend_dir, os.environ.get('STATIC_FOLDER', '../static')))
+        # Where uploads are stored: 'local' (UPLOAD_FOLDER) or 's3' (an S3-compatible
+        # bucket, with UPLOAD_FOLDER as a local cache)
+        app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'local').lower()
+        if app.config['STORAGE_BACKEND'] not in STORAGE_BACKENDS:
+            logger.warning(f"Unknown STORAGE_BACKEND {app.config['STORAGE_BACKEND']!r}, storing uploads locally")
+            app.config['STORAGE_BACKEND'] = 'local'
+        app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+        app.config['S3_PREFIX'] = os.environ.get('S3_PREFIX', '')
+        # Set for MinIO and other self-hosted stores; unset means AWS S3
+        app.config['S3_ENDPOINT_URL'] = os.environ.get('S3_ENDPOINT_URL') or None
+        app.config['S3_REGION'] = os.environ.get('S3_REGION') or None
+        # Unset uses boto3's usual credential chain (environment, instance role, ...)
+        app.config['S3_ACCESS_KEY_ID'] = os.environ.get('S3_ACCESS_KEY_ID') or None
+        app.config['S3_SECRET_ACCESS_KEY'] = os.environ.get('S3_SECRET_ACCESS_KEY') or None
+        # Seconds pre-signed upload and download URLs stay valid
+        app.config['STORAGE_URL_EXPIRY'] = int(os.environ.get('STORAGE_URL_EXPIRY', '3600'))
+        # Bytes of objects the s3 backend keeps in UPLOAD_FOLDER for local reads (0 is unbounded)
+        app.config['S3_CACHE_SIZE'] = int(os.environ.get('S3_CACHE_SIZE', str(2 * 1024 * 1024 * 1024)))
+        # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted.
+        # Per-client upload limits key on the address this yields, so leave it at 0
+        # unless every request really passes through that many proxies
+        app.config['TRUSTED_PROXY_HOPS'] = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
         
         logger.info(f"Database URL: {app.config.get('SQLALCHEMY_DATABASE_URI', 'Not set')}")
         logger.info(f"Upload folder path: {app.config['UPLOAD_FOLDER']}")
@@ -82,7 +181,7 @@ def create_app():
                 if 'submissions' in inspector.get_table_names():
                     # Check columns
                     columns = [col['name'] for col in inspector.get_columns('submissions')]
-                    required_columns = ['ai_agent', 'additional_screenshots']
+                    required_columns = ['ai_agent', 'additional_screenshots', 'thumbnails']
                     missing_columns = [col for col in required_columns if col not in columns]
                     
                     if missing_columns:
@@ -98,24 +197,169 @@ def create_app():
                                 db.session.execute(text("ALTER TABLE submissions ADD COLUMN additional_screenshots TEXT"))
                                 logger.info("Added additional_screenshots column")
                             
+                            if 'thumbnails' in missing_columns:
+                                db.session.execute(text("ALTER TABLE submissions ADD COLUMN thumbnails TEXT"))
+                                logger.info("Added thumbnails column")
+                            
                             db.session.commit()
                             logger.info("Database schema fixed successfully")
                         except Exception as e:
                             logger.error(f"Error fixing database schema: {e}")
                 else:
                     logger.info("Submissions table does not exist, will be created automatically")
+                
+                if 'resumable_uploads' in inspector.get_table_names():
+                    if 'client' not in [col['name'] for col in inspector.get_columns('resumable_uploads')]:
+                        db.session.execute(text("ALTER TABLE resumable_uploads ADD COLUMN client VARCHAR(64)"))
+                        db.session.commit()
+                        logger.info("Added client column to resumable_uploads")
+                
+                if 'idempotency_keys' in inspector.get_table_names():
+                    if 'request_hash' not in [col['name'] for col in inspector.get_columns('idempotency_keys')]:
+                        db.session.execute(text("ALTER TABLE idempotency_keys ADD COLUMN request_hash VARCHAR(64)"))
+                        db.session.commit()
+                        logger.info("Added request_hash column to idempotency_keys")
+                
+                if 'blobs' in inspector.get_table_names():
+                    if 'manifest' not in [col['name'] for col in inspector.get_columns('blobs')]:
+                        db.session.execute(text("ALTER TABLE blobs ADD COLUMN manifest TEXT"))
+                        db.session.commit()
+                        logger.info("Added manifest column to blobs")
             except Exception as e:
                 logger.error(f"Error checking database schema: {e}")
         
         # Configure CORS to allow all origins for all routes (appropriate for a public API)
         CORS(app)
         
+        if app.config['TRUSTED_PROXY_HOPS'] > 0:
+            hops = app.config['TRUSTED_PROXY_HOPS']
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+        
         # Create upload folder if it doesn't exist
         if not os.path.exists(app.config['UPLOAD_FOLDER']):
             os.makedirs(app.config['UPLOAD_FOLDER'])
+        # Remote storage backend, if configured; see get_storage()
+        app.extensions['storage'] = create_storage(app.config)
+        
+        # Per-process cache of listing totals for search queries
+        search_counts = SearchCountCache(ttl=app.config['SEARCH_COUNT_TTL'])
+        # Per-process copy of the submissions generation used for listing ETags
+        generations = GenerationCache(ttl=app.config['GENERATION_TTL'])
+        # Thumbnails are generated after the submitting request has committed
+        thumbnail_worker = ThumbnailWorker(
+            app, max_workers=app.config['THUMBNAIL_WORKERS'], on_update=generations.invalidate
+        )
+        app.extensions['thumbnails'] = thumbnail_worker
+        upload_executor = ThreadPoolExecutor(max_workers=max(app.config['UPLOAD_WORKERS'], 1), thread_name_prefix='uploads')
+        
+        def queued_submissions_written(created):
+            search_counts.clear()
+            generations.invalidate()
+            for submission_id, filenames in created:
+                thumbnail_worker.submit(submission_id, filenames)
+        
+        # Write-behind mode: /api/submit queues rows for a background group commit
+        submission_queue = None
+        if app.config['SUBMIT_WRITE_BEHIND'] and not db_issues:
+            submission_queue = SubmissionQueue(
+                app.config['SUBMIT_QUEUE_PATH'], max_attempts=app.config['SUBMIT_QUEUE_ATTEMPTS'],
+                failed_ttl=app.config['SUBMIT_RECEIPT_TTL']
+            )
+            submission_writer = SubmissionWriter(
+                app, submission_queue, batch_size=app.config['SUBMIT_QUEUE_BATCH'],
+                delay=app.config['SUBMIT_QUEUE_DELAY'], on_commit=queued_submissions_written,
+                receipt_ttl=app.config['SUBMIT_RECEIPT_TTL']
+            )
+            submission_writer.start()
+            app.extensions['submission_writer'] = submission_writer
+            logger.info(f"Write-behind submissions enabled, queue: {app.config['SUBMIT_QUEUE_PATH']}")
+        
+        # Abandoned resumable uploads are expired even when no new ones are created
+        if app.config['RESUMABLE_EXPIRY_INTERVAL'] > 0 and not db_issues:
+            upload_reaper = UploadReaper(app, app.config['RESUMABLE_EXPIRY_INTERVAL'])
+            upload_reaper.start()
+            app.extensions['upload_reaper'] = upload_reaper
         
         # Register blueprints
         app.register_blueprint(auth_bp, url_prefix='/api')
+        app.register_blueprint(resumable_bp, url_prefix='/api')
+        app.register_blueprint(direct_bp, url_prefix='/api')
+        
+        def replayed_response(key, request_hash):
+            stored = find_response(db.session, key, app.config['IDEMPOTENCY_TTL'])
+            if stored is None:
+                return None
+            status_code, body, stored_hash = stored
+            if stored_hash is not None and stored_hash != request_hash:
+                logger.info(f"Idempotency-Key {key} reused for a different submission")
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different submission'}), 422
+            logger.info(f"Replaying the response for Idempotency-Key {key}")
+            response = jsonify(body)
+            response.status_code = status_code
+            response.headers['Idempotent-Replayed'] = 'true'
+            if body.get('receipt_id'):
+                response.headers['Location'] = f"/api/submit/receipts/{body['receipt_id']}"
+            return response
+        
+        @app.before_request
+        def precheck_submission():
+            """Reject invalid submissions before (or while) their files are received.
+            
+            The headers are checked before any of the body is read, so an
+            oversized or non-multipart request is rejected without the app
+            reading it. This does not stop the client from sending the body:
+            gunicorn and Werkzeug answer `Expect: 100-continue` before the app
+            runs, so only a proxy in front of them could hold the body back.
+            The form is then parsed here, outside submit_form, with a precheck
+            that validates the fields sent ahead of the files and the first
+            bytes of every file, and stops reading at the first failure. A
+            retry with a known Idempotency-Key is answered from those fields,
+            before its first file part is stored.
+            """
+            if request.endpoint != 'submit_form':
+                return None
+            
+            try:
+                key = idempotency_key(request.headers)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if request.mimetype != 'multipart/form-data':
+                return jsonify({'error': 'Submissions must be sent as multipart/form-data'}), 400
+            max_length = app.config['MAX_CONTENT_LENGTH']
+            if request.content_length is not None and request.content_length > max_length:
+                logger.info(f"Submission rejected from headers: {request.content_length} bytes")
+                return jsonify({'error': f'Upload too large. Maximum size is {max_length // (1024 * 1024)}MB'}), 413
+            
+            on_fields = None
+            if key is not None and not db_issues:
+                def on_fields(fields):
+                    # A retry of a submission that already succeeded is answered
+                    # from its text fields, before any of its files is stored
+                    g.request_hash = request_fingerprint(fields)
+                    replay = replayed_response(key, g.request_hash)
+                    if replay is not None:
+                        raise SubmissionReplayed(replay)
+            
+            precheck = SubmissionPrecheck(on_fields)
+            request.set_precheck(precheck)
+            try:
+                request.form
+                if on_fields is not None and not precheck.fields_checked:
+                    # No file parts: every field has been received
+                    on_fields(list(request.form.items(multi=True)))
+            except SubmissionRejected as e:
+                logger.info(f"Submission rejected while uploading: {e.description}")
+                return jsonify({'error': e.description}), 400
+            except SubmissionReplayed as e:
+                return e.response
+            return None
+        
+        # Uploads are never rewritten under the same name: blobs and their
+        # thumbnails are named by content hash, older uploads by timestamp
+        UPLOAD_MAX_AGE = 365 * 24 * 3600
+        CONTENT_ADDRESSED_NAME = re.compile(r'[0-9a-f]{64}(?:_w\d+)?\.[A-Za-z0-9]+')
+        variant_cache = VariantCache(app.config['VARIANT_CACHE_SIZE'])
         
         # Serve uploaded files
         @app.route('/uploads/<path:filename>')
@@ -128,33 +372,148 @@ def create_app():
                 # Ensure we're only looking for the filename, not a path
                 clean_filename = os.path.basename(filename)
                 
-                response = send_from_directory(app.config['UPLOAD_FOLDER'], clean_filename)
+                # Conditional requests get 304 and a Range gets 206. A
+                # content-addressed name is itself a strong ETag; other files
+                # get one from their mtime and size
+                content_addressed = CONTENT_ADDRESSED_NAME.fullmatch(clean_filename) is not None
+                etag = clean_filename.rsplit('.', 1)[0] if content_addressed else True
+                served = clean_filename
+                
+                try:
+                    variant = parse_variant(request.args, clean_filename)
+                except VariantError as e:
+                    return jsonify({'error': str(e)}), 400
+                storage = get_storage(app)
+                if variant is not None and variant_cache.enabled:
+                    # Rendered from a local copy of the original
+                    storage.local_path(clean_filename)
+                    try:
+                        served = variant_cache.get(app.config['UPLOAD_FOLDER'], clean_filename, *variant)
+                        # Named after an unchanging source, so the name identifies the content
+                        etag = os.path.basename(served).rsplit('.', 1)[0] if content_addressed else True
+                    except FileNotFoundError:
+                        raise
+                    except RENDER_ERRORS as e:
+                        # An image Pillow cannot decode is served as it is
+                        logger.warning(f"Could not render a variant of {clean_filename}: {e}")
                 
-                # Add headers to force download for certain file types
+                # Force download for archives; images are displayed inline
                 if clean_filename.lower().endswith(('.zip', '.rar', '.7z')):
-                    response.headers['Content-Disposition'] = f'attachment; filename="{clean_filename}"'
+                    disposition = f'attachment; filename="{clean_filename}"'
                 else:
-                    # For images, ensure they are displayed inline
-                    response.headers['Content-Disposition'] = 'inline'
+                    disposition = 'inline'
+                
+                if served == clean_filename and storage.presigned:
+                    # The client downloads the file from the bucket itself
+                    response = redirect(storage.download_url(clean_filename, disposition))
+                    # Signed URLs expire, so the redirect is only reused for a while
+                    response.cache_control.private = True
+                    response.cache_control.max_age = storage.url_expiry // 2
+                    return response
                 
+                response = send_upload(
+                    app.config['UPLOAD_FOLDER'], served,
+                    etag=etag,
+                    max_age=UPLOAD_MAX_AGE,
+                    offload=app.config['UPLOAD_OFFLOAD'],
+                    accel_prefix=app.config['UPLOAD_ACCEL_PREFIX']
+                )
+                response.cache_control.immutable = True
+                response.headers['Content-Disposition'] = disposition
                 return response
-            except FileNotFoundError:
+            except (FileNotFoundError, NotFound):
                 # Return a proper 404 response
                 return "File not found", 404
         
-        # Serve frontend static files
+        # Members shown in the browser; anything else is sent as a download
+        INLINE_MEMBER_TYPES = {
+            'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'text/plain', 'application/json', 'application/pdf'
+        }
+        
+        @app.route('/uploads/<filename>/<path:member>')
+        def uploaded_zip_member(filename, member):
+            """One file from inside an uploaded project zip, read in place"""
+            clean_filename = os.path.basename(filename)
+            if not clean_filename.lower().endswith('.zip'):
+                return "File not found", 404
+            try:
+                # Members are read in place, from a local copy with remote storage
+                path = get_storage(app).local_path(clean_filename)
+            except FileNotFoundError:
+                return "File not found", 404
+            
+            if db_issues:
+                manifest = read_manifest(path)
+            else:
+                manifest = get_manifest(db.session, app.config['UPLOAD_FOLDER'], clean_filename)
+                db.session.commit()
+            entry = find_member(manifest, path, member) if manifest is not None else None
+            if entry is None or entry['is_dir']:
+                return "File not found", 404
+            
+            # Blob names are content hashes, so their members never change
+            immutable = CONTENT_ADDRESSED_NAME.fullmatch(clean_filename) is not None
+            etag = f"{entry['crc']:08x}-{entry['size']:x}-{entry['header_offset']:x}"
+            headers = {
+                'ETag': f'"{etag}"',
+                'Cache-Control': f'public, max-age={UPLOAD_MAX_AGE}, immutable' if immutable else 'public, max-age=3600',
+            }
+            if request.if_none_match.contains(etag):
+                return Response(status=304, headers=headers)
+            
+            try:
+                body = open_member(path, entry)
+            except ZipMemberError as e:
+                logger.info(f"Cannot serve {member} from {clean_filename}: {e}")
+                return jsonify({'error': str(e)}), 415
+            
+            content_type = mimetypes.guess_type(member)[0] or 'application/octet-stream'
+            download_name = secure_filename(os.path.basename(member)) or 'file'
+            headers.update({
+                'Content-Length': str(entry['size']),
+                'Content-Disposition': 'inline' if content_type in INLINE_MEMBER_TYPES else f'attachment; filename="{download_name}"',
+                # Project files are untrusted: never let them run as part of this site
+                'X-Content-Type-Options': 'nosniff',
+                'Content-Security-Policy': 'sandbox',
+            })
+            return Response(body, content_type=content_type, headers=headers, direct_passthrough=True)
+        
+        @app.route('/api/files/<filename>/manifest')
+        def file_manifest(filename):
+            """Members of an uploaded project zip, read from its central directory"""
+            clean_filename = os.path.basename(filename)
+            if not clean_filename.lower().endswith('.zip'):
+                return jsonify({'error': 'Only project zips have a manifest'}), 404
+            if db_issues:
+                return jsonify({'error': 'Database issues detected'}), 503
+            
+            manifest = get_manifest(db.session, app.config['UPLOAD_FOLDER'], clean_filename, get_storage(app))
+            if manifest is None:
+                db.session.rollback()
+                return jsonify({'error': 'File not found or not a readable zip'}), 404
+            # Stores the manifest of a zip indexed just now
+            db.session.commit()
+            
+            response = jsonify(dict(manifest, filename=clean_filename))
+            # Stored files never change under a name
+            response.headers['Cache-Control'] = 'public, max-age=3600'
+            return response
+        
+        # Serve frontend static files from the manifest built at startup
+        static_assets = StaticAssets(app.config['STATIC_FOLDER'])
+        logger.info(f"Indexed {len(static_assets.files)} frontend files in {app.config['STATIC_FOLDER']}")
+        
         @app.route('/')
         def serve_frontend():
-            return send_from_directory('../static', 'index.html')
+            return serve_frontend_files('index.html')
         
         @app.route('/<path:path>')
         def serve_frontend_files(path):
-            # Serve static files (CSS, JS, images, etc.)
-            if os.path.exists(os.path.join('../static', path)):
-                return send_from_directory('../static', path)
-            # For all other routes, serve index.html (for client-side routing)
-            else:
-                return send_from_directory('../static', 'index.html')
+            # Unknown paths get index.html (for client-side routing)
+            entry = static_assets.lookup(path)
+            if entry is None:
+                return jsonify({'error': 'Frontend not built'}), 404
+            return static_assets.response(entry)
         
         # Health check endpoint
         @app.route('/health')
@@ -179,7 +538,7 @@ def create_app():
             try:
                 # Check if required columns exist in submissions table
                 from models import Submission
-                required_columns = ['additional_screenshots', 'ai_agent']
+                required_columns = ['additional_screenshots', 'ai_agent', 'thumbnails']
                 missing_columns = []
                 
                 # Get table info
@@ -244,6 +603,10 @@ def create_app():
                 # Create all tables
                 db.create_all()
                 logger.info("Created all tables")
+                app.extensions['submission_search'] = install_search_index(db.session, rebuild=True)
+                seed_counters(db.session)
+                search_counts.clear()
+                generations.invalidate()
                 
                 return jsonify({
                     'status': 'success',
@@ -292,32 +655,18 @@ def create_app():
                 logger.info(f"Request form data: {request.form}")
                 logger.info(f"Request files: {list(request.files.keys())}")
                 
-                # Validate required fields
-                required_fields = ['lumen_name', 'prompt_text', 'ai_used', 'ai_agent', 'reward_amount']
-                for field in required_fields:
-                    if field not in request.form or not request.form[field].strip():
-                        logger.info(f"Missing required field: {field}")
-                        return jsonify({'error': f'{field} is required'}), 400
-                
-                # Validate reward amount
+                # Validate the text fields
                 try:
-                    reward_amount = float(request.form['reward_amount'])
-                    if reward_amount < 0.01:
-                        logger.info("Invalid reward amount")
-                        return jsonify({'error': 'Reward amount must be at least 0.01'}), 400
-                except ValueError:
-                    logger.info("Invalid reward amount format")
-                    return jsonify({'error': 'Invalid reward amount'}), 400
-                
-                # Validate AI used
-                valid_ai_options = ['GPT-5', 'Claude', 'LLaMA', 'Gemini', 'Perplexity', 'Other']
-                if request.form['ai_used'] not in valid_ai_options:
-                    logger.info("Invalid AI option selected")
-                    return jsonify({'error': 'Invalid AI option selected'}), 400
+                    fields = validate_fields(request.form)
+                except SubmissionError as e:
+                    logger.info(f"Invalid submission: {e}")
+                    return jsonify({'error': str(e)}), 400
+                reward_amount = fields['reward_amount']
                 
                 # Handle file upload - check for both screenshot and project files
                 file = None
                 file_type = None
+                direct_upload = None
                 
                 if 'screenshot' in request.files and request.files['screenshot'].filename != '':
                     file = request.files['screenshot']
@@ -327,131 +676,150 @@ def create_app():
                     file = request.files['project']
                     file_type = 'project'
                     logger.info("Project file found")
+                elif request.form.get('project_upload') and not db_issues:
+                    # A project zip sent earlier through the resumable upload endpoints
+                    try:
+                        file = claim_upload(db.session, request.form['project_upload'], app.config['UPLOAD_FOLDER'])
+                    except SubmissionError as e:
+                        logger.info(f"Invalid project upload: {e}")
+                        return jsonify({'error': str(e)}), 400
+                    file_type = 'project'
+                    logger.info("Resumable project upload found")
+                elif request.form.get('direct_upload') and not db_issues and get_storage(app).presigned:
+                    # A project zip the client PUT straight into the storage bucket
+                    try:
+                        direct_upload = claim_direct_upload(db.session, get_storage(app), request.form['direct_upload'])
+                    except SubmissionError as e:
+                        logger.info(f"Invalid direct upload: {e}")
+                        return jsonify({'error': str(e)}), 400
+                    file = FileStorage(filename=direct_upload[0], content_type='application/zip')
+                    file_type = 'project'
+                    logger.info("Direct project upload found")
                 else:
                     logger.info("No file found in request")
                     return jsonify({'error': 'Either a screenshot or project file is required'}), 400
                 
-                if not file or not file.filename:
-                    logger.info("File is empty or has no filename")
-                    return jsonify({'error': 'No file selected'}), 400
-                
                 logger.info(f"File details - filename: {file.filename}, content_type: {file.content_type}")
                 
                 # Validate file based on type
-                if file_type == 'screenshot':
-                    # Validate screenshot file type
-                    allowed_extensions = {'png', 'jpg', 'jpeg'}
-                    
-                    # Check if filename contains extension
-                    if '.' not in file.filename:
-                        logger.info("Screenshot file has no extension")
-                        return jsonify({'error': 'Invalid file type. Only .jpg, .jpeg, .png files allowed'}), 400
-                    
-                    file_ext = file.filename.rsplit('.', 1)[1].lower()
-                    if file_ext not in allowed_extensions:
-                        logger.info(f"Screenshot file has invalid extension: {file_ext}")
-                        return jsonify({'error': 'Invalid file type. Only .jpg, .jpeg, .png files allowed'}), 400
-                    
-                    # Additional security check for file content
-                    if file.content_type not in ['image/png', 'image/jpeg']:
-                        logger.info(f"Screenshot file has invalid content type: {file.content_type}")
-                        return jsonify({'error': 'Invalid file content type'}), 400
-                else:  # project file
-                    # Validate project file type (zip)
-                    allowed_extensions = {'zip'}
-                    if '.' not in file.filename:
-                        logger.info("Project file has no extension")
-                        return jsonify({'error': 'Invalid file type. Only .zip files allowed'}), 400
-                    
-                    file_ext = file.filename.rsplit('.', 1)[1].lower()
-                    if file_ext not in allowed_extensions:
-                        logger.info(f"Project file has invalid extension: {file_ext}")
-                        return jsonify({'error': 'Invalid file type. Only .zip files allowed'}), 400
-                    
-                    # Additional security check for file content
-                    if file.content_type not in ['application/zip', 'application/x-zip-compressed']:
-                        logger.info(f"Project file has invalid content type: {file.content_type}")
-                        return jsonify({'error': 'Invalid file content type. Only ZIP files are allowed'}), 400
+                try:
+                    file_ext = validate_file(file, file_type)
+                except SubmissionError as e:
+                    logger.info(f"Invalid {file_type} file: {e}")
+                    return jsonify({'error': str(e)}), 400
                 
                 # Save primary file securely
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                secure_name = secure_filename(file.filename)
-                if not secure_name:
-                    secure_name = 'screenshot.png' if file_type == 'screenshot' else 'project.zip'
-                
-                # Add prefix to distinguish file types
-                filename = f"{timestamp}_{file_type}_{secure_name}"
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 
                 # Ensure the upload directory exists
                 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
                 logger.info(f"=== FILE SAVING PROCESS ===")
-                logger.info(f"Saving file to: {file_path}")
                 logger.info(f"Upload folder: {app.config['UPLOAD_FOLDER']}")
                 logger.info(f"Upload folder exists: {os.path.exists(app.config['UPLOAD_FOLDER'])}")
                 logger.info(f"Current working directory: {os.getcwd()}")
                 logger.info(f"File object: {file}")
                 logger.info(f"File filename: {file.filename}")
                 
+                # Collect the additional screenshots so every file is stored in one batch
+                additional_uploads = []
+                for i, additional_file in enumerate(request.files.getlist('additional_screenshots')):
+                    if additional_file and additional_file.filename:
+                        additional_ext = additional_screenshot_extension(additional_file)
+                        if additional_ext is None:
+                            logger.info(f"Additional screenshot {i} has an invalid type, skipping")
+                            continue  # Skip invalid files
+                        additional_uploads.append((i, additional_file, additional_ext))
+                
                 try:
-                    file.save(file_path)
-                    logger.info(f"File saved successfully: {file_path}")
+                    if not db_issues:
+                        # Stored by content: an identical earlier upload is reused, not copied again.
+                        # The primary file and additional screenshots are synced and moved into
+                        # place concurrently, followed by one sync of the upload folder.
+                        uploads = [(f, ext) for _, f, ext in additional_uploads]
+                        if direct_upload is None:
+                            uploads.insert(0, (file, file_ext))
+                        stored = store_blobs(
+                            db.session,
+                            uploads,
+                            app.config['UPLOAD_FOLDER'],
+                            upload_executor,
+                            durable=app.config['UPLOAD_FSYNC'],
+                            # In write-behind mode the writer adds the references with the row
+                            reference=submission_queue is None,
+                            storage=get_storage(app)
+                        )
+                        if direct_upload is not None:
+                            # Already stored: only the reference is added
+                            stored.insert(0, direct_upload)
+                            if submission_queue is None:
+                                reference_blobs(db.session, [direct_upload])
+                        filename, file_size, file_sha256 = stored[0][:3]
+                        additional_screenshot_paths = [blob[0] for blob in stored[1:]]
+                    else:
+                        secure_name = secure_filename(file.filename)
+                        if not secure_name:
+                            secure_name = 'screenshot.png' if file_type == 'screenshot' else 'project.zip'
+                        # Add prefix to distinguish file types
+                        filename = f"{timestamp}_{file_type}_{secure_name}"
+                        file_size, file_sha256 = save_upload(file, os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                        
+                        additional_screenshot_paths = []
+                        for i, additional_file, _ in additional_uploads:
+                            additional_secure_name = secure_filename(additional_file.filename)
+                            if not additional_secure_name:
+                                additional_secure_name = f'screenshot_{i+1}.png'
+                            additional_filename = f"{timestamp}_additional_{i+1}_{additional_secure_name}"
+                            save_upload(additional_file, os.path.join(app.config['UPLOAD_FOLDER'], additional_filename))
+                            additional_screenshot_paths.append(additional_filename)  # Store just the filename
+                    logger.info(f"File saved successfully: {filename}")
+                    logger.info(f"File size: {file_size} bytes, sha256: {file_sha256}")
+                    logger.info(f"Additional screenshots saved: {additional_screenshot_paths}")
                 except Exception as e:
                     logger.error(f"Error saving file: {str(e)}")
                     logger.exception("Full traceback for file saving error:")
+                    if not db_issues:
+                        db.session.rollback()
                     return jsonify({'error': f'Error saving file: {str(e)}'}), 500
                 
-                # Verify file was saved
-                if os.path.exists(file_path):
-                    logger.info(f"File verification successful: {file_path}")
-                    # Check file size
-                    file_size = os.path.getsize(file_path)
-                    logger.info(f"File size: {file_size} bytes")
-                else:
-                    logger.error(f"File verification failed: {file_path}")
-                    # List files in upload folder
-                    try:
-                        files_in_upload = os.listdir(app.config['UPLOAD_FOLDER'])
-                        logger.info(f"Files in upload folder: {files_in_upload}")
-                    except Exception as e:
-                        logger.error(f"Error listing files in upload folder: {str(e)}")
-                
                 logger.info(f"=== FILE SAVING PROCESS COMPLETED ===")
                 
-                # Handle additional screenshots
-                additional_screenshot_paths = []
-                if 'additional_screenshots' in request.files:
-                    additional_files = request.files.getlist('additional_screenshots')
-                    for i, additional_file in enumerate(additional_files):
-                        if additional_file and additional_file.filename:
-                            # Validate additional screenshot file type
-                            allowed_extensions = {'png', 'jpg', 'jpeg'}
-                            
-                            # Check if filename contains extension
-                            if '.' not in additional_file.filename:
-                                logger.info(f"Additional screenshot {i} has no extension, skipping")
-                                continue  # Skip invalid files
-                            
-                            file_ext = additional_file.filename.rsplit('.', 1)[1].lower()
-                            if file_ext not in allowed_extensions:
-                                logger.info(f"Additional screenshot {i} has invalid extension: {file_ext}, skipping")
-                                continue  # Skip invalid files
-                            
-                            # Additional security check for file content
-                            if additional_file.content_type not in ['image/png', 'image/jpeg']:
-                                logger.info(f"Additional screenshot {i} has invalid content type: {additional_file.content_type}, skipping")
-                                continue  # Skip invalid files
-                            
-                            # Save additional screenshot
-                            additional_secure_name = secure_filename(additional_file.filename)
-                            if not additional_secure_name:
-                                additional_secure_name = f'screenshot_{i+1}.png'
-                            
-                            additional_filename = f"{timestamp}_additional_{i+1}_{additional_secure_name}"
-                            additional_file_path = os.path.join(app.config['UPLOAD_FOLDER'], additional_filename)
-                            additional_file.save(additional_file_path)
-                            additional_screenshot_paths.append(additional_filename)  # Store just the filename
-                            logger.info(f"Additional screenshot {i} saved: {additional_file_path}")
+                message = '✅ Submission received. You are responsible for accuracy of details.'
+                key = idempotency_key(request.headers)
+                request_hash = g.get('request_hash') if key is not None else None
+                screenshots = ([filename] if file_type == 'screenshot' else []) + additional_screenshot_paths
+                if submission_queue is not None:
+                    # The submission itself is written by the writer. The claimed
+                    # resumable upload (its file is already moved into place) and
+                    # the key are committed before queueing, so neither a second
+                    # submit of the upload nor a concurrent retry can queue the
+                    # submission a second time
+                    receipt_id = submission_queue.new_receipt_id()
+                    body = {'message': message, 'receipt_id': receipt_id, 'status': 'queued'}
+                    try:
+                        if key is not None:
+                            record_response(db.session, key, 202, body, app.config['IDEMPOTENCY_TTL'], request_hash)
+                        db.session.commit()
+                    except IntegrityError:
+                        db.session.rollback()
+                        if key is None:
+                            raise
+                        return replayed_response(key, request_hash)
+                    try:
+                        submission_queue.enqueue(queue_payload(
+                            fields, stored, datetime.utcnow(), dict.fromkeys(screenshots)
+                        ), receipt_id)
+                    except Exception:
+                        if key is not None:
+                            # Let a retry with the key try again instead of replaying a lost receipt
+                            db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.key == key))
+                            db.session.commit()
+                        raise
+                    app.extensions['submission_writer'].notify()
+                    logger.info(f"Submission from {request.form['lumen_name']} queued as {receipt_id}")
+                    response = jsonify(body)
+                    response.status_code = 202
+                    response.headers['Location'] = f'/api/submit/receipts/{receipt_id}'
+                    return response
                 
                 # Create submission record with relative path for security
                 submission = Submission()
@@ -471,14 +839,33 @@ def create_app():
                 # Only try to save to database if database is working
                 if not db_issues:
                     db.session.add(submission)
-                    db.session.commit()
+                    db.session.flush()
+                    # Counters and rollups commit atomically with the row they describe
+                    increment_total(db.session)
+                    record_submissions(db.session, [submission])
+                    if key is not None:
+                        record_response(db.session, key, 201, {'message': message, 'submission_id': submission.id},
+                                        app.config['IDEMPOTENCY_TTL'], request_hash)
+                    try:
+                        db.session.commit()
+                    except IntegrityError:
+                        # A concurrent retry with the same key committed first
+                        db.session.rollback()
+                        replay = replayed_response(key, request_hash) if key is not None else None
+                        if replay is None:
+                            raise
+                        return replay
+                    search_counts.clear()
+                    generations.invalidate()
+                    
+                    thumbnail_worker.submit(submission.id, list(dict.fromkeys(screenshots)))
                 
                 logger.info(f"New submission received from {request.form['lumen_name']} with {file_type}")
                 logger.info("=== SUBMISSION PROCESS COMPLETED SUCCESSFULLY ===")
                 print("=== SUBMISSION PROCESS COMPLETED SUCCESSFULLY ===")
                 
                 return jsonify({
-                    'message': '✅ Submission received. You are responsible for accuracy of details.',
+                    'message': message,
                     'submission_id': submission.id if not db_issues else None
                 }), 201
                 
@@ -489,9 +876,65 @@ def create_app():
                     db.session.rollback()
                 return jsonify({'error': f'An error occurred while processing your submission: {str(e)}. Please try again later.'}), 500
         
+        @app.route('/api/submit/receipts/<receipt_id>', methods=['GET'])
+        def submission_receipt(receipt_id):
+            receipt = None if db_issues else db.session.get(SubmissionReceipt, receipt_id)
+            if receipt is not None:
+                body = {'receipt_id': receipt_id, 'status': 'written', 'submission_id': receipt.submission_id}
+            else:
+                queued = submission_queue.status(receipt_id) if submission_queue is not None else None
+                if queued is None:
+                    return jsonify({'error': 'Receipt not found'}), 404
+                status, error = queued
+                body = {'receipt_id': receipt_id, 'status': status, 'submission_id': None}
+                if error:
+                    body['error'] = error
+            response = jsonify(body)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        
+        @app.route('/api/submit/bulk', methods=['POST'])
+        def submit_bulk():
+            if db_issues:
+                return jsonify({'error': 'Database issues detected, bulk submissions unavailable'}), 503
+            
+            try:
+                items, errors = parse_manifest(request.form, request.files)
+            except SubmissionError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            results = list(errors)
+            if items:
+                try:
+                    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+                    ids, screenshots = create_submissions(
+                        db.session, items, app.config['UPLOAD_FOLDER'], upload_executor,
+                        durable=app.config['UPLOAD_FSYNC'], storage=get_storage(app)
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    logger.error(f"Error during bulk submission: {str(e)}")
+                    logger.exception("Full traceback for bulk submission error:")
+                    db.session.rollback()
+                    return jsonify({'error': f'An error occurred while processing your submissions: {str(e)}. Please try again later.'}), 500
+                
+                search_counts.clear()
+                generations.invalidate()
+                for submission_id, filenames in zip(ids, screenshots):
+                    thumbnail_worker.submit(submission_id, filenames)
+                results.extend(
+                    {'index': item.index, 'submission_id': submission_id} for item, submission_id in zip(items, ids)
+                )
+            
+            results.sort(key=lambda result: result['index'])
+            logger.info(f"Bulk submission: {len(items)} created, {len(errors)} rejected")
+            # 207 when only some entries were accepted
+            status = 400 if not items else 207 if errors else 201
+            return jsonify({'created': len(items), 'failed': len(errors), 'results': results}), status
+        
         @app.route('/api/submissions', methods=['GET'])
         @jwt_required
-        def get_submissions():
+        def get_submissions(current_user):
             try:
                 # Return empty list if there are database issues
                 if db_issues:
@@ -506,76 +949,60 @@ def create_app():
                         'message': 'Database issues detected, returning empty list'
                     }), 200
                 
-                # Get pagination parameters
-                page = request.args.get('page', 1, type=int)
-                per_page = request.args.get('per_page', 10, type=int)
-                per_page = min(per_page, 100)  # Limit max items per page
-                
-                # Get search/filter parameters
-                search = request.args.get('search', '')
-                sort_by = request.args.get('sort_by', 'timestamp')
-                order = request.args.get('order', 'desc')
-                
-                # Build query
-                query = Submission.query
-                
-                # Apply search filter
-                if search:
-                    query = query.filter(
-                        or_(
-                            Submission.lumen_name.like(f'%{search}%'),
-                            Submission.ai_used.like(f'%{search}%'),
-                            Submission.ai_agent.like(f'%{search}%')  # Add AI agent to search
-                        )
-                    )
-                
-                # Apply sorting
-                if sort_by == 'reward_amount':
-                    if order == 'asc':
-                        query = query.order_by(Submission.reward_amount.asc())
-                    else:
-                        query = query.order_by(Submission.reward_amount.desc())
-                elif sort_by == 'lumen_name':
-                    if order == 'asc':
-                        query = query.order_by(Submission.lumen_name.asc())
-                    else:
-                        query = query.order_by(Submission.lumen_name.desc())
-                elif sort_by == 'ai_agent':  # Add sorting by AI agent
-                    if order == 'asc':
-                        query = query.order_by(Submission.ai_agent.asc())
-                    else:
-                        query = query.order_by(Submission.ai_agent.desc())
-                else:  # Default sort by timestamp
-                    if order == 'asc':
-                        query = query.order_by(Submission.timestamp.asc())
-                    else:
-                        query = query.order_by(Submission.timestamp.desc())
-                
-                # Paginate results
-                paginated = query.paginate(
-                    page=page, 
-                    per_page=per_page, 
-                    error_out=False
-                )
-                
-                # Format submissions for response
-                submissions = [sub.to_dict() for sub in paginated.items]  # Use to_dict method
-                
-                return jsonify({
-                    'submissions': submissions,
-                    'pagination': {
-                        'page': paginated.page,
-                        'pages': paginated.pages,
-                        'per_page': paginated.per_page,
-                        'total': paginated.total
-                    }
-                }), 200
+                try:
+                    listing = parse_listing_args(request.args, app.extensions.get('submission_search'))
+                    return jsonify(run_listing(db.session, listing, search_counts)), 200
+                except ListingError as e:
+                    return jsonify({'error': str(e)}), 400
                 
             except Exception as e:
                 logger.error(f"Error retrieving submissions: {str(e)}")
                 logger.exception("Full traceback for submissions error:")
                 return jsonify({'error': f'An error occurred while retrieving submissions: {str(e)}. Please try again later.'}), 500
         
+        @app.route('/api/submissions/export', methods=['GET'])
+        @jwt_required
+        def export_submissions(current_user):
+            if db_issues:
+                return jsonify({'error': 'Database issues detected, export unavailable'}), 503
+            
+            export_format = request.args.get('format', 'csv')
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({'error': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+            search = request.args.get('search', '').strip()
+            
+            logger.info(f"Submission export ({export_format}) requested by {current_user.username}")
+            filename = f"submissions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+            
+            # Stream rows as they are read; the app context keeps the session alive meanwhile
+            return Response(
+                stream_with_context(generate_export(db.session, export_format, search, app.extensions.get('submission_search'))),
+                mimetype=EXPORT_FORMATS[export_format],
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+        
+        @app.route('/api/stats', methods=['GET'])
+        @jwt_required
+        def get_submission_stats(current_user):
+            if db_issues:
+                return jsonify({'error': 'Database issues detected, stats unavailable'}), 503
+            
+            # Optional inclusive day range, YYYY-MM-DD
+            try:
+                start = request.args.get('from')
+                end = request.args.get('to')
+                start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+                end = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+            except ValueError:
+                return jsonify({'error': 'from and to must be dates in YYYY-MM-DD format'}), 400
+            
+            try:
+                return jsonify(get_stats(db.session, start, end)), 200
+            except Exception as e:
+                logger.error(f"Error retrieving stats: {str(e)}")
+                logger.exception("Full traceback for stats error:")
+                return jsonify({'error': f'An error occurred while retrieving stats: {str(e)}. Please try again later.'}), 500
+        
         @app.route('/api/public/submissions', methods=['GET'])
         def get_public_submissions():
             try:
@@ -592,70 +1019,24 @@ def create_app():
                         'message': 'Database issues detected, returning empty list'
                     }), 200
                 
-                # Get pagination parameters
-                page = request.args.get('page', 1, type=int)
-                per_page = request.args.get('per_page', 10, type=int)
-                per_page = min(per_page, 100)  # Limit max items per page
-                
-                # Get search/filter parameters
-                search = request.args.get('search', '')
-                sort_by = request.args.get('sort_by', 'timestamp')
-                order = request.args.get('order', 'desc')
-                
-                # Build query
-                query = Submission.query
-                
-                # Apply search filter
-                if search:
-                    query = query.filter(
-                        or_(
-                            Submission.lumen_name.like(f'%{search}%'),
-                            Submission.ai_used.like(f'%{search}%'),
-                            Submission.ai_agent.like(f'%{search}%')  # Add AI agent to search
-                        )
-                    )
-                
-                # Apply sorting
-                if sort_by == 'reward_amount':
-                    if order == 'asc':
-                        query = query.order_by(Submission.reward_amount.asc())
-                    else:
-                        query = query.order_by(Submission.reward_amount.desc())
-                elif sort_by == 'lumen_name':
-                    if order == 'asc':
-                        query = query.order_by(Submission.lumen_name.asc())
-                    else:
-                        query = query.order_by(Submission.lumen_name.desc())
-                elif sort_by == 'ai_agent':  # Add sorting by AI agent
-                    if order == 'asc':
-                        query = query.order_by(Submission.ai_agent.asc())
-                    else:
-                        query = query.order_by(Submission.ai_agent.desc())
-                else:  # Default sort by timestamp
-                    if order == 'asc':
-                        query = query.order_by(Submission.timestamp.asc())
-                    else:
-                        query = query.order_by(Submission.timestamp.desc())
-                
-                # Paginate results
-                paginated = query.paginate(
-                    page=page, 
-                    per_page=per_page, 
-                    error_out=False
-                )
+                # Answer revalidations from the generation alone: nothing changed, nothing to query
+                etag = listing_etag(generations.current(db.session), request.args)
+                if request.if_none_match.contains_weak(etag):
+                    response = make_response('', 304)
+                    response.set_etag(etag, weak=True)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
                 
-                # Format submissions for response (public version - exclude sensitive info)
-                submissions = [sub.to_dict() for sub in paginated.items]  # Use to_dict method
+                try:
+                    listing = parse_listing_args(request.args, app.extensions.get('submission_search'))
+                    payload = run_listing(db.session, listing, search_counts)
+                except ListingError as e:
+                    return jsonify({'error': str(e)}), 400
                 
-                return jsonify({
-                    'submissions': submissions,
-                    'pagination': {
-                        'page': paginated.page,
-                        'pages': paginated.pages,
-                        'per_page': paginated.per_page,
-                        'total': paginated.total
-                    }
-                }), 200
+                response = jsonify(payload)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
                 
             except Exception as e:
                 logger.error(f"Error retrieving public submissions: {str(e)}")
@@ -670,6 +1051,12 @@ def create_app():
                     # Try to create all tables
                     db.create_all()
                     logger.info("Database tables created successfully")
+                    # create_all skips indexes on tables that already exist
+                    for index in Submission.__table__.indexes:
+                        index.create(db.engine, checkfirst=True)
+                    app.extensions['submission_search'] = install_search_index(db.session)
+                    logger.info(f"Submission search backend: {app.extensions['submission_search']}")
+                    seed_counters(db.session)
                 except Exception as e:
                     logger.error(f"Error creating database tables: {str(e)}")
                     logger.exception("Full traceback for database table creation error:")
@@ -692,6 +1079,13 @@ def create_app():
                         except Exception as alter_e2:
                             logger.info(f"additional_screenshots column already exists or not needed: {str(alter_e2)}")
                         
+                        # Try to add thumbnails column
+                        try:
+                            db.session.execute(text("ALTER TABLE submissions ADD COLUMN thumbnails TEXT"))
+                            logger.info("Added thumbnails column to submissions table")
+                        except Exception as alter_e3:
+                            logger.info(f"thumbnails column already exists or not needed: {str(alter_e3)}")
+                        
                         db.session.commit()
                         logger.info("Database schema updated successfully")
                     except Exception as e2:
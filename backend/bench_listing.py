@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the listing query builder.
+
+Compares building the listing statement from scratch on every request
+(what the endpoints used to do) with reusing the memoized statement from
+listing.listing_statement, for a few common listing shapes. Run from the
+backend directory:
+
+    python bench_listing.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+import logging
+from datetime import datetime, timedelta
+
+# Add backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ROWS = 2000
+
+SHAPES = [
+    ('timestamp desc, page 5', dict(sort_by='timestamp', order='desc', fields=None, summary=False, mode=None), {}),
+    ('reward asc, summary fields', dict(sort_by='reward_amount', order='asc', fields=None, summary=True, mode=None), {}),
+    ('full-text search, relevance', dict(sort_by='relevance', order='desc', fields=None, summary=False, mode='fts5'),
+     {'search': '"user1"*'}),
+]
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmp_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    logging.disable(logging.CRITICAL)
+
+    from app import create_app
+    from models import db, Submission
+    from projection import parse_fields
+    from listing import listing_statement
+
+    app = create_app()
+    with app.app_context():
+        base = datetime(2024, 1, 1)
+        db.session.execute(Submission.__table__.insert(), [{
+            'lumen_name': f'user{i % 50}', 'prompt_text': f'prompt {i} ' * 20, 'ai_used': 'Claude',
+            'ai_agent': 'Cursor', 'reward_amount': float(i % 17), 'screenshot_path': f'f{i}.png',
+            'timestamp': base + timedelta(minutes=i)
+        } for i in range(ROWS)])
+        db.session.commit()
+
+        summary_fields = tuple(parse_fields('summary')[0])
+        print(f"{iterations} requests per shape, {ROWS} rows, SQLite\n")
+        print(f"{'shape':32} {'rebuilt (us/req)':>18} {'cached (us/req)':>17} {'saved':>7}")
+
+        for label, shape, params in SHAPES:
+            args = dict(shape)
+            if args['summary']:
+                args['fields'] = summary_fields
+            key = (args['sort_by'], args['order'], args['fields'], args['summary'], args['mode'], None, 'sqlite')
+            params = dict(params, limit=10, offset=40)
+
+            def run(build):
+                db.session.execute(build(*key), params).scalars().all()
+                db.session.expunge_all()
+
+            timings = {}
+            for name, build in [('rebuilt', listing_statement.__wrapped__), ('cached', listing_statement)]:
+                for _ in range(50):
+                    run(build)  # warm the compiled cache and the memoized statement
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    run(build)
+                timings[name] = (time.perf_counter() - start) / iterations * 1e6
+
+            saved = 1 - timings['cached'] / timings['rebuilt']
+            print(f"{label:32} {timings['rebuilt']:18.1f} {timings['cached']:17.1f} {saved:7.0%}")
+
+        db.session.remove()
+        db.engine.dispose()
+
+if __name__ == '__main__':
+    main()
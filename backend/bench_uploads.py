@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark for storing a submission's files.
+
+Compares moving the primary file and its additional screenshots into the
+upload folder one after another with doing it on a thread pool, for
+submissions carrying 1, 10 and 30 images. Each file is fsynced before it
+is moved and the folder once at the end, as /api/submit does with
+UPLOAD_FSYNC=true. Run from the backend directory:
+
+    python bench_uploads.py [image size in KB] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Add backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+IMAGE_COUNTS = (1, 10, 30)
+ROUNDS = 5
+
+def main():
+    size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tmp_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    logging.disable(logging.CRITICAL)
+
+    from app import create_app
+    from models import db
+    from blobs import store_blobs
+    from ingest import IngestPart, incoming_dir
+
+    app = create_app()
+    upload_folder = os.path.join(tmp_dir, 'uploads')
+    os.makedirs(upload_folder)
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def received(count):
+        # Distinct content per file, so nothing is deduplicated away
+        parts = []
+        for _ in range(count):
+            part = IngestPart(incoming_dir(upload_folder))
+            part.write(b'\x89PNG\r\n\x1a\n' + os.urandom(size_kb * 1024))
+            parts.append((part, 'png'))
+        return parts
+
+    with app.app_context():
+        print(f"{size_kb}KB images, fsync on, best of {ROUNDS}\n")
+        print(f"{'images':>6} {'serial (ms)':>12} {f'{workers} workers (ms)':>16} {'saved':>7}")
+
+        for count in IMAGE_COUNTS:
+            timings = {}
+            for name, pool in [('serial', None), ('parallel', executor)]:
+                best = None
+                for _ in range(ROUNDS):
+                    uploads = received(count)
+                    start = time.perf_counter()
+                    store_blobs(db.session, uploads, upload_folder, pool, durable=True)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                    db.session.rollback()
+                timings[name] = best * 1000
+
+            saved = 1 - timings['parallel'] / timings['serial']
+            print(f"{count:6} {timings['serial']:12.1f} {timings['parallel']:16.1f} {saved:7.0%}")
+
+        db.session.remove()
+        db.engine.dispose()
+    executor.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Content-addressed storage for uploaded files.
+
+Every upload is stored once as <sha256>.<ext> (in UPLOAD_FOLDER or the
+configured storage backend, see storage.py), and the
+`blobs` table counts how many submission slots (primary file or
+additional screenshot) reference it. Resubmitting an identical screenshot
+or zip only bumps the count; the received part is dropped instead of
+becoming another copy. Submissions keep storing plain filenames, so
+/uploads/<filename> serves blobs exactly like the older timestamped files.
+"""
+import json
+import shutil
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.datastructures import FileStorage
+
+from models import Blob
+from ingest import IngestPart, incoming_dir
+from storage import LocalStorage
+from zipindex import read_manifest
+
+
+def _add_references(session, rows):
+    """Create blob rows or add `ref_count` references to existing ones"""
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert_fn = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert_fn(Blob)
+        statement = statement.on_conflict_do_update(
+            index_elements=['sha256'], set_={'ref_count': Blob.ref_count + statement.excluded.ref_count}
+        )
+        session.execute(statement, rows)
+        return
+
+    for row in rows:
+        result = session.execute(
+            update(Blob).where(Blob.sha256 == row['sha256']).values(ref_count=Blob.ref_count + row['ref_count'])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(Blob), [row])
+
+
+def _ingest_part(file, upload_folder):
+    """The IngestPart behind a FileStorage, hashing other streams into one first.
+
+    Anything else is taken to be a part already (e.g. a ResumablePart).
+    """
+    if not isinstance(file, FileStorage):
+        return file
+    if isinstance(file.stream, IngestPart):
+        return file.stream
+    part = IngestPart(incoming_dir(upload_folder))
+    try:
+        file.stream.seek(0)
+        shutil.copyfileobj(file.stream, part, 64 * 1024)
+    except Exception:
+        part.discard()
+        raise
+    return part
+
+
+def store_blobs(session, uploads, upload_folder, executor=None, durable=False, reference=True, storage=None):
+    """Store several (FileStorage or part, extension) uploads by content.
+
+    Returns one (filename, size, sha256) per upload, in order. Existing
+    blobs are looked up with one query, files are moved into place on
+    `executor` when given, and all references are added with one statement
+    inside the caller's transaction. The files are in place before the
+    transaction commits, so a failed commit at worst leaves unreferenced
+    blobs that the next identical upload adopts.
+
+    With `durable`, each new file is fsynced before it is moved (in
+    parallel on `executor`) and the upload folder once after all moves.
+    With `reference=False` only the files are stored; the caller adds the
+    references later with reference_blobs(), and each result carries a
+    fourth item, the manifest of a new zip (or None), to pass along. New
+    zips get their manifest stored with the blob row. Files go to
+    `storage`, by default the upload folder itself.
+    """
+    storage = storage or LocalStorage(upload_folder)
+    parts = [_ingest_part(file, upload_folder) for file, _ in uploads]
+
+    hashes = {part.sha256 for part in parts}
+    # An existing blob keeps the name it was first stored under
+    filenames = dict(session.execute(
+        select(Blob.sha256, Blob.filename).where(Blob.sha256.in_(hashes))
+    ).all()) if hashes else {}
+
+    rows = {}
+    placements = []
+    for part, (_, extension) in zip(parts, uploads):
+        sha256 = part.sha256
+        if sha256 not in filenames:
+            filenames[sha256] = f"{sha256}.{extension.lower()}"
+        row = rows.get(sha256)
+        if row is None:
+            rows[sha256] = {
+                'sha256': sha256, 'filename': filenames[sha256], 'size': part.size, 'ref_count': 1, 'manifest': None
+            }
+            placements.append((part, filenames[sha256]))
+        else:
+            # The same content twice in one batch: keep one copy
+            row['ref_count'] += 1
+            if part not in (placed for placed, _ in placements):
+                part.discard()
+
+    if executor is not None and len(placements) > 1:
+        # list() waits for every move and re-raises the first failure
+        moved = list(executor.map(lambda placement: storage.put(*placement, durable), placements))
+    else:
+        moved = [storage.put(part, filename, durable) for part, filename in placements]
+    if durable and any(moved):
+        storage.flush()
+
+    for (part, filename), was_moved in zip(placements, moved):
+        # New project zips are indexed from their central directory right away
+        if was_moved and filename.endswith('.zip'):
+            manifest = read_manifest(storage.local_path(filename))
+            rows[part.sha256]['manifest'] = json.dumps(manifest) if manifest is not None else None
+
+    if not reference:
+        return [(filenames[part.sha256], part.size, part.sha256, rows[part.sha256]['manifest']) for part in parts]
+    if rows:
+        _add_references(session, list(rows.values()))
+    return [(filenames[part.sha256], part.size, part.sha256) for part in parts]
+
+
+def reference_blobs(session, stored):
+    """Add one reference per (filename, size, sha256[, manifest]) returned by store_blobs(reference=False)"""
+    rows = {}
+    for filename, size, sha256, *manifest in stored:
+        row = rows.setdefault(sha256, {'sha256': sha256, 'filename': filename, 'size': size, 'ref_count': 0, 'manifest': None})
+        row['ref_count'] += 1
+        row['manifest'] = row['manifest'] or (manifest[0] if manifest else None)
+    if rows:
+        _add_references(session, list(rows.values()))
+
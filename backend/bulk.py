@@ -0,0 +1,147 @@
+"""
+Bulk submissions: many submissions in one multipart request.
+
+The request carries a `manifest` form field holding a JSON list of
+submissions. Each entry has the same fields as /api/submit and names the
+multipart parts holding its files:
+
+    [{"lumen_name": "...", "prompt_text": "...", "ai_used": "Claude",
+      "ai_agent": "Cursor", "reward_amount": 2.5,
+      "screenshot": "file0", "additional_screenshots": ["file1"]}]
+
+Every entry is validated up front and invalid ones are reported by index.
+The valid ones are stored together: files go through the blob store in one
+batch and the rows are written with a single multi-row INSERT and commit.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import insert
+
+from models import Submission
+from blobs import store_blobs
+from counters import increment_total
+from rollups import record_submissions
+from validation import (
+    SubmissionError, SNIFF_BYTES, validate_fields, validate_file, additional_screenshot_extension, content_matches
+)
+
+# Upper bound on entries per request; MAX_CONTENT_LENGTH still caps the total size
+BULK_MAX_ITEMS = 100
+
+BulkItem = namedtuple('BulkItem', ['index', 'fields', 'file', 'file_type', 'file_ext', 'additional'])
+
+
+def _file_part(files, name):
+    file = files.get(name) if isinstance(name, str) else None
+    if file is None or not file.filename:
+        raise SubmissionError(f"File part '{name}' not found")
+    return file
+
+
+def _head(file):
+    """First SNIFF_BYTES of a file part, leaving its stream where it was"""
+    position = file.stream.tell()
+    head = file.stream.read(SNIFF_BYTES)
+    file.stream.seek(position)
+    return head
+
+
+def _parse_item(index, entry, files):
+    if not isinstance(entry, dict):
+        raise SubmissionError('Each manifest entry must be an object')
+    fields = validate_fields(entry)
+
+    if entry.get('screenshot'):
+        file_type = 'screenshot'
+    elif entry.get('project'):
+        file_type = 'project'
+    else:
+        raise SubmissionError('Either a screenshot or project file is required')
+    file = _file_part(files, entry[file_type])
+    file_ext = validate_file(file, file_type)
+    if not content_matches(file_type, _head(file)):
+        raise SubmissionError('File content does not match its type')
+
+    additional = []
+    names = entry.get('additional_screenshots') or []
+    if not isinstance(names, list):
+        raise SubmissionError('additional_screenshots must be a list of file parts')
+    for name in names:
+        extra = _file_part(files, name)
+        extra_ext = additional_screenshot_extension(extra)
+        # Invalid additional screenshots are skipped, as on /api/submit
+        if extra_ext is not None and content_matches('screenshot', _head(extra)):
+            additional.append((extra, extra_ext))
+
+    return BulkItem(index, fields, file, file_type, file_ext, additional)
+
+
+def parse_manifest(form, files):
+    """Validate a bulk request; returns (items, errors).
+
+    Raises SubmissionError when the manifest itself is unusable; problems
+    with single entries are returned as {'index', 'error'} dicts instead.
+    """
+    raw = form.get('manifest')
+    if not raw:
+        raise SubmissionError('manifest is required')
+    try:
+        manifest = json.loads(raw)
+    except ValueError:
+        raise SubmissionError('manifest must be a JSON list')
+    if not isinstance(manifest, list) or not manifest:
+        raise SubmissionError('manifest must be a non-empty JSON list')
+    if len(manifest) > BULK_MAX_ITEMS:
+        raise SubmissionError(f'A bulk request may contain at most {BULK_MAX_ITEMS} submissions')
+
+    items, errors = [], []
+    for index, entry in enumerate(manifest):
+        try:
+            items.append(_parse_item(index, entry, files))
+        except SubmissionError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return items, errors
+
+
+def create_submissions(session, items, upload_folder, executor=None, durable=False, storage=None):
+    """Store files and insert rows for validated items inside the caller's transaction.
+
+    Returns (ids, screenshots): the new submission ids in item order and,
+    per id, the screenshot filenames to generate thumbnails for.
+    """
+    uploads = []
+    for item in items:
+        uploads.append((item.file, item.file_ext))
+        uploads.extend(item.additional)
+    stored = iter(store_blobs(session, uploads, upload_folder, executor, durable, storage=storage))
+
+    timestamp = datetime.utcnow()
+    rows, screenshots = [], []
+    for item in items:
+        filename = next(stored)[0]
+        additional = [next(stored)[0] for _ in item.additional]
+        rows.append(dict(
+            item.fields,
+            screenshot_path=filename,
+            additional_screenshots=','.join(additional) if additional else None,
+            timestamp=timestamp
+        ))
+        primary = [filename] if item.file_type == 'screenshot' else []
+        screenshots.append(list(dict.fromkeys(primary + additional)))
+
+    return insert_submissions(session, rows), screenshots
+
+
+def insert_submissions(session, rows):
+    """Insert submission rows with their counter and rollup updates; returns ids in row order"""
+    # One multi-row Core INSERT (the ORM bulk path would split the rows by
+    # which values are None). Asking for RETURNING in parameter order would
+    # make SQLite fall back to a statement per row; ids are allocated in
+    # VALUES order, so sorting them restores it instead.
+    table = Submission.__table__
+    ids = sorted(session.execute(insert(table).returning(table.c.id), rows).scalars().all())
+
+    increment_total(session, len(rows))
+    record_submissions(session, [Submission(**row) for row in rows])
+    return ids
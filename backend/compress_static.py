@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Precompress the built frontend for StaticAssets.
+
+Writes gzip and brotli copies of every compressible file in the static
+folder next to the original. Run after each frontend build, before
+starting the server:
+
+    python compress_static.py [static folder]
+
+Fails when the brotli module (in requirements.txt) is missing rather than
+shipping gzip only.
+"""
+import os
+import sys
+
+# Add backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    from staticfiles import compress_static, brotli
+
+    root = sys.argv[1] if len(sys.argv) > 1 else os.environ.get(
+        'STATIC_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static')
+    )
+    if not os.path.isdir(root):
+        print(f"Static folder not found: {root}")
+        return 1
+    if brotli is None:
+        print("The brotli module is not installed (pip install -r requirements.txt)")
+        return 1
+    written = compress_static(root)
+    print(f"Wrote {written} compressed files in {os.path.abspath(root)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Cached row counts and the submissions generation for the listings.
+
+The unfiltered total lives in the `counters` table and is bumped in the
+same transaction as every new submission, so reading it is a primary key
+lookup instead of a COUNT(*). Counts for search queries are cached in
+process for a short TTL.
+
+The generation counter changes whenever submissions change and is what
+public listing ETags are derived from.
+"""
+import hashlib
+import logging
+import threading
+import time
+from sqlalchemy import text, func
+from sqlalchemy.exc import IntegrityError
+
+from models import Counter, Submission
+
+logger = logging.getLogger(__name__)
+
+SUBMISSIONS_TOTAL = 'submissions_total'
+SUBMISSIONS_GENERATION = 'submissions_generation'
+
+
+def _seed_counter(session, name, value):
+    if session.get(Counter, name) is not None:
+        return
+    try:
+        with session.begin_nested():
+            counter = Counter()
+            counter.name = name
+            counter.value = value()
+            session.add(counter)
+        session.commit()
+    except IntegrityError:
+        # Another worker seeded it first
+        session.rollback()
+
+
+def seed_counters(session):
+    """Create the total and generation counters if they do not exist yet"""
+    _seed_counter(session, SUBMISSIONS_TOTAL, lambda: session.query(func.count(Submission.id)).scalar())
+    # Start from the clock so a recreated database never reuses old generations
+    _seed_counter(session, SUBMISSIONS_GENERATION, lambda: int(time.time() * 1000))
+
+
+def increment_total(session, amount=1):
+    """Bump the submissions total and generation inside the caller's transaction"""
+    session.execute(
+        text("UPDATE counters SET value = value + :amount WHERE name = :name"),
+        {'amount': amount, 'name': SUBMISSIONS_TOTAL}
+    )
+    bump_generation(session)
+
+
+def bump_generation(session):
+    """Mark the listings as changed inside the caller's transaction"""
+    session.execute(
+        text("UPDATE counters SET value = value + 1 WHERE name = :name"),
+        {'name': SUBMISSIONS_GENERATION}
+    )
+
+
+def get_total(session):
+    """Return (total, exact) for the unfiltered submissions table"""
+    value = session.query(Counter.value).filter(Counter.name == SUBMISSIONS_TOTAL).scalar()
+    if value is not None:
+        return value, True
+
+    if session.get_bind().dialect.name == 'postgresql':
+        # Planner statistics are free to read and close enough until the counter is seeded
+        estimate = session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'submissions'::regclass")
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate, False
+
+    seed_counters(session)
+    return session.query(Counter.value).filter(Counter.name == SUBMISSIONS_TOTAL).scalar(), True
+
+
+class SearchCountCache:
+    """Per-process TTL cache of result counts keyed by normalized search string"""
+
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(search):
+        return ' '.join(search.lower().split())
+
+    def get(self, search):
+        key = self.normalize(search)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            count, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return count
+
+    def set(self, search, count):
+        key = self.normalize(search)
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                del self._entries[oldest]
+            self._entries[key] = (count, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def count_listing(session, search, count_stmt, params, cache):
+    """Return (total, exact) for a listing without always running COUNT(*)"""
+    if not search:
+        return get_total(session)
+
+    cached = cache.get(search)
+    if cached is not None:
+        # Another worker may have added matching rows since this was computed
+        return cached, False
+
+    count = session.execute(count_stmt, params).scalar()
+    cache.set(search, count)
+    return count, True
+
+
+class GenerationCache:
+    """Per-process copy of the submissions generation.
+
+    The database is read at most once per `ttl` seconds, so conditional
+    requests inside that window are answered without a query. Other workers'
+    submissions become visible within `ttl`; this worker's immediately.
+    """
+
+    def __init__(self, ttl=1.0):
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, session):
+        with self._lock:
+            if self._value is not None and self._expires_at > time.monotonic():
+                return self._value
+        value = session.query(Counter.value).filter(Counter.name == SUBMISSIONS_GENERATION).scalar()
+        if value is None:
+            seed_counters(session)
+            value = session.query(Counter.value).filter(Counter.name == SUBMISSIONS_GENERATION).scalar()
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+def listing_etag(generation, args):
+    """Weak ETag value for a listing response: generation plus normalized query args"""
+    normalized = []
+    for key in sorted(set(args.keys())):
+        value = args.get(key, '')
+        if key == 'search':
+            value = SearchCountCache.normalize(value)
+        normalized.append(f'{key}={value}')
+    digest = hashlib.sha1('&'.join(normalized).encode('utf-8')).hexdigest()[:16]
+    return f'g{generation}-{digest}'
@@ -0,0 +1,180 @@
+"""
+Direct uploads of project zips into the storage bucket.
+
+With the s3 storage backend a client can skip sending a large zip through
+the app: it hashes the file, asks for a pre-signed URL and PUTs the zip
+straight into the bucket.
+
+    GET  /api/uploads/direct    {enabled, max_size}
+    POST /api/uploads/direct    {filename, content_type, size, sha256}
+                                -> {upload_id, filename, url, method, headers}
+
+The URL points at a staging key of its own (.direct/<upload_id>) and is
+bound to the declared size and SHA-256, so the bucket itself rejects
+other bytes (both are verified again when the upload is claimed, for
+servers that do not enforce them). The zip is then submitted with
+`direct_upload=<upload_id>` on /api/submit, which moves the object to its
+content-addressed blob name, or drops it when that blob is already
+stored. A submission can therefore only use a zip its client actually
+uploaded, never an existing blob merely named by its hash, and each
+upload backs one submission.
+
+Like resumable uploads, each client address may have
+RESUMABLE_MAX_PER_CLIENT direct uploads open, and their declared sizes
+count toward RESUMABLE_MAX_PENDING together with the resumable uploads.
+Uploads not submitted within RESUMABLE_TTL hours are deleted with their
+staging objects.
+"""
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func
+from werkzeug.datastructures import FileStorage
+
+from models import db, Blob, DirectUpload, ResumableUpload
+from storage import get_storage
+from validation import SubmissionError, SNIFF_BYTES, validate_file, content_matches
+
+logger = logging.getLogger(__name__)
+
+direct_bp = Blueprint('directupload', __name__)
+
+SHA256 = re.compile(r'[0-9a-f]{64}')
+# Staging objects live under this prefix until they are submitted
+DIRECT_DIR = '.direct'
+
+
+def staging_name(upload_id):
+    return f"{DIRECT_DIR}/{upload_id}"
+
+
+def client_address():
+    """Address the per-client upload limits are counted under.
+
+    Behind TRUSTED_PROXY_HOPS proxies, ProxyFix has already replaced the
+    proxy's address with the client's.
+    """
+    return request.remote_addr
+
+
+def pending_upload_bytes(session):
+    """Bytes declared by all open resumable and direct uploads"""
+    resumable = session.query(func.coalesce(func.sum(ResumableUpload.size), 0)).scalar()
+    direct = session.query(func.coalesce(func.sum(DirectUpload.size), 0)).scalar()
+    return resumable + direct
+
+
+def expire_direct_uploads(session, storage, ttl_hours):
+    """Delete direct uploads (rows and staging objects) older than `ttl_hours`"""
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    expired = session.query(DirectUpload).filter(DirectUpload.created_at < cutoff).all()
+    for upload in expired:
+        storage.delete(staging_name(upload.id))
+        session.delete(upload)
+    if expired:
+        logger.info(f"Expired {len(expired)} direct uploads")
+
+
+def claim_direct_upload(session, storage, upload_id):
+    """(filename, size, sha256) of a zip uploaded to `storage` for a submission.
+
+    The upload row is deleted with the caller's transaction and the object
+    is moved to its blob name right away; the result is referenced like a
+    store_blobs() result. Raises SubmissionError if the upload is unknown,
+    was never completed, is not the declared size, is not a zip or does
+    not hash to its SHA-256.
+    """
+    upload = session.get(DirectUpload, upload_id) if upload_id else None
+    if upload is None:
+        raise SubmissionError('Upload not found. It may have expired; please upload the file again')
+    staged = staging_name(upload.id)
+    size = storage.stat(staged)
+    if size is None:
+        raise SubmissionError('Upload not completed; please upload the file again')
+    if size != upload.size:
+        storage.delete(staged)
+        raise SubmissionError('File size does not match the upload; please upload the file again')
+    if not content_matches('project', storage.read_head(staged, SNIFF_BYTES)):
+        raise SubmissionError('File content does not match a ZIP archive')
+    # The object is about to take a content-addressed name, so its bytes must
+    # hash to it even on a server that ignored the checksum on the upload URL
+    if storage.sha256(staged) != upload.sha256:
+        storage.delete(staged)
+        raise SubmissionError('File content does not match its checksum; please upload the file again')
+
+    # Content stored before under another name keeps that name
+    blob = session.get(Blob, upload.sha256)
+    filename = blob.filename if blob is not None else upload.filename
+    storage.move(staged, filename)
+    session.delete(upload)
+    return filename, size, upload.sha256
+
+
+@direct_bp.route('/uploads/direct', methods=['GET'])
+def direct_upload_options():
+    return jsonify({
+        'enabled': get_storage(current_app).presigned,
+        'max_size': current_app.config['RESUMABLE_MAX_SIZE'],
+    })
+
+
+@direct_bp.route('/uploads/direct', methods=['POST'])
+def create_direct_upload():
+    storage = get_storage(current_app)
+    if not storage.presigned:
+        return jsonify({'error': 'Direct uploads need the s3 storage backend'}), 501
+
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    content_type = data.get('content_type')
+    size = data.get('size')
+    sha256 = str(data.get('sha256') or '').lower()
+
+    try:
+        # Only project zips are uploaded directly
+        extension = validate_file(FileStorage(filename=filename, content_type=content_type), 'project')
+    except SubmissionError as e:
+        return jsonify({'error': str(e)}), 400
+    max_size = current_app.config['RESUMABLE_MAX_SIZE']
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'size must be a positive number of bytes'}), 400
+    if size > max_size:
+        return jsonify({'error': f'File too large. Maximum size is {max_size // (1024 * 1024)}MB'}), 413
+    if SHA256.fullmatch(sha256) is None:
+        return jsonify({'error': 'sha256 must be the hex SHA-256 of the file'}), 400
+
+    expire_direct_uploads(db.session, storage, current_app.config['RESUMABLE_TTL'])
+    client = client_address()
+    open_uploads = db.session.query(func.count(DirectUpload.id)).filter(DirectUpload.client == client).scalar()
+    if open_uploads >= current_app.config['RESUMABLE_MAX_PER_CLIENT']:
+        db.session.commit()
+        return jsonify({'error': 'Too many uploads in progress; submit one first'}), 429
+    if pending_upload_bytes(db.session) + size > current_app.config['RESUMABLE_MAX_PENDING']:
+        db.session.commit()
+        response = jsonify({'error': 'The server is busy with other uploads; please try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '300'
+        return response
+
+    upload = DirectUpload()
+    upload.id = uuid.uuid4().hex
+    upload.client = client
+    upload.filename = f"{sha256}.{extension}"
+    upload.sha256 = sha256
+    upload.size = size
+    db.session.add(upload)
+    db.session.commit()
+
+    url, headers = storage.upload_url(staging_name(upload.id), content_type, size, sha256)
+    response = jsonify({
+        'upload_id': upload.id,
+        'filename': upload.filename,
+        'url': url,
+        'method': 'PUT',
+        'headers': headers,
+        'expires_in': storage.url_expiry,
+    })
+    response.status_code = 201
+    return response
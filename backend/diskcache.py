@@ -0,0 +1,80 @@
+"""
+Size-bounded directories of files that can be recreated on demand.
+
+A DiskCache keeps each directory it is told about under `max_bytes`: once
+a new file pushes the total over the limit, the least recently used files
+are deleted until the directory is back at EVICT_TO of it. Recency is the
+file's access time, which touch() sets explicitly so noatime mounts work;
+the modification time stays put. Hidden files (temporary names) and
+subdirectories are neither counted nor evicted.
+
+Used for resized image variants (variants.py) and for the local copies of
+objects kept by the s3 storage backend (storage.py).
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between access-time updates of a cached file
+TOUCH_INTERVAL = 60
+# Eviction frees space down to this fraction of the limit
+EVICT_TO = 0.9
+
+
+class DiskCache:
+    """Least-recently-used eviction for directories of cached files"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def touch(self, path, stat=None):
+        """Mark a cached file as used"""
+        stat = stat or os.stat(path)
+        now = time.time()
+        if now - stat.st_atime > TOUCH_INTERVAL:
+            os.utime(path, (now, stat.st_mtime))
+
+    def added(self, directory, name, size):
+        """Count a new file of `size` bytes in `directory`, evicting others if needed"""
+        with self._lock:
+            total = self._totals.get(directory)
+            if total is None:
+                total = sum(size for _, size, _ in self._scan(directory))
+            else:
+                total += size
+            if total > self.max_bytes:
+                # Other processes share the directory, so evict from a fresh listing
+                total = self._evict(directory, keep=name)
+            self._totals[directory] = total
+
+    def _scan(self, directory):
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith('.'):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.name))
+        return entries
+
+    def _evict(self, directory, keep):
+        entries = sorted(self._scan(directory))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            if name == keep:
+                continue
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        logger.info(f"Evicted {removed} cached files from {directory}, {total} bytes cached")
+        return total
@@ -0,0 +1,67 @@
+"""
+Sending uploaded files.
+
+By default files are sent by Flask's send_file, which answers conditional
+requests (304) and single byte ranges (206 Partial Content) itself.
+
+With UPLOAD_OFFLOAD set, the worker only answers conditional requests and
+otherwise returns the headers plus a pointer to the file. The front-end
+server then streams the bytes and applies any Range, so a large zip
+download does not hold a worker:
+
+    x-accel     nginx: X-Accel-Redirect: <UPLOAD_ACCEL_PREFIX><filename>,
+                served from an `internal` location aliasing UPLOAD_FOLDER
+    x-sendfile  Apache mod_xsendfile or lighttpd: X-Sendfile: <absolute path>
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+from zlib import adler32
+from flask import Response, request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+OFFLOAD_MODES = ('x-accel', 'x-sendfile')
+
+
+def _offloaded(upload_folder, filename, etag, max_age, offload, accel_prefix):
+    path = safe_join(os.path.abspath(upload_folder), filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    stat = os.stat(path)
+
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.last_modified = stat.st_mtime
+    if isinstance(etag, str):
+        response.set_etag(etag)
+    else:
+        # Same validator send_file would compute, so switching modes keeps caches valid
+        check = adler32(path.encode('utf-8')) & 0xFFFFFFFF
+        response.set_etag(f"{stat.st_mtime}-{stat.st_size}-{check}")
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    response.headers['Accept-Ranges'] = 'bytes'
+
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    # The front-end server fills in the body and its length
+    del response.headers['Content-Length']
+    if offload == 'x-accel':
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(filename)}"
+    else:
+        response.headers['X-Sendfile'] = path
+    return response
+
+
+def send_upload(upload_folder, filename, etag=True, max_age=None, offload=None, accel_prefix='/protected-uploads/'):
+    """Response for one file in `upload_folder`; raises NotFound if it is missing.
+
+    `etag` is a strong ETag to use or True to derive one from the file,
+    `offload` one of OFFLOAD_MODES or None to send the bytes from here.
+    """
+    if offload is None:
+        return send_from_directory(upload_folder, filename, max_age=max_age, etag=etag)
+    return _offloaded(upload_folder, filename, etag, max_age, offload, accel_prefix)
@@ -0,0 +1,80 @@
+"""
+Streaming export of submissions as CSV or NDJSON.
+
+Rows are read through a server-side cursor (`yield_per`) and written to
+the response as they arrive, so memory use does not grow with the size
+of the table. CSV cells that a spreadsheet would evaluate as a formula
+are prefixed with a quote.
+"""
+import csv
+import io
+import json
+from sqlalchemy import select
+
+from models import Submission, SUBMISSION_FIELDS
+from search import search_mode, search_params, apply_search
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+# Rows fetched per round trip and written per response chunk
+EXPORT_BATCH_SIZE = 500
+# Leading characters that make spreadsheet applications evaluate a cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_query(session, search, search_backend):
+    """All submissions (optionally filtered) in id order, streamed from the database"""
+    mode = search_mode(search, search_backend)
+    stmt = select(Submission)
+    if mode:
+        stmt, _ = apply_search(stmt, mode)
+    stmt = stmt.order_by(Submission.id.asc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return session.execute(stmt, search_params(mode, search)).scalars()
+
+
+def csv_cell(value):
+    """A CSV cell that spreadsheets show as text rather than run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def generate_csv(query):
+    """Yield the export as CSV text, one chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SUBMISSION_FIELDS)
+
+    for i, submission in enumerate(query, start=1):
+        row = submission.to_dict()
+        row['additional_screenshots'] = ','.join(row['additional_screenshots'])
+        row['thumbnails'] = json.dumps(row['thumbnails']) if row['thumbnails'] else ''
+        writer.writerow([csv_cell(row[field]) for field in SUBMISSION_FIELDS])
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def generate_ndjson(query):
+    """Yield the export as newline-delimited JSON, one chunk per batch of rows"""
+    lines = []
+    for submission in query:
+        lines.append(json.dumps(submission.to_dict()))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def generate_export(session, export_format, search, search_backend):
+    query = export_query(session, search, search_backend)
+    if export_format == 'ndjson':
+        return generate_ndjson(query)
+    return generate_csv(query)
@@ -0,0 +1,71 @@
+"""
+Idempotency keys for /api/submit.
+
+A client sends the same `Idempotency-Key` header with every retry of one
+submission. The first successful response is stored under the key, in the
+same transaction as the submission itself, together with a fingerprint of
+its text fields (which include a `project_upload` or `direct_upload`
+reference). The fields arrive ahead of the files, so a retry within
+IDEMPOTENCY_TTL hours gets that response back as soon as its first file
+part starts: the files are never received onto disk and nothing is stored
+again. A different submission sent with the key is refused with 422.
+Failed attempts store nothing, so they can be retried with the same key.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+
+from models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def idempotency_key(headers):
+    """The request's key, or None when it has none.
+
+    Raises ValueError for a key that cannot be stored.
+    """
+    key = headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters')
+    return key
+
+
+class SubmissionReplayed(Exception):
+    """Raised while a retry's body is parsed to answer it with the stored response"""
+
+    def __init__(self, response):
+        super().__init__('Replayed')
+        self.response = response
+
+
+def request_fingerprint(fields):
+    """SHA-256 over a submission's (name, value) text fields"""
+    return hashlib.sha256(json.dumps(sorted(fields)).encode('utf-8')).hexdigest()
+
+
+def find_response(session, key, ttl_hours):
+    """(status_code, body, request_hash) stored for `key`, or None if it is unknown or expired"""
+    row = session.get(IdempotencyKey, key)
+    if row is None or row.created_at < datetime.utcnow() - timedelta(hours=ttl_hours):
+        return None
+    return row.status_code, json.loads(row.response), row.request_hash
+
+
+def record_response(session, key, status_code, body, ttl_hours, request_hash=None):
+    """Store the response for `key` inside the caller's transaction.
+
+    Expired keys are deleted first, so an old key can be reused and the
+    table only holds the last TTL's worth of submissions.
+    """
+    session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - timedelta(hours=ttl_hours))
+    )
+    session.add(IdempotencyKey(
+        key=key, status_code=status_code, response=json.dumps(body), request_hash=request_hash
+    ))
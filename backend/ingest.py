@@ -0,0 +1,275 @@
+"""
+Single-pass ingest of uploaded files.
+
+Werkzeug normally spools each multipart file part to an anonymous temp
+file, the view then copies it into UPLOAD_FOLDER with FileStorage.save()
+and finally re-stats it for the size. IngestRequest instead streams every
+file part straight into UPLOAD_FOLDER/.incoming while hashing and counting
+it, and save_upload() renames the finished part to its final name, which
+costs no extra copy on the same filesystem.
+
+A request can also be given a precheck (see validation.SubmissionPrecheck)
+that sees each file part as it starts and its first bytes as they arrive.
+A failed check raises SubmissionRejected from inside the parser, so an
+invalid submission stops being read at that point instead of after the
+whole body has been received.
+"""
+import hashlib
+import os
+import tempfile
+from flask import Request, current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest
+from werkzeug.formparser import FormDataParser, MultiPartParser
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from validation import SubmissionError, SNIFF_BYTES
+
+# Parts still being received or awaiting a rename live here; basename-only
+# serving from /uploads can never reach them
+INCOMING_DIR = '.incoming'
+
+
+def incoming_dir(upload_folder):
+    path = os.path.join(upload_folder, INCOMING_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class IngestPart:
+    """Writable/readable temp file that hashes and counts bytes as they are written"""
+
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(prefix='part-', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # read/seek/tell/flush/close etc. go straight to the underlying file
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def sync(self):
+        """Flush the received bytes to disk"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def commit(self, destination):
+        """Move the received bytes to `destination` without copying them"""
+        self._file.flush()
+        self._file.close()
+        os.replace(self.path, destination)
+        self.committed = True
+
+    def discard(self):
+        """Drop the temp file unless it was committed"""
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def fsync_directory(path):
+    """Persist renames into `path`; a no-op where directories cannot be synced"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SubmissionRejected(BadRequest):
+    """Raised while parsing when a precheck fails.
+
+    Werkzeug treats ValueErrors from the parser as malformed input and
+    returns an empty form, so the rejection has to be an HTTPException.
+    """
+
+
+def _discard_data(data):
+    pass
+
+
+class PrecheckMultiPartParser(MultiPartParser):
+    """MultiPartParser that runs a precheck on file parts while they stream in.
+
+    The event loop mirrors Werkzeug's MultiPartParser.parse, adding the
+    precheck calls; parts the precheck drops are read but never stored.
+    """
+
+    def __init__(self, precheck, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.precheck = precheck
+
+    def _check(self, check, *args):
+        try:
+            return check(*args)
+        except SubmissionError as e:
+            raise SubmissionRejected(str(e))
+
+    def parse(self, stream, boundary, content_length):
+        parser = MultipartDecoder(
+            boundary,
+            max_form_memory_size=self.max_form_memory_size,
+            max_parts=self.max_form_parts,
+        )
+
+        fields = []
+        files = []
+        current_part = container = _write = None
+        head = None  # First bytes of the current file part, until it has been sniffed
+
+        while True:
+            data = stream.read(self.buffer_size)
+            # An empty read ends the body; None tells the decoder so
+            parser.receive_data(data or None)
+            event = parser.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    current_part = event
+                    container = []
+                    _write = container.append
+                elif isinstance(event, File):
+                    current_part = event
+                    keep = self._check(
+                        self.precheck.file_started, fields, event.name, event.filename,
+                        event.headers.get('content-type')
+                    )
+                    if keep:
+                        container = self.start_file_streaming(event, content_length)
+                        _write = container.write
+                        head = b''
+                    else:
+                        container = None
+                        _write = _discard_data
+                        head = None
+                elif isinstance(event, Data):
+                    if head is not None:
+                        head += event.data[:SNIFF_BYTES - len(head)]
+                        if len(head) >= SNIFF_BYTES or not event.more_data:
+                            keep = self._check(
+                                self.precheck.file_head, current_part.name, current_part.filename, head
+                            )
+                            head = None
+                            if not keep:
+                                # The part already created is removed when the request closes
+                                container = None
+                                _write = _discard_data
+                    _write(event.data)
+                    if not event.more_data:
+                        if isinstance(current_part, Field):
+                            value = b"".join(container).decode(
+                                self.get_part_charset(current_part.headers), self.errors
+                            )
+                            fields.append((current_part.name, value))
+                        elif container is not None:
+                            container.seek(0)
+                            files.append((
+                                current_part.name,
+                                FileStorage(
+                                    container,
+                                    current_part.filename,
+                                    current_part.name,
+                                    headers=current_part.headers,
+                                ),
+                            ))
+
+                event = parser.next_event()
+            if not data:
+                break
+
+        return self.cls(fields), self.cls(files)
+
+
+class PrecheckFormDataParser(FormDataParser):
+    """FormDataParser that uses PrecheckMultiPartParser when a precheck is set"""
+
+    precheck = None
+
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        if self.precheck is None:
+            return super()._parse_multipart(stream, mimetype, content_length, options)
+
+        parser = PrecheckMultiPartParser(
+            self.precheck,
+            stream_factory=self.stream_factory,
+            max_form_memory_size=self.max_form_memory_size,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+        )
+        boundary = options.get("boundary", "").encode("ascii")
+
+        if not boundary:
+            raise ValueError("Missing boundary")
+
+        form, files = parser.parse(stream, boundary, content_length)
+        return stream, form, files
+
+
+class IngestRequest(Request):
+    """Request whose multipart file parts are written directly into the upload folder"""
+
+    form_data_parser_class = PrecheckFormDataParser
+
+    def set_precheck(self, precheck):
+        """Check file parts with `precheck` while the form is parsed"""
+        self.__dict__['_precheck'] = precheck
+
+    def make_form_data_parser(self):
+        parser = super().make_form_data_parser()
+        parser.precheck = self.__dict__.get('_precheck')
+        return parser
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        part = IngestPart(incoming_dir(current_app.config['UPLOAD_FOLDER']))
+        self.__dict__.setdefault('_ingest_parts', []).append(part)
+        return part
+
+    def close(self):
+        super().close()
+        # Parts that were never saved (rejected or invalid requests) are removed
+        for part in self.__dict__.pop('_ingest_parts', []):
+            part.discard()
+
+
+def save_upload(file, destination):
+    """Store an uploaded FileStorage at `destination`; returns (size, sha256)"""
+    stream = file.stream
+    if isinstance(stream, IngestPart):
+        stream.commit(destination)
+        return stream.size, stream.sha256
+
+    # Parts that did not come through IngestRequest: copy while hashing
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    with open(destination, 'wb') as out:
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
@@ -0,0 +1,168 @@
+"""
+Shared query builder for the submission listing endpoints.
+
+Both /api/submissions and /api/public/submissions parse their arguments
+with parse_listing_args() and run them with run_listing(). Statements are
+built once per query shape (sort, order, fields, search mode, cursor kind)
+with every user-supplied value as a bind parameter, and the built select()
+objects are memoized. Repeat requests therefore skip statement construction,
+reuse the memoized cache key and hit SQLAlchemy's compiled cache.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from math import ceil
+from sqlalchemy import select, func, bindparam
+
+from models import Submission
+from pagination import (
+    normalize_sort, order_by_clause, keyset_filter, encode_cursor, decode_cursor, InvalidCursor
+)
+from projection import parse_fields, apply_projection, InvalidFields
+from search import search_mode, search_params, apply_search, RANKED_MODES
+from counters import count_listing
+
+DEFAULT_PER_PAGE = 10
+MAX_PER_PAGE = 100
+# Per page used when a non-positive per_page is requested
+FALLBACK_PER_PAGE = 20
+
+ListingArgs = namedtuple('ListingArgs', [
+    'page', 'per_page', 'search', 'mode', 'sort_by', 'order', 'cursor', 'fields', 'summary'
+])
+
+
+class ListingError(ValueError):
+    """Raised for listing arguments that should produce a 400 response"""
+
+
+def parse_listing_args(args, search_backend):
+    """Normalize the query string of a listing request"""
+    page = max(args.get('page', 1, type=int), 1)
+    per_page = args.get('per_page', DEFAULT_PER_PAGE, type=int)
+    per_page = min(per_page, MAX_PER_PAGE)  # Limit max items per page
+    if per_page < 1:
+        per_page = FALLBACK_PER_PAGE
+
+    search = args.get('search', '').strip()
+    mode = search_mode(search, search_backend)
+    cursor = args.get('cursor')
+    # Searches are ranked by relevance unless another sort is requested;
+    # cursor pages cannot resume a ranking, so they keep the timestamp sort
+    default_sort = 'relevance' if search and cursor is None else 'timestamp'
+    sort_by = args.get('sort_by', default_sort)
+    order = args.get('order', 'desc')
+    if sort_by != 'relevance' or mode not in RANKED_MODES:
+        sort_by, order = normalize_sort(sort_by, order)
+
+    if cursor is not None and sort_by == 'relevance':
+        raise ListingError('Cursor pagination is not available when sorting by relevance')
+
+    try:
+        fields, summary = parse_fields(args.get('fields'))
+    except InvalidFields as e:
+        raise ListingError(str(e))
+
+    return ListingArgs(
+        page, per_page, search, mode, sort_by, order, cursor,
+        tuple(fields) if fields is not None else None, summary
+    )
+
+
+@lru_cache(maxsize=256)
+def listing_statement(sort_by, order, fields, summary, mode, keyset, dialect_name):
+    """Build the SELECT for one listing shape; values are bound at execution.
+
+    `keyset` is None for offset pages, 'value' or 'null' for cursor pages
+    resuming after a non-NULL or NULL sort value.
+    """
+    stmt = select(Submission)
+    projection_sort = 'timestamp' if sort_by == 'relevance' else sort_by
+    stmt = apply_projection(stmt, list(fields) if fields is not None else None, summary, projection_sort)
+
+    rank_order = None
+    if mode:
+        stmt, rank_order = apply_search(stmt, mode)
+
+    if sort_by == 'relevance':
+        stmt = stmt.order_by(*rank_order, Submission.id.desc())
+    else:
+        if keyset == 'value':
+            stmt = stmt.where(keyset_filter(
+                sort_by, order, bindparam('cursor_value'), bindparam('cursor_id'), dialect_name
+            ))
+        elif keyset == 'null':
+            stmt = stmt.where(keyset_filter(sort_by, order, None, bindparam('cursor_id'), dialect_name))
+        # Submission.id keeps the order stable between pages
+        stmt = stmt.order_by(*order_by_clause(sort_by, order))
+
+    return stmt.limit(bindparam('limit')).offset(bindparam('offset'))
+
+
+@lru_cache(maxsize=8)
+def count_statement(mode):
+    """COUNT(*) over the rows matching a search mode"""
+    stmt = select(func.count()).select_from(Submission)
+    if mode:
+        stmt, _ = apply_search(stmt, mode)
+    return stmt
+
+
+def run_listing(session, listing, search_counts):
+    """Execute a parsed listing request and return the response payload"""
+    dialect_name = session.get_bind().dialect.name
+    params = search_params(listing.mode, listing.search)
+    fields = list(listing.fields) if listing.fields is not None else None
+
+    # Cursor mode: keyset pagination on (sort column, id), no OFFSET or COUNT(*)
+    if listing.cursor is not None:
+        keyset = None
+        if listing.cursor:
+            try:
+                value, last_id = decode_cursor(listing.cursor, listing.sort_by, listing.order)
+            except InvalidCursor as e:
+                raise ListingError(str(e))
+            keyset = 'null' if value is None else 'value'
+            params.update(cursor_value=value, cursor_id=last_id)
+
+        stmt = listing_statement(
+            listing.sort_by, listing.order, listing.fields, listing.summary, listing.mode, keyset, dialect_name
+        )
+        # Fetch one extra row to learn whether another page exists without a COUNT(*)
+        params.update(limit=listing.per_page + 1, offset=0)
+        rows = session.execute(stmt, params).scalars().all()
+        items = rows[:listing.per_page]
+        next_cursor = None
+        if len(rows) > listing.per_page:
+            next_cursor = encode_cursor(listing.sort_by, listing.order, items[-1])
+
+        return {
+            'submissions': [sub.to_dict(fields) for sub in items],
+            'pagination': {
+                'per_page': listing.per_page,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+        }
+
+    stmt = listing_statement(
+        listing.sort_by, listing.order, listing.fields, listing.summary, listing.mode, None, dialect_name
+    )
+    items = session.execute(stmt, dict(
+        params, limit=listing.per_page, offset=(listing.page - 1) * listing.per_page
+    )).scalars().all()
+
+    # The total comes from the count cache instead of COUNT(*)
+    total, total_exact = count_listing(
+        session, listing.search, count_statement(listing.mode), params, search_counts
+    )
+
+    return {
+        'submissions': [sub.to_dict(fields) for sub in items],
+        'pagination': {
+            'page': listing.page,
+            'pages': ceil(total / listing.per_page) if total else 0,
+            'per_page': listing.per_page,
+            'total': total,
+            'total_exact': total_exact
+        }
+    }
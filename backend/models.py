@@ -1,13 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import query_expression
 from datetime import datetime
+import json
+import os
 
 db = SQLAlchemy()
 
+# Fields returned by Submission.to_dict(), in response order
+SUBMISSION_FIELDS = [
+    'id', 'lumen_name', 'prompt_text', 'ai_used', 'ai_agent', 'reward_amount',
+    'screenshot_path', 'additional_screenshots', 'thumbnails', 'timestamp'
+]
+# Characters of prompt_text returned by the "summary" projection
+SUMMARY_PROMPT_LENGTH = 200
+
 class Submission(db.Model):
     __tablename__ = 'submissions'
     
     id = db.Column(db.Integer, primary_key=True)
-    lumen_name = db.Column(db.String(100), nullable=False, index=True)
+    lumen_name = db.Column(db.String(100), nullable=False)
     prompt_text = db.Column(db.Text, nullable=False)
     ai_used = db.Column(db.String(50), nullable=False, index=True)
     ai_agent = db.Column(db.String(50), nullable=True)  # New field for AI agent
@@ -16,44 +27,67 @@ class Submission(db.Model):
     # New field to store additional screenshot paths (comma-separated)
     # Make it nullable to avoid issues with existing records
     additional_screenshots = db.Column(db.Text, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # JSON {screenshot filename: {width: thumbnail filename}}, filled in by the thumbnail worker
+    thumbnails = db.Column(db.Text, nullable=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Truncated prompt_text, only populated by the summary listing projection
+    prompt_preview = query_expression()
     
     # Add validation constraints
+    # One (sort column, id) index per listing sort so ORDER BY ... id and the
+    # keyset range predicates are answered from the index instead of a sort
     __table_args__ = (
         db.CheckConstraint('reward_amount >= 0', name='check_reward_amount_positive'),
+        db.Index('ix_submissions_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_submissions_reward_amount_id', 'reward_amount', 'id'),
+        db.Index('ix_submissions_lumen_name_id', 'lumen_name', 'id'),
+        db.Index('ix_submissions_ai_agent_id', 'ai_agent', 'id'),
     )
     
     def __repr__(self):
         return f'<Submission {self.lumen_name}>'
     
-    def to_dict(self):
-        # Parse additional screenshots if they exist
-        additional_screenshots_list = []
-        if self.additional_screenshots:
-            # Handle both string and potential list types
-            if isinstance(self.additional_screenshots, str):
-                additional_screenshots_list = [s.strip() for s in self.additional_screenshots.split(',') if s.strip()]
-            elif isinstance(self.additional_screenshots, list):
-                additional_screenshots_list = self.additional_screenshots
+    def to_dict(self, fields=None):
+        """Serialize the submission, limited to `fields` when given.
         
-        # Extract just the filename from the full path for URLs
-        import os
-        screenshot_filename = os.path.basename(self.screenshot_path) if self.screenshot_path else None
-        additional_screenshots_filenames = [
-            os.path.basename(path) for path in additional_screenshots_list
-        ] if additional_screenshots_list else []
+        Only the attributes behind the requested fields are touched, so
+        columns left unloaded by a projection are never fetched.
+        """
+        if fields is None:
+            fields = SUBMISSION_FIELDS
         
-        return {
-            'id': self.id,
-            'lumen_name': self.lumen_name,
-            'prompt_text': self.prompt_text,
-            'ai_used': self.ai_used,
-            'ai_agent': self.ai_agent,  # Include new field
-            'reward_amount': self.reward_amount,
-            'screenshot_path': screenshot_filename,
-            'additional_screenshots': additional_screenshots_filenames,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
-        }
+        result = {}
+        for field in fields:
+            if field == 'prompt_text' and self.prompt_preview is not None:
+                # Summary projection: the query only fetched the start of prompt_text
+                limit = SUMMARY_PROMPT_LENGTH
+                result['prompt_text'] = self.prompt_preview[:limit]
+                result['prompt_truncated'] = len(self.prompt_preview) > limit
+            elif field == 'screenshot_path':
+                # Extract just the filename from the full path for URLs
+                result['screenshot_path'] = os.path.basename(self.screenshot_path) if self.screenshot_path else None
+            elif field == 'additional_screenshots':
+                result['additional_screenshots'] = [
+                    os.path.basename(path) for path in self.additional_screenshots_list()
+                ]
+            elif field == 'thumbnails':
+                result['thumbnails'] = json.loads(self.thumbnails) if self.thumbnails else {}
+            elif field == 'timestamp':
+                result['timestamp'] = self.timestamp.isoformat() if self.timestamp else None
+            else:
+                result[field] = getattr(self, field)
+        return result
+    
+    def additional_screenshots_list(self):
+        """Parse additional screenshots if they exist"""
+        if not self.additional_screenshots:
+            return []
+        # Handle both string and potential list types
+        if isinstance(self.additional_screenshots, str):
+            return [s.strip() for s in self.additional_screenshots.split(',') if s.strip()]
+        if isinstance(self.additional_screenshots, list):
+            return self.additional_screenshots
+        return []
 
 class AdminUser(db.Model):
     __tablename__ = 'admin_users'
@@ -63,4 +97,101 @@ class AdminUser(db.Model):
     password_hash = db.Column(db.String(120), nullable=False)
     
     def __repr__(self):
-        return f'<AdminUser {self.username}>'
\ No newline at end of file
+        return f'<AdminUser {self.username}>'
+
+class Counter(db.Model):
+    __tablename__ = 'counters'
+    
+    # Named counters maintained in the same transaction as the rows they count
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<Counter {self.name}={self.value}>'
+
+
+class SubmissionRollup(db.Model):
+    __tablename__ = 'submission_rollups'
+    
+    # One row per day x ai_used x ai_agent, updated in the submitting transaction
+    day = db.Column(db.Date, primary_key=True)
+    ai_used = db.Column(db.String(50), primary_key=True)
+    ai_agent = db.Column(db.String(50), primary_key=True, default='')  # '' when no agent was given
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    reward_total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<SubmissionRollup {self.day} {self.ai_used}/{self.ai_agent}>'
+
+
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    
+    # One stored upload per distinct content; submissions reference it by filename
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(200), unique=True, nullable=False)  # <sha256>.<ext> in UPLOAD_FOLDER
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    manifest = db.Column(db.Text, nullable=True)  # JSON member list of a zip, see zipindex.py
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<Blob {self.filename} refs={self.ref_count}>'
+
+
+class ResumableUpload(db.Model):
+    __tablename__ = 'resumable_uploads'
+    
+    # A project zip sent in chunks; the bytes received so far live in
+    # UPLOAD_FOLDER/.resumable/<id> and the file's size is the upload offset
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=True)  # Set once the upload is finalized
+    client = db.Column(db.String(64), nullable=True, index=True)  # Address that created it, for the per-client limit
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ResumableUpload {self.id} {self.filename}>'
+
+class DirectUpload(db.Model):
+    __tablename__ = 'direct_uploads'
+    
+    # A project zip the client PUTs into the storage bucket under a staging
+    # key; submitting it moves the object to its blob name (see directupload.py)
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)  # Blob name, <sha256>.zip
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    client = db.Column(db.String(64), nullable=True, index=True)  # Address that created it, for the per-client limit
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<DirectUpload {self.id} {self.filename}>'
+
+class SubmissionReceipt(db.Model):
+    __tablename__ = 'submission_receipts'
+    
+    # Receipt handed out for a write-behind submission, written in the same
+    # transaction as the submission it became
+    receipt_id = db.Column(db.String(32), primary_key=True)
+    submission_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # For expiry
+    
+    def __repr__(self):
+        return f'<SubmissionReceipt {self.receipt_id} {self.submission_id}>'
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # Response of the first successful /api/submit sent with this
+    # Idempotency-Key, returned again to retries until it expires
+    key = db.Column(db.String(255), primary_key=True)
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False)  # JSON body
+    request_hash = db.Column(db.String(64), nullable=True)  # request_fingerprint() of the submission
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
@@ -0,0 +1,116 @@
+"""
+Keyset (cursor) pagination helpers for the submission listing endpoints.
+
+A cursor encodes the sort column value and the id of the last row on the
+previous page, so the next page is fetched with a range predicate on the
+(sort column, id) pair instead of an OFFSET scan.
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+from models import Submission
+
+# Columns the listing endpoints can be sorted by
+SORT_COLUMNS = {
+    'timestamp': Submission.timestamp,
+    'reward_amount': Submission.reward_amount,
+    'lumen_name': Submission.lumen_name,
+    'ai_agent': Submission.ai_agent,
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or does not match the query"""
+
+
+def normalize_sort(sort_by, order):
+    """Map raw query args onto a supported sort column and direction"""
+    if sort_by not in SORT_COLUMNS:
+        sort_by = 'timestamp'
+    order = 'asc' if order == 'asc' else 'desc'
+    return sort_by, order
+
+
+def order_by_clause(sort_by, order):
+    """ORDER BY for a sort, with Submission.id as a stable tiebreaker"""
+    column = SORT_COLUMNS[sort_by]
+    if order == 'asc':
+        return [column.asc(), Submission.id.asc()]
+    return [column.desc(), Submission.id.desc()]
+
+
+def encode_cursor(sort_by, order, submission):
+    """Build the opaque cursor pointing just after the given row"""
+    value = getattr(submission, sort_by)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {'s': sort_by, 'o': order, 'v': value, 'id': submission.id}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort_by, order):
+    """Return the (value, id) pair stored in a cursor for this sort"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value = payload['v']
+        last_id = int(payload['id'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if payload.get('s') != sort_by or payload.get('o') != order:
+        raise InvalidCursor('Cursor does not match the requested sort_by/order')
+
+    if value is not None:
+        # The value is bound against the sort column, so it must have its type
+        if sort_by == 'timestamp':
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise InvalidCursor('Invalid cursor')
+        elif sort_by == 'reward_amount':
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise InvalidCursor('Invalid cursor')
+        elif not isinstance(value, str):
+            raise InvalidCursor('Invalid cursor')
+
+    return value, last_id
+
+
+def nulls_sort_low(dialect_name):
+    """Whether NULL sorts before every other value in ascending order"""
+    # PostgreSQL treats NULL as larger than any value; SQLite and MySQL as smaller
+    return dialect_name != 'postgresql'
+
+
+def keyset_filter(sort_by, order, value, last_id, dialect_name):
+    """Predicate selecting the rows that come after (value, last_id)"""
+    column = SORT_COLUMNS[sort_by]
+    ascending = order == 'asc'
+
+    if ascending:
+        id_after = Submission.id > last_id
+    else:
+        id_after = Submission.id < last_id
+
+    # Whether NULL values are visited after all non-NULL values for this direction
+    nulls_after = ascending != nulls_sort_low(dialect_name)
+
+    if value is None:
+        ties = and_(column.is_(None), id_after)
+        if nulls_after:
+            return ties
+        return or_(ties, column.isnot(None))
+
+    if ascending:
+        after = and_(column >= value, or_(column > value, id_after))
+    else:
+        after = and_(column <= value, or_(column < value, id_after))
+
+    if Submission.__table__.c[sort_by].nullable and nulls_after:
+        return or_(after, column.is_(None))
+    return after
+
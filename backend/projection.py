@@ -0,0 +1,55 @@
+"""
+Sparse fieldsets for the submission listings.
+
+`fields=` selects which Submission fields are returned. The query loads
+only the matching columns (anything else raises instead of lazy loading),
+and the "summary" preset swaps prompt_text for a server-side prefix so
+large prompts are never read from the database in full.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import load_only, with_expression
+
+from models import Submission, SUBMISSION_FIELDS, SUMMARY_PROMPT_LENGTH
+
+SUMMARY = 'summary'
+
+
+class InvalidFields(ValueError):
+    """Raised when `fields=` names something Submission.to_dict() cannot return"""
+
+
+def parse_fields(raw):
+    """Return (fields, summary) for a `fields=` argument; (None, False) means everything"""
+    if raw is None or not raw.strip():
+        return None, False
+    if raw.strip() == SUMMARY:
+        return list(SUBMISSION_FIELDS), True
+
+    requested = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in SUBMISSION_FIELDS]
+    if unknown:
+        raise InvalidFields(
+            f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SUBMISSION_FIELDS)} or {SUMMARY}"
+        )
+    # Clients always get the id so rows stay addressable; keep to_dict() ordering
+    requested = set(requested) | {'id'}
+    return [field for field in SUBMISSION_FIELDS if field in requested], False
+
+
+def apply_projection(query, fields, summary, sort_by):
+    """Restrict a Submission query to the columns needed for `fields` and the sort"""
+    if fields is None:
+        return query
+
+    # The sort column is needed to build the next cursor even when not returned
+    names = set(fields) | {sort_by}
+
+    if summary:
+        names.discard('prompt_text')
+        # One extra character tells to_dict() whether the prompt was cut short
+        query = query.options(with_expression(
+            Submission.prompt_preview,
+            func.substr(Submission.prompt_text, 1, SUMMARY_PROMPT_LENGTH + 1)
+        ))
+
+    return query.options(load_only(*(getattr(Submission, name) for name in names), raiseload=True))
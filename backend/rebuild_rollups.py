@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the submission_rollups table from the submissions table.
+Run once after deploying the rollups to backfill existing data, or any
+time the stats look out of step with the submissions.
+"""
+import os
+import sys
+import logging
+from dotenv import load_dotenv
+
+# Add backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Recompute every rollup row"""
+    from app import create_app
+    from models import db
+    from rollups import rebuild_rollups
+
+    app = create_app()
+
+    with app.app_context():
+        try:
+            rows = rebuild_rollups(db.session)
+            print(f"Rollups rebuilt successfully ({rows} rows)")
+            return 0
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error rebuilding rollups: {e}")
+            logger.exception("Full traceback:")
+            print(f"Error rebuilding rollups: {e}")
+            return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Resumable chunked uploads for large project zips.
+
+A client creates an upload, PUTs the zip in chunks and finalizes it:
+
+    POST   /api/uploads                {filename, size, content_type}
+    GET    /api/uploads/<id>           current offset (resume point)
+    PUT    /api/uploads/<id>           chunk body, Upload-Offset header
+    POST   /api/uploads/<id>/finalize  optional {sha256} to verify
+    DELETE /api/uploads/<id>           abandon the upload
+
+Chunks are appended to UPLOAD_FOLDER/.resumable/<id>, whose size is the
+offset, so a transfer that fails mid-chunk resumes from the last byte the
+server wrote. A finalized upload is then submitted with
+`project_upload=<id>` on /api/submit, which moves it into the blob store.
+
+The endpoints are unauthenticated, so the disk they can claim is bounded:
+each client address may have RESUMABLE_MAX_PER_CLIENT uploads open, and
+all open uploads together (direct uploads included) may declare at most
+RESUMABLE_MAX_PENDING bytes. Uploads that are not submitted within RESUMABLE_TTL hours are
+removed by an UploadReaper thread every RESUMABLE_EXPIRY_INTERVAL
+seconds (and whenever an upload is created).
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func
+from werkzeug.datastructures import FileStorage
+
+from models import db, ResumableUpload
+from directupload import client_address, expire_direct_uploads, pending_upload_bytes
+from storage import get_storage
+from validation import SubmissionError, SNIFF_BYTES, validate_file, content_matches
+
+logger = logging.getLogger(__name__)
+
+resumable_bp = Blueprint('resumable', __name__)
+
+RESUMABLE_DIR = '.resumable'
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+def upload_path(upload_folder, upload_id):
+    directory = os.path.join(upload_folder, RESUMABLE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, upload_id)
+
+
+def _offset(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _status(upload, path):
+    return {
+        'upload_id': upload.id,
+        'offset': _offset(path),
+        'size': upload.size,
+        'complete': upload.sha256 is not None,
+        'chunk_size': current_app.config['RESUMABLE_CHUNK_SIZE']
+    }
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def expire_uploads(session, upload_folder, ttl_hours):
+    """Delete uploads (rows and partial files) older than `ttl_hours`"""
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    expired = session.query(ResumableUpload).filter(ResumableUpload.created_at < cutoff).all()
+    for upload in expired:
+        _remove(upload_path(upload_folder, upload.id))
+        session.delete(upload)
+    if expired:
+        logger.info(f"Expired {len(expired)} resumable uploads")
+
+
+class UploadReaper:
+    """Background thread expiring abandoned (resumable and direct) uploads every `interval` seconds"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='upload-reaper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run()
+
+    def run(self):
+        """Expire uploads once"""
+        with self.app.app_context():
+            try:
+                expire_uploads(db.session, self.app.config['UPLOAD_FOLDER'], self.app.config['RESUMABLE_TTL'])
+                storage = get_storage(self.app)
+                if storage.presigned:
+                    expire_direct_uploads(db.session, storage, self.app.config['RESUMABLE_TTL'])
+                db.session.commit()
+            except Exception as e:
+                # Another process may have expired the same uploads first
+                logger.error(f"Error expiring resumable uploads: {str(e)}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+class ResumablePart:
+    """A finalized upload handed to the blob store like a request's IngestPart"""
+
+    def __init__(self, upload, path):
+        self.filename = upload.filename
+        self.content_type = upload.content_type
+        self.sha256 = upload.sha256
+        self.size = upload.size
+        self.path = path
+
+    def sync(self):
+        with open(self.path, 'rb') as f:
+            os.fsync(f.fileno())
+
+    def commit(self, destination):
+        os.replace(self.path, destination)
+
+    def discard(self):
+        _remove(self.path)
+
+
+def claim_upload(session, upload_id, upload_folder):
+    """Take a finalized upload for a submission inside the caller's transaction.
+
+    The upload row is deleted with the transaction; the returned part is
+    moved into place (or dropped as a duplicate) by the blob store. Raises
+    SubmissionError if the upload is unknown, not finalized or not a zip.
+    """
+    upload = session.get(ResumableUpload, upload_id) if upload_id else None
+    if upload is None:
+        raise SubmissionError('Upload not found. It may have expired; please upload the file again')
+    if upload.sha256 is None:
+        raise SubmissionError('Upload is not finalized yet')
+    path = upload_path(upload_folder, upload.id)
+    with open(path, 'rb') as f:
+        if not content_matches('project', f.read(SNIFF_BYTES)):
+            raise SubmissionError('File content does not match a ZIP archive')
+    session.delete(upload)
+    return ResumablePart(upload, path)
+
+
+def _get_upload(upload_id):
+    upload = db.session.get(ResumableUpload, upload_id)
+    if upload is None:
+        return None, (jsonify({'error': 'Upload not found'}), 404)
+    return upload, None
+
+
+@resumable_bp.route('/uploads', methods=['POST'])
+def create_upload():
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    content_type = data.get('content_type')
+    size = data.get('size')
+
+    try:
+        # Only project zips go through resumable uploads
+        validate_file(FileStorage(filename=filename, content_type=content_type), 'project')
+    except SubmissionError as e:
+        return jsonify({'error': str(e)}), 400
+    max_size = current_app.config['RESUMABLE_MAX_SIZE']
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'size must be a positive number of bytes'}), 400
+    if size > max_size:
+        return jsonify({'error': f'File too large. Maximum size is {max_size // (1024 * 1024)}MB'}), 413
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    expire_uploads(db.session, upload_folder, current_app.config['RESUMABLE_TTL'])
+
+    client = client_address()
+    open_uploads = db.session.query(func.count(ResumableUpload.id)).filter(ResumableUpload.client == client).scalar()
+    if open_uploads >= current_app.config['RESUMABLE_MAX_PER_CLIENT']:
+        db.session.commit()
+        return jsonify({'error': 'Too many uploads in progress; finish or cancel one first'}), 429
+    if pending_upload_bytes(db.session) + size > current_app.config['RESUMABLE_MAX_PENDING']:
+        db.session.commit()
+        response = jsonify({'error': 'The server is busy with other uploads; please try again later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '300'
+        return response
+
+    upload = ResumableUpload()
+    upload.id = uuid.uuid4().hex
+    upload.client = client
+    upload.filename = filename
+    upload.content_type = content_type
+    upload.size = size
+    db.session.add(upload)
+    db.session.commit()
+    # Create the (empty) file so the offset is well defined from the start
+    open(upload_path(upload_folder, upload.id), 'wb').close()
+
+    response = jsonify(_status(upload, upload_path(upload_folder, upload.id)))
+    response.status_code = 201
+    response.headers['Location'] = f'/api/uploads/{upload.id}'
+    return response
+
+
+@resumable_bp.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    upload, error = _get_upload(upload_id)
+    if error:
+        return error
+    status = _status(upload, upload_path(current_app.config['UPLOAD_FOLDER'], upload.id))
+    response = jsonify(status)
+    response.headers['Upload-Offset'] = str(status['offset'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@resumable_bp.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    upload, error = _get_upload(upload_id)
+    if error:
+        return error
+    if upload.sha256 is not None:
+        return jsonify({'error': 'Upload is already finalized'}), 409
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+
+    path = upload_path(current_app.config['UPLOAD_FOLDER'], upload.id)
+    with open(path, 'ab') as out:
+        try:
+            # One writer per upload; a second concurrent PUT is told to retry
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return jsonify({'error': 'Another chunk is being written', 'offset': _offset(path)}), 409
+
+        current = out.tell()
+        if offset != current:
+            # The client is out of step (e.g. a retried chunk): tell it where to resume
+            return jsonify({'error': 'Offset does not match the upload', 'offset': current}), 409
+
+        remaining = upload.size - current
+        stream = request.stream
+        while True:
+            chunk = stream.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                out.write(chunk[:remaining])
+                out.flush()
+                return jsonify({'error': 'Chunk exceeds the declared upload size', 'offset': upload.size}), 413
+            out.write(chunk)
+            remaining -= len(chunk)
+        out.flush()
+        offset = out.tell()
+
+    response = jsonify({'upload_id': upload.id, 'offset': offset, 'size': upload.size})
+    response.headers['Upload-Offset'] = str(offset)
+    return response
+
+
+@resumable_bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    upload, error = _get_upload(upload_id)
+    if error:
+        return error
+
+    path = upload_path(current_app.config['UPLOAD_FOLDER'], upload.id)
+    if upload.sha256 is None:
+        offset = _offset(path)
+        if offset != upload.size:
+            return jsonify({'error': 'Upload is incomplete', 'offset': offset, 'size': upload.size}), 409
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                digest.update(chunk)
+
+        expected = (request.get_json(silent=True) or {}).get('sha256')
+        if expected and expected.lower() != digest.hexdigest():
+            # The bytes on disk are not what the client sent: start over
+            _remove(path)
+            db.session.delete(upload)
+            db.session.commit()
+            return jsonify({'error': 'Checksum mismatch; please upload the file again'}), 422
+
+        upload.sha256 = digest.hexdigest()
+        db.session.commit()
+
+    return jsonify(_status(upload, path))
+
+
+@resumable_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    upload, error = _get_upload(upload_id)
+    if error:
+        return error
+    _remove(upload_path(current_app.config['UPLOAD_FOLDER'], upload.id))
+    db.session.delete(upload)
+    db.session.commit()
+    return '', 204
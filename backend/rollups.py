@@ -0,0 +1,117 @@
+"""
+Incrementally maintained submission statistics.
+
+Each submission adds to one `submission_rollups` row (day x ai_used x
+ai_agent) in the same transaction as its insert, so the stats endpoint
+only ever reads the rollup table. `rebuild_rollups` recomputes the table
+from `submissions` for backfills.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import func, cast, insert, update, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Submission, SubmissionRollup
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert(session, rows):
+    """Add counts and rewards to rollup rows, creating them as needed"""
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert_fn = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert_fn(SubmissionRollup)
+        statement = statement.on_conflict_do_update(
+            index_elements=['day', 'ai_used', 'ai_agent'],
+            set_={
+                'submission_count': SubmissionRollup.submission_count + statement.excluded.submission_count,
+                'reward_total': SubmissionRollup.reward_total + statement.excluded.reward_total,
+            }
+        )
+        session.execute(statement, rows)
+        return
+
+    for row in rows:
+        result = session.execute(
+            update(SubmissionRollup)
+            .where(SubmissionRollup.day == row['day'],
+                   SubmissionRollup.ai_used == row['ai_used'],
+                   SubmissionRollup.ai_agent == row['ai_agent'])
+            .values(submission_count=SubmissionRollup.submission_count + row['submission_count'],
+                    reward_total=SubmissionRollup.reward_total + row['reward_total'])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(SubmissionRollup), [row])
+
+
+def record_submissions(session, submissions):
+    """Fold new submissions into the rollups inside the caller's transaction"""
+    rows = {}
+    for submission in submissions:
+        day = (submission.timestamp or datetime.utcnow()).date()
+        key = (day, submission.ai_used, submission.ai_agent or '')
+        row = rows.setdefault(key, {
+            'day': day, 'ai_used': submission.ai_used, 'ai_agent': submission.ai_agent or '',
+            'submission_count': 0, 'reward_total': 0.0
+        })
+        row['submission_count'] += 1
+        row['reward_total'] += submission.reward_amount
+    if rows:
+        _upsert(session, list(rows.values()))
+
+
+def rebuild_rollups(session):
+    """Recompute every rollup row from the submissions table"""
+    if session.get_bind().dialect.name == 'sqlite':
+        # SQLite stores dates as 'YYYY-MM-DD' text, which date() produces directly
+        day = func.date(Submission.timestamp)
+    else:
+        day = cast(Submission.timestamp, db.Date)
+    agent = func.coalesce(Submission.ai_agent, '')
+
+    session.execute(delete(SubmissionRollup))
+    session.execute(
+        insert(SubmissionRollup).from_select(
+            ['day', 'ai_used', 'ai_agent', 'submission_count', 'reward_total'],
+            select(day, Submission.ai_used, agent, func.count(Submission.id), func.sum(Submission.reward_amount))
+            .group_by(day, Submission.ai_used, agent)
+        )
+    )
+    session.commit()
+    rows = session.query(func.count()).select_from(SubmissionRollup).scalar()
+    logger.info(f"Rebuilt submission rollups: {rows} rows")
+    return rows
+
+
+def get_stats(session, start=None, end=None):
+    """Totals overall, by AI, by agent and by day, read from the rollups only"""
+    count = func.sum(SubmissionRollup.submission_count)
+    reward = func.sum(SubmissionRollup.reward_total)
+
+    def grouped(*columns):
+        query = session.query(*columns, count, reward)
+        if start:
+            query = query.filter(SubmissionRollup.day >= start)
+        if end:
+            query = query.filter(SubmissionRollup.day <= end)
+        if columns:
+            query = query.group_by(*columns).order_by(*columns)
+        return query.all()
+
+    (total_count, total_reward), = grouped()
+    return {
+        'totals': {'submissions': total_count or 0, 'reward_total': total_reward or 0.0},
+        'by_ai_used': [
+            {'ai_used': ai_used, 'submissions': n, 'reward_total': r}
+            for ai_used, n, r in grouped(SubmissionRollup.ai_used)
+        ],
+        'by_ai_agent': [
+            {'ai_agent': ai_agent or None, 'submissions': n, 'reward_total': r}
+            for ai_agent, n, r in grouped(SubmissionRollup.ai_agent)
+        ],
+        'by_day': [
+            {'day': day.isoformat(), 'submissions': n, 'reward_total': r}
+            for day, n, r in grouped(SubmissionRollup.day)
+        ],
+    }
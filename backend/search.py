@@ -0,0 +1,148 @@
+"""
+Full-text search over submissions.
+
+SQLite gets an external-content FTS5 table kept in sync by triggers, and
+PostgreSQL gets a generated tsvector column with a GIN index. Both cover
+lumen_name, ai_used, ai_agent and prompt_text and return a rank expression
+so results can be ordered by relevance. Databases without either feature
+fall back to the original LIKE filter. The search string is always a bind
+parameter, so built statements can be cached and reused.
+"""
+import logging
+import re
+from sqlalchemy import text, func, or_, literal_column, table, column, bindparam
+
+from models import Submission
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'submissions_fts'
+# Maximum number of search terms turned into a full-text query
+MAX_TERMS = 8
+# Search backends that can rank results by relevance
+RANKED_MODES = ('fts5', 'tsvector')
+
+_fts = table(FTS_TABLE, column('rowid'))
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        lumen_name, ai_used, ai_agent, prompt_text,
+        content='submissions', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON submissions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, lumen_name, ai_used, ai_agent, prompt_text)
+        VALUES (new.id, new.lumen_name, new.ai_used, new.ai_agent, new.prompt_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON submissions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, lumen_name, ai_used, ai_agent, prompt_text)
+        VALUES ('delete', old.id, old.lumen_name, old.ai_used, old.ai_agent, old.prompt_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON submissions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, lumen_name, ai_used, ai_agent, prompt_text)
+        VALUES ('delete', old.id, old.lumen_name, old.ai_used, old.ai_agent, old.prompt_text);
+        INSERT INTO {FTS_TABLE}(rowid, lumen_name, ai_used, ai_agent, prompt_text)
+        VALUES (new.id, new.lumen_name, new.ai_used, new.ai_agent, new.prompt_text);
+    END""",
+]
+
+# Names weigh more than the AI fields, which weigh more than the prompt body
+POSTGRES_DDL = [
+    """ALTER TABLE submissions ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(lumen_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(ai_used, '') || ' ' || coalesce(ai_agent, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(prompt_text, '')), 'C')
+        ) STORED""",
+    """CREATE INDEX IF NOT EXISTS ix_submissions_search_vector
+        ON submissions USING GIN (search_vector)""",
+]
+
+
+def install_search_index(session, rebuild=False):
+    """Create the search structures for the current database.
+
+    Returns the name of the search backend in use ('fts5', 'tsvector' or None).
+    """
+    dialect = session.get_bind().dialect.name
+    try:
+        if dialect == 'sqlite':
+            exists = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first() is not None
+            for statement in SQLITE_DDL:
+                session.execute(text(statement))
+            # Index rows that were inserted before the FTS table existed
+            if rebuild or not exists:
+                session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            session.commit()
+            return 'fts5'
+        if dialect == 'postgresql':
+            for statement in POSTGRES_DDL:
+                session.execute(text(statement))
+            session.commit()
+            return 'tsvector'
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Full-text search unavailable, falling back to LIKE: {e}")
+    return None
+
+
+def search_terms(search):
+    """Split raw user input into the word tokens used for full-text matching"""
+    return re.findall(r'\w+', search.lower())[:MAX_TERMS]
+
+
+def search_mode(search, backend):
+    """How a search string is matched: 'fts5', 'tsvector', 'like', or None for no search"""
+    if not search:
+        return None
+    if backend in RANKED_MODES and search_terms(search):
+        return backend
+    return 'like'
+
+
+def search_params(mode, search):
+    """Bind parameters for a statement built by apply_search()"""
+    terms = search_terms(search)
+    if mode == 'fts5':
+        # Every term must match, each as a prefix ("clau" finds "Claude")
+        return {'search': ' '.join(f'"{term}"*' for term in terms)}
+    if mode == 'tsvector':
+        return {'search': ' & '.join(f'{term}:*' for term in terms)}
+    if mode == 'like':
+        return {'search': f'%{search}%'}
+    return {}
+
+
+def apply_search(stmt, mode):
+    """Filter a Submission select/query by the `search` bind parameter.
+
+    Returns the filtered statement and a list of ORDER BY clauses ranking the
+    matches by relevance, or None for the unranked LIKE fallback.
+    """
+    search = bindparam('search')
+
+    if mode == 'fts5':
+        stmt = stmt.join(_fts, _fts.c.rowid == Submission.id).filter(
+            literal_column(FTS_TABLE).op('MATCH')(search)
+        )
+        rank = func.bm25(literal_column(FTS_TABLE), 10.0, 4.0, 4.0, 1.0)
+        return stmt, [rank.asc()]
+
+    if mode == 'tsvector':
+        tsquery = func.to_tsquery('simple', search)
+        vector = literal_column('submissions.search_vector')
+        stmt = stmt.filter(vector.op('@@')(tsquery))
+        return stmt, [func.ts_rank(vector, tsquery).desc()]
+
+    stmt = stmt.filter(
+        or_(
+            Submission.lumen_name.like(search),
+            Submission.ai_used.like(search),
+            Submission.ai_agent.like(search),
+            Submission.prompt_text.like(search)
+        )
+    )
+    return stmt, None
@@ -0,0 +1,153 @@
+"""
+Serving the built frontend.
+
+StaticAssets walks the static folder once, at startup, into an in-memory
+manifest of every file: its size, content type, a content-hash ETag and
+any precompressed `.br`/`.gz` siblings. Requests are answered from the
+manifest alone; the only filesystem access is opening the file that is
+sent. Paths that are not in the manifest get index.html, for client-side
+routing.
+
+Compressed variants are chosen from Accept-Encoding (brotli first, then
+gzip). Generate them after each build with:
+
+    python compress_static.py
+
+Vite puts content-hashed files under assets/ (e.g. assets/index-4f3a9c1b.js);
+those are cached as immutable, everything else is revalidated.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the deployment
+    brotli = None
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE_TYPES = re.compile(r'text/|application/(javascript|json|xml|manifest\+json|wasm)|image/svg\+xml')
+# Smaller files are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+HASHED_ASSET = re.compile(r'assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+StaticFile = namedtuple('StaticFile', ['path', 'size', 'mimetype', 'etag', 'immutable', 'variants'])
+
+
+def _mimetype(name):
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+def _compressible(name, size):
+    return size >= MIN_COMPRESS_SIZE and COMPRESSIBLE_TYPES.match(_mimetype(name)) is not None
+
+
+def _walk(root):
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            yield os.path.relpath(path, root).replace(os.sep, '/'), path
+
+
+class StaticAssets:
+    """In-memory index of the static folder"""
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        if not os.path.isdir(root):
+            return
+
+        paths = dict(_walk(root))
+        for name, path in paths.items():
+            suffix = next((suffix for _, suffix in ENCODINGS if name.endswith(suffix)), None)
+            if suffix is not None and name[:-len(suffix)] in paths:
+                continue  # a compressed variant, listed with its original
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                variant = paths.get(name + suffix)
+                if variant is not None:
+                    variants[encoding] = (variant, os.path.getsize(variant))
+            self.files[name] = StaticFile(
+                path=path,
+                size=os.path.getsize(path),
+                mimetype=_mimetype(name),
+                etag=_file_hash(path),
+                immutable=HASHED_ASSET.fullmatch(name) is not None,
+                variants=variants,
+            )
+
+    def lookup(self, name):
+        """Manifest entry for `name`, falling back to index.html; None if neither exists"""
+        return self.files.get(name) or self.files.get('index.html')
+
+    def response(self, entry):
+        """Response sending `entry` in the best encoding the client accepts"""
+        path, size, encoding = entry.path, entry.size, None
+        for candidate, _ in ENCODINGS:
+            if candidate in entry.variants and request.accept_encodings[candidate] > 0:
+                (path, size), encoding = entry.variants[candidate], candidate
+                break
+
+        response = Response(
+            wrap_file(request.environ, open(path, 'rb')), mimetype=entry.mimetype, direct_passthrough=True
+        )
+        response.content_length = size
+        # Each encoding is a different representation with its own validator
+        response.set_etag(f"{entry.etag}-{encoding}" if encoding else entry.etag)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry.variants:
+            response.vary.add('Accept-Encoding')
+        if entry.immutable:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+
+def compress_static(root):
+    """Write `.gz` (and, with the brotli module, `.br`) siblings of compressible files.
+
+    Existing variants newer than their file are kept; returns the number of
+    variants written.
+    """
+    written = 0
+    for name, path in list(_walk(root)):
+        if name.endswith(tuple(suffix for _, suffix in ENCODINGS)) or not _compressible(name, os.path.getsize(path)):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            compressed = brotli.compress(data) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+            # Only keep variants that actually save bytes
+            if len(compressed) >= len(data):
+                continue
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, target)
+            written += 1
+    return written
@@ -0,0 +1,288 @@
+"""
+Where uploaded files are kept.
+
+STORAGE_BACKEND selects one of:
+
+    local  files live in UPLOAD_FOLDER on this machine (the default)
+    s3     files live in an S3-compatible bucket (AWS S3, MinIO, ...), so
+           any number of app servers share them. UPLOAD_FOLDER only
+           caches objects this process has stored or read, as a
+           least-recently-used cache of S3_CACHE_SIZE bytes, and can be
+           emptied at any time.
+
+The blob store put()s received parts under their final name. Code that
+needs a file on disk (thumbnails, image variants, zip members) asks for
+local_path(), which the s3 backend fills from the bucket on a miss.
+
+The s3 backend also hands out pre-signed URLs: /uploads/<filename>
+redirects to the object, and project zips can be PUT straight into the
+bucket (see directupload.py), so large files never pass through a worker.
+boto3 is only needed for the s3 backend.
+"""
+import base64
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+
+from diskcache import DiskCache
+from ingest import incoming_dir, fsync_directory
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+except ImportError:  # pragma: no cover - depends on the deployment
+    boto3 = None
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ('local', 's3')
+# S3 error codes meaning the object does not exist
+MISSING_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+def _content_type(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _is_missing(error):
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in MISSING_CODES
+
+
+class LocalStorage:
+    """Files in a folder on this machine"""
+
+    presigned = False
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def put(self, part, filename, durable=False):
+        """Move a received part into place under `filename`.
+
+        Returns False, dropping the part, when the name is already stored
+        (names are content hashes, so it holds the same bytes).
+        """
+        destination = os.path.join(self.folder, filename)
+        if os.path.exists(destination):
+            part.discard()
+            return False
+        if durable:
+            part.sync()
+        part.commit(destination)
+        return True
+
+    def flush(self):
+        """Persist the puts made so far"""
+        fsync_directory(self.folder)
+
+    def publish(self, filename):
+        """Store a file written into the local folder, e.g. a thumbnail; already in place here"""
+
+    def local_path(self, filename):
+        """Path of a stored file on local disk; raises FileNotFoundError if it is not stored"""
+        path = os.path.join(self.folder, filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(filename)
+        return path
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, cached in a local folder.
+
+    The cache is bounded to `cache_size` bytes (None leaves it unbounded).
+    """
+
+    presigned = True
+
+    def __init__(self, client, bucket, cache_folder, prefix='', url_expiry=3600, cache_size=None):
+        self.client = client
+        self.bucket = bucket
+        self.folder = cache_folder
+        self.prefix = prefix
+        self.url_expiry = url_expiry
+        self.cache = DiskCache(cache_size) if cache_size else None
+
+    def _cached(self, filename):
+        """Count a file that was just placed in the cache folder"""
+        if self.cache is not None:
+            self.cache.added(self.folder, filename, os.path.getsize(os.path.join(self.folder, filename)))
+
+    def key(self, filename):
+        return f"{self.prefix}{filename}"
+
+    def stat(self, filename):
+        """Size of a stored object, or None if it does not exist"""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(filename))['ContentLength']
+        except Exception as e:
+            if _is_missing(e):
+                return None
+            raise
+
+    def sha256(self, filename):
+        """Hex SHA-256 of a stored object.
+
+        Taken from the checksum the bucket verified when the object was
+        uploaded; objects stored without one (or by a server that keeps no
+        checksums) are read and hashed.
+        """
+        key = self.key(filename)
+        checksum = self.client.head_object(Bucket=self.bucket, Key=key, ChecksumMode='ENABLED').get('ChecksumSHA256')
+        # Multipart uploads carry a checksum of part checksums ("...-<parts>")
+        if checksum and '-' not in checksum:
+            return base64.b64decode(checksum).hex()
+        digest = hashlib.sha256()
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        for chunk in iter(lambda: body.read(1024 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def read_head(self, filename, size):
+        """First `size` bytes of a stored object"""
+        response = self.client.get_object(Bucket=self.bucket, Key=self.key(filename), Range=f"bytes=0-{size - 1}")
+        return response['Body'].read()
+
+    def put(self, part, filename, durable=False):
+        """Upload a received part under `filename`; see LocalStorage.put.
+
+        An object is durable once the upload returns, so `durable` needs no
+        extra work. The part becomes the cached copy, which thumbnails and
+        zip indexing read right after.
+        """
+        cached = os.path.join(self.folder, filename)
+        if os.path.exists(cached) or self.stat(filename) is not None:
+            part.discard()
+            return False
+        # Parts still being written buffer in memory; closed ones have nothing to flush
+        flush = getattr(part, 'flush', None)
+        if flush is not None:
+            flush()
+        self.client.upload_file(
+            part.path, self.bucket, self.key(filename), ExtraArgs={'ContentType': _content_type(filename)}
+        )
+        part.commit(cached)
+        self._cached(filename)
+        return True
+
+    def move(self, source, filename):
+        """Move the object `source` to `filename` inside the bucket.
+
+        Returns False, dropping `source`, when `filename` is already stored.
+        """
+        moved = self.stat(filename) is None
+        if moved:
+            self.client.copy(
+                {'Bucket': self.bucket, 'Key': self.key(source)}, self.bucket, self.key(filename),
+                ExtraArgs={'ContentType': _content_type(filename)}
+            )
+        self.delete(source)
+        return moved
+
+    def delete(self, filename):
+        """Delete a stored object; a missing one is not an error"""
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(filename))
+
+    def flush(self):
+        """Persist the puts made so far; uploaded objects already are"""
+
+    def publish(self, filename):
+        """Upload a file written into the cache folder, e.g. a thumbnail"""
+        self.client.upload_file(
+            os.path.join(self.folder, filename), self.bucket, self.key(filename),
+            ExtraArgs={'ContentType': _content_type(filename)}
+        )
+        self._cached(filename)
+
+    def local_path(self, filename):
+        """Path of the cached copy of an object, downloading it on a miss.
+
+        Raises FileNotFoundError if the object does not exist.
+        """
+        path = os.path.join(self.folder, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            pass
+        else:
+            if self.cache is not None:
+                self.cache.touch(path, stat)
+            return path
+        # Downloaded under a temporary name so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(prefix='s3-', dir=incoming_dir(self.folder))
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self.key(filename), tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if _is_missing(e):
+                raise FileNotFoundError(filename) from e
+            raise
+        self._cached(filename)
+        return path
+
+    def download_url(self, filename, disposition=None):
+        """Pre-signed GET URL for a stored object"""
+        params = {'Bucket': self.bucket, 'Key': self.key(filename)}
+        if disposition:
+            params['ResponseContentDisposition'] = disposition
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.url_expiry)
+
+    def upload_url(self, filename, content_type, size, sha256):
+        """Pre-signed PUT URL for `filename` and the headers the client must send with it.
+
+        The URL is bound to the size and SHA-256 of the content, so the
+        bucket rejects any other bytes and a content-addressed name stays
+        honest. Content-Length is sent by every HTTP client (browsers refuse
+        to set it), so it is not among the returned headers.
+        """
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+        url = self.client.generate_presigned_url('put_object', Params={
+            'Bucket': self.bucket,
+            'Key': self.key(filename),
+            'ContentType': content_type,
+            'ContentLength': size,
+            'ChecksumSHA256': checksum,
+        }, ExpiresIn=self.url_expiry)
+        return url, {'Content-Type': content_type, 'x-amz-checksum-sha256': checksum}
+
+
+def create_storage(config):
+    """Storage backend configured by STORAGE_BACKEND; None for local storage.
+
+    Local storage is not created up front because it follows
+    UPLOAD_FOLDER; use get_storage().
+    """
+    if config['STORAGE_BACKEND'] != 's3':
+        return None
+    if boto3 is None:
+        raise RuntimeError('STORAGE_BACKEND=s3 requires boto3 (pip install boto3)')
+    if not config['S3_BUCKET']:
+        raise RuntimeError('STORAGE_BACKEND=s3 requires S3_BUCKET')
+
+    endpoint_url = config['S3_ENDPOINT_URL']
+    client = boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        region_name=config['S3_REGION'],
+        aws_access_key_id=config['S3_ACCESS_KEY_ID'],
+        aws_secret_access_key=config['S3_SECRET_ACCESS_KEY'],
+        # Self-hosted stores (MinIO) are addressed by path, not by bucket subdomain
+        config=BotoConfig(signature_version='s3v4', s3={'addressing_style': 'path' if endpoint_url else 'auto'}),
+    )
+    logger.info(f"Storing uploads in bucket {config['S3_BUCKET']} at {endpoint_url or 'AWS S3'}")
+    return S3Storage(
+        client, config['S3_BUCKET'], config['UPLOAD_FOLDER'],
+        prefix=config['S3_PREFIX'], url_expiry=config['STORAGE_URL_EXPIRY'],
+        cache_size=config['S3_CACHE_SIZE']
+    )
+
+
+def get_storage(app):
+    """The app's storage backend"""
+    storage = app.extensions.get('storage')
+    return storage if storage is not None else LocalStorage(app.config['UPLOAD_FOLDER'])
@@ -0,0 +1,79 @@
+"""
+Shared fixture for tests that drive the app through its test client.
+
+AppTestCase creates a fresh app per test, backed by a SQLite file and an
+upload folder in a throwaway directory, and removes both afterwards.
+Subclasses extend setUp()/tearDown() with super() and pass extra
+environment to create_app() through app_environ().
+"""
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Text fields of a submission that passes validation
+SUBMISSION_FIELDS = {
+    'lumen_name': 'Alice',
+    'prompt_text': 'Test prompt',
+    'ai_used': 'Claude',
+    'ai_agent': 'Cursor',
+    'reward_amount': '1',
+}
+
+
+def png_file(content=b'\x89PNG\r\n\x1a\nfake', name='shot.png'):
+    """A PNG file part for a test client form"""
+    return (io.BytesIO(content), name, 'image/png')
+
+
+class AppTestCase(unittest.TestCase):
+    """An app with a throwaway SQLite database and upload folder"""
+
+    def app_environ(self):
+        """Environment for create_app() beyond the database; tmp_dir already exists"""
+        return {}
+
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and upload folder."""
+        from app import create_app
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.upload_dir = os.path.join(self.tmp_dir, 'uploads')
+        os.makedirs(self.upload_dir)
+        db_path = os.path.join(self.tmp_dir, 'test.db')
+        # Thumbnail threads stay off unless a test asks for them
+        environ = {'DATABASE_URL': f'sqlite:///{db_path}', 'THUMBNAIL_WORKERS': '0'}
+        environ.update(self.app_environ())
+        self.env = patch.dict(os.environ, environ)
+        self.env.start()
+
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up test environment."""
+        with self.app.app_context():
+            from models import db
+            db.session.remove()
+            db.engine.dispose()
+        self.env.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _submit(self, headers=None, **fields):
+        """POST a submission to /api/submit: the valid text fields, updated with `fields`"""
+        data = dict(SUBMISSION_FIELDS, **fields)
+        return self.client.post('/api/submit', data=data, content_type='multipart/form-data', headers=headers)
+
+    def _admin_headers(self):
+        """Authorization headers of a newly registered user"""
+        self.client.post('/api/register', json={'username': 'admin', 'password': 'secret'})
+        token = self.client.post('/api/login', json={'username': 'admin', 'password': 'secret'}).get_json()['token']
+        return {'Authorization': f'Bearer {token}'}
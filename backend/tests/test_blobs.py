@@ -0,0 +1,58 @@
+import os
+import unittest
+
+from apptest import AppTestCase, png_file
+
+SHOT = b'\x89PNG\r\n\x1a\n' + b'same screenshot' * 100
+OTHER = b'\x89PNG\r\n\x1a\n' + b'another screenshot' * 100
+
+class BlobStoreTestCase(AppTestCase):
+    def _submit(self, screenshot, extras=(), name='shot.png'):
+        response = super()._submit(
+            screenshot=png_file(screenshot, name),
+            additional_screenshots=[png_file(extra, f'extra{i}.png') for i, extra in enumerate(extras)],
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['submission_id']
+
+    def _stored_files(self):
+        return sorted(name for name in os.listdir(self.upload_dir) if name != '.incoming')
+
+    def test_identical_uploads_are_stored_once(self):
+        """Resubmitting the same bytes references the existing blob."""
+        from models import db, Submission, Blob
+
+        first = self._submit(SHOT)
+        second = self._submit(SHOT, extras=[SHOT, OTHER], name='renamed.png')
+        self.assertEqual(len(self._stored_files()), 2)
+
+        with self.app.app_context():
+            a = db.session.get(Submission, first)
+            b = db.session.get(Submission, second)
+            self.assertEqual(a.screenshot_path, b.screenshot_path)
+            self.assertEqual(b.additional_screenshots_list()[0], a.screenshot_path)
+
+            blob = db.session.get(Blob, a.screenshot_path.split('.')[0])
+            self.assertEqual(blob.ref_count, 3)
+            self.assertEqual(blob.size, len(SHOT))
+
+        # Stored blobs are still served by filename
+        response = self.client.get(f'/uploads/{a.screenshot_path}')
+        self.assertEqual(response.data, SHOT)
+        response.close()
+
+    def test_missing_file_is_restored(self):
+        """A blob row whose file disappeared is healed by the next identical upload."""
+        from models import db, Submission
+
+        submission_id = self._submit(SHOT)
+        with self.app.app_context():
+            filename = db.session.get(Submission, submission_id).screenshot_path
+        os.remove(os.path.join(self.upload_dir, filename))
+
+        self._submit(SHOT)
+        with open(os.path.join(self.upload_dir, filename), 'rb') as f:
+            self.assertEqual(f.read(), SHOT)
+
+if __name__ == '__main__':
+    unittest.main()
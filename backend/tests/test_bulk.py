@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event
+
+from apptest import AppTestCase
+
+def png(tag):
+    return (io.BytesIO(b'\x89PNG\r\n\x1a\n' + tag.encode() * 50), f'{tag}.png', 'image/png')
+
+def entry(**overrides):
+    data = {
+        'lumen_name': 'Lead', 'prompt_text': 'Bulk prompt', 'ai_used': 'Claude',
+        'ai_agent': 'Cursor', 'reward_amount': 2.5
+    }
+    data.update(overrides)
+    return data
+
+class BulkSubmissionTestCase(AppTestCase):
+    def _post(self, manifest, files):
+        data = {'manifest': manifest if isinstance(manifest, str) else json.dumps(manifest)}
+        data.update(files)
+        return self.client.post('/api/submit/bulk', data=data, content_type='multipart/form-data')
+
+    def test_all_valid_in_one_insert(self):
+        """Valid entries are written with a single INSERT and counted once."""
+        from models import db, Submission
+
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = self._post(
+                [entry(lumen_name=f'user{i}', screenshot=f'shot{i}') for i in range(5)]
+                + [entry(project='proj', additional_screenshots=['shot0'])],
+                dict({f'shot{i}': png(f'shot{i}') for i in range(5)},
+                     proj=(io.BytesIO(b'PK\x03\x04zip'), 'work.zip', 'application/zip'))
+            )
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertEqual((data['created'], data['failed']), (6, 0))
+        self.assertEqual([result['index'] for result in data['results']], list(range(6)))
+        inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO SUBMISSIONS')]
+        self.assertEqual(len(inserts), 1)
+
+        with self.app.app_context():
+            ids = [result['submission_id'] for result in data['results']]
+            rows = {sub.id: sub for sub in db.session.query(Submission).filter(Submission.id.in_(ids))}
+            self.assertEqual([rows[i].lumen_name for i in ids[:5]], [f'user{i}' for i in range(5)])
+            self.assertTrue(rows[ids[5]].screenshot_path.endswith('.zip'))
+            # The additional screenshot shares its blob with the first entry's screenshot
+            self.assertEqual(rows[ids[5]].additional_screenshots, rows[ids[0]].screenshot_path)
+
+        listing = self.client.get('/api/public/submissions').get_json()
+        self.assertEqual(listing['pagination']['total'], 6)
+        stats_files = [name for name in os.listdir(self.upload_dir) if name != '.incoming']
+        self.assertEqual(len(stats_files), 6)
+
+    def test_per_item_errors(self):
+        """Invalid entries are reported by index while the rest are created."""
+        response = self._post([
+            entry(screenshot='a'),
+            entry(ai_used='NotAnAI', screenshot='b'),
+            entry(screenshot='missing'),
+            entry(reward_amount=0, screenshot='c'),
+            'not an object',
+            entry(screenshot='c'),
+        ], {'a': png('a'), 'b': png('b'), 'c': png('c')})
+
+        self.assertEqual(response.status_code, 207)
+        results = response.get_json()['results']
+        self.assertEqual([result['index'] for result in results], list(range(6)))
+        self.assertIn('submission_id', results[0])
+        self.assertEqual(results[1]['error'], 'Invalid AI option selected')
+        self.assertEqual(results[2]['error'], "File part 'missing' not found")
+        self.assertEqual(results[3]['error'], 'Reward amount must be at least 0.01')
+        self.assertIn('error', results[4])
+        self.assertIn('submission_id', results[5])
+
+    def test_file_content_is_sniffed(self):
+        """Files whose first bytes do not match their type are refused, as on /api/submit."""
+        from models import db, Submission
+
+        response = self._post([
+            entry(screenshot='fake'),
+            entry(project='notzip'),
+            entry(screenshot='a', additional_screenshots=['fake2', 'b']),
+        ], {
+            'fake': (io.BytesIO(b'GIF89a not a png'), 'fake.png', 'image/png'),
+            'notzip': (io.BytesIO(b'plain text'), 'work.zip', 'application/zip'),
+            'fake2': (io.BytesIO(b'GIF89a not a png'), 'fake2.png', 'image/png'),
+            'a': png('a'),
+            'b': png('b'),
+        })
+        self.assertEqual(response.status_code, 207)
+        results = response.get_json()['results']
+        self.assertEqual(results[0]['error'], 'File content does not match its type')
+        self.assertEqual(results[1]['error'], 'File content does not match its type')
+        with self.app.app_context():
+            submission = db.session.get(Submission, results[2]['submission_id'])
+            self.assertEqual(len(submission.additional_screenshots_list()), 1)
+
+    def test_nothing_valid(self):
+        """A request with no valid entries creates nothing."""
+        response = self._post([entry(ai_used='NotAnAI', screenshot='a')], {'a': png('a')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['created'], 0)
+        self.assertEqual([name for name in os.listdir(self.upload_dir) if name != '.incoming'], [])
+
+    def test_bad_manifest(self):
+        """Missing or malformed manifests are rejected outright."""
+        for manifest in ['', 'not json', '{}', '[]']:
+            response = self._post(manifest, {})
+            self.assertEqual(response.status_code, 400, manifest)
+
+        with patch('bulk.BULK_MAX_ITEMS', 2):
+            response = self._post([entry(screenshot='a')] * 3, {'a': png('a')})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from apptest import AppTestCase, png_file
+
+class CountCacheTestCase(AppTestCase):
+    def _submit(self, name='Alice'):
+        response = super()._submit(lumen_name=name, screenshot=png_file())
+        self.assertEqual(response.status_code, 201)
+
+    def _pagination(self, **params):
+        response = self.client.get('/api/public/submissions', query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['pagination']
+
+    def test_total_tracks_submissions(self):
+        """The unfiltered total is exact and follows new submissions."""
+        self.assertEqual(self._pagination()['total'], 0)
+        self._submit()
+        self._submit()
+        pagination = self._pagination(per_page=1)
+        self.assertEqual(pagination['total'], 2)
+        self.assertEqual(pagination['pages'], 2)
+        self.assertTrue(pagination['total_exact'])
+
+    def test_total_is_read_from_counter(self):
+        """Listings read the counter row instead of counting the table."""
+        from models import db, Counter
+        self._submit()
+        with self.app.app_context():
+            db.session.get(Counter, 'submissions_total').value = 42
+            db.session.commit()
+        self.assertEqual(self._pagination()['total'], 42)
+
+    def test_search_count_is_cached(self):
+        """Repeated searches reuse the cached count and flag it as not exact."""
+        self._submit('Alice')
+        first = self._pagination(search='alice')
+        self.assertEqual(first['total'], 1)
+        self.assertTrue(first['total_exact'])
+
+        # Normalized search strings share a cache entry
+        second = self._pagination(search='  ALICE ')
+        self.assertEqual(second['total'], 1)
+        self.assertFalse(second['total_exact'])
+
+    def test_submit_invalidates_search_counts(self):
+        """A new submission drops the cached search counts of this process."""
+        self._submit('Alice')
+        self._pagination(search='alice')
+        self._submit('Alice')
+        pagination = self._pagination(search='alice')
+        self.assertEqual(pagination['total'], 2)
+        self.assertTrue(pagination['total_exact'])
+
+    def test_search_count_cache_expiry(self):
+        """Entries expire after their TTL."""
+        from counters import SearchCountCache
+        cache = SearchCountCache(ttl=0)
+        cache.set('term', 3)
+        self.assertIsNone(cache.get('term'))
+
+        cache = SearchCountCache(ttl=60, max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import unittest
+
+from apptest import AppTestCase
+
+CONTENT = bytes(range(256)) * 40
+
+class DownloadsTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app with one large upload in a throwaway upload folder."""
+        super().setUp()
+        with open(os.path.join(self.upload_dir, 'project.zip'), 'wb') as f:
+            f.write(CONTENT)
+
+    def test_byte_range(self):
+        """A single range is answered with 206 and only those bytes."""
+        response = self.client.get('/uploads/project.zip', headers={'Range': 'bytes=100-199'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, CONTENT[100:200])
+        self.assertEqual(response.headers['Content-Range'], f'bytes 100-199/{len(CONTENT)}')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+    def test_resume_from_offset(self):
+        """Open-ended and suffix ranges let a download resume."""
+        tail = self.client.get('/uploads/project.zip', headers={'Range': 'bytes=10000-'})
+        self.assertEqual(tail.status_code, 206)
+        self.assertEqual(tail.data, CONTENT[10000:])
+
+        suffix = self.client.get('/uploads/project.zip', headers={'Range': 'bytes=-24'})
+        self.assertEqual(suffix.data, CONTENT[-24:])
+
+    def test_range_validation(self):
+        """Ranges past the end get 416; a stale If-Range gets the whole file."""
+        outside = self.client.get('/uploads/project.zip', headers={'Range': f'bytes={len(CONTENT) + 10}-'})
+        self.assertEqual(outside.status_code, 416)
+
+        stale = self.client.get('/uploads/project.zip', headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.data, CONTENT)
+
+    def test_x_accel_redirect(self):
+        """In x-accel mode nginx is told which file to send and the body stays empty."""
+        self.app.config['UPLOAD_OFFLOAD'] = 'x-accel'
+        response = self.client.get('/uploads/project.zip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/protected-uploads/project.zip')
+        self.assertEqual(response.data, b'')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertEqual(response.headers['Content-Type'], 'application/zip')
+
+        cached = self.client.get('/uploads/project.zip', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', cached.headers)
+
+    def test_x_sendfile(self):
+        """In x-sendfile mode the header carries the absolute path."""
+        self.app.config['UPLOAD_OFFLOAD'] = 'x-sendfile'
+        response = self.client.get('/uploads/project.zip')
+        self.assertEqual(response.headers['X-Sendfile'], os.path.join(self.upload_dir, 'project.zip'))
+        self.assertEqual(response.data, b'')
+
+    def test_offloaded_etag_matches_direct_etag(self):
+        """Switching offload modes keeps cached validators valid."""
+        direct = self.client.get('/uploads/project.zip').headers['ETag']
+        self.app.config['UPLOAD_OFFLOAD'] = 'x-accel'
+        self.assertEqual(self.client.get('/uploads/project.zip').headers['ETag'], direct)
+
+    def test_offloaded_missing_file(self):
+        """Offloading never points the front-end server at a missing file."""
+        self.app.config['UPLOAD_OFFLOAD'] = 'x-accel'
+        response = self.client.get('/uploads/missing.zip')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
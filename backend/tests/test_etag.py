@@ -0,0 +1,69 @@
+import unittest
+
+from apptest import AppTestCase, png_file
+
+class PublicListingETagTestCase(AppTestCase):
+    def app_environ(self):
+        return {'GENERATION_TTL': '60'}
+
+    def _submit(self):
+        response = super()._submit(screenshot=png_file())
+        self.assertEqual(response.status_code, 201)
+
+    def _count_queries(self, func):
+        from sqlalchemy import event
+        from models import db
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            result = func()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return result, len(statements)
+
+    def test_listing_has_weak_etag(self):
+        """Public listings carry a weak ETag and must be revalidated."""
+        response = self.client.get('/api/public/submissions')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['ETag'].startswith('W/"'))
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+
+    def test_not_modified_without_database_access(self):
+        """A matching If-None-Match gets a 304 without running any query."""
+        self._submit()
+        etag = self.client.get('/api/public/submissions?page=1').headers['ETag']
+
+        response, queries = self._count_queries(lambda: self.client.get(
+            '/api/public/submissions?page=1', headers={'If-None-Match': etag}
+        ))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(queries, 0)
+
+    def test_submission_changes_etag(self):
+        """Committing a submission bumps the generation and the ETag."""
+        etag = self.client.get('/api/public/submissions').headers['ETag']
+        self._submit()
+        response = self.client.get('/api/public/submissions', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(response.get_json()['submissions']), 1)
+
+    def test_etag_depends_on_query_args(self):
+        """Different queries get different ETags; equivalent searches share one."""
+        first = self.client.get('/api/public/submissions?page=1').headers['ETag']
+        second = self.client.get('/api/public/submissions?page=2').headers['ETag']
+        self.assertNotEqual(first, second)
+
+        plain = self.client.get('/api/public/submissions?search=alice').headers['ETag']
+        spaced = self.client.get('/api/public/submissions?search=%20Alice%20').headers['ETag']
+        self.assertEqual(plain, spaced)
+
+if __name__ == '__main__':
+    unittest.main()
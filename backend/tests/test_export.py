@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+
+from apptest import AppTestCase
+
+class ExportTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and an admin token."""
+        from models import db, Submission
+
+        super().setUp()
+
+        with self.app.app_context():
+            db.session.execute(Submission.__table__.insert(), [{
+                'lumen_name': 'Alice' if i % 3 == 0 else f'user{i}',
+                'prompt_text': f'prompt, "quoted" {i}\nsecond line',
+                'ai_used': 'Claude',
+                'ai_agent': 'Cursor',
+                'reward_amount': 1.0,
+                'screenshot_path': f'file{i}.png',
+                'additional_screenshots': 'a.png,b.png' if i == 0 else None,
+                'timestamp': datetime(2024, 1, 1)
+            } for i in range(1203)])
+            db.session.commit()
+
+        self.headers = self._admin_headers()
+
+    def test_export_requires_auth(self):
+        """Exports are admin only."""
+        response = self.client.get('/api/submissions/export')
+        self.assertEqual(response.status_code, 401)
+
+    def test_csv_export(self):
+        """CSV export streams every row with a header."""
+        response = self.client.get('/api/submissions/export?format=csv', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(len(rows), 1203)
+        self.assertEqual(rows[0]['prompt_text'], 'prompt, "quoted" 0\nsecond line')
+        self.assertEqual(rows[0]['additional_screenshots'], 'a.png,b.png')
+        self.assertEqual([int(row['id']) for row in rows], sorted(int(row['id']) for row in rows))
+
+    def test_csv_cells_are_not_formulas(self):
+        """Cells starting like a formula are quoted in CSV and left alone in NDJSON."""
+        from models import db, Submission
+
+        prompts = ['=HYPERLINK("http://evil.test")', '+1+2', '-2+3', '@SUM(A1)', 'plain = text']
+        with self.app.app_context():
+            db.session.execute(Submission.__table__.delete())
+            db.session.execute(Submission.__table__.insert(), [{
+                'lumen_name': prompt, 'prompt_text': prompt, 'ai_used': 'Claude', 'ai_agent': 'Cursor',
+                'reward_amount': 1.0, 'screenshot_path': 'file.png', 'timestamp': datetime(2024, 1, 1)
+            } for prompt in prompts])
+            db.session.commit()
+
+        response = self.client.get('/api/submissions/export?format=csv', headers=self.headers)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        expected = ["'" + prompt for prompt in prompts[:4]] + ['plain = text']
+        self.assertEqual([row['prompt_text'] for row in rows], expected)
+        self.assertEqual([row['lumen_name'] for row in rows], expected)
+        self.assertEqual(rows[0]['reward_amount'], '1.0')
+
+        response = self.client.get('/api/submissions/export?format=ndjson', headers=self.headers)
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line)['prompt_text'] for line in lines], prompts)
+
+    def test_ndjson_export_with_search(self):
+        """NDJSON export honours the search filter."""
+        response = self.client.get('/api/submissions/export?format=ndjson&search=alice', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 401)
+        self.assertTrue(all(json.loads(line)['lumen_name'] == 'Alice' for line in lines))
+
+    def test_export_is_chunked(self):
+        """The body arrives in several chunks rather than one buffered string."""
+        response = self.client.get('/api/submissions/export?format=ndjson', headers=self.headers)
+        chunks = list(response.response)
+        self.assertGreater(len(chunks), 2)
+
+    def test_invalid_format(self):
+        """Unknown formats are rejected."""
+        response = self.client.get('/api/submissions/export?format=xml', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_listing(self):
+        """The authenticated listing endpoint is reachable with a token."""
+        response = self.client.get('/api/submissions?per_page=5', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['submissions']), 5)
+
+if __name__ == '__main__':
+    unittest.main()
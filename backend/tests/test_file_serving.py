@@ -82,5 +82,44 @@ class FileServingTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.data.decode(), 'File not found')
 
+    def test_uploads_are_cached_as_immutable(self):
+        """Uploads carry long-lived immutable caching headers and validators."""
+        with open(os.path.join(self.app.config['UPLOAD_FOLDER'], '20240101_screenshot_a.png'), 'wb') as f:
+            f.write(b'timestamped upload')
+        
+        response = self.client.get('/uploads/20240101_screenshot_a.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('Last-Modified', response.headers)
+        self.assertFalse(response.headers['ETag'].startswith('W/'))
+        
+    def test_content_addressed_upload_etag(self):
+        """Blobs and their thumbnails use their content hash as the ETag."""
+        sha256 = 'ab' * 32
+        for filename in (f'{sha256}.png', f'{sha256}_w160.webp'):
+            with open(os.path.join(self.app.config['UPLOAD_FOLDER'], filename), 'wb') as f:
+                f.write(b'blob')
+            response = self.client.get(f'/uploads/{filename}')
+            self.assertEqual(response.headers['ETag'], f'"{filename.rsplit(".", 1)[0]}"')
+        
+    def test_conditional_requests(self):
+        """Matching If-None-Match or If-Modified-Since requests get 304 without a body."""
+        with open(os.path.join(self.app.config['UPLOAD_FOLDER'], 'cached.png'), 'wb') as f:
+            f.write(b'cached content')
+        
+        first = self.client.get('/uploads/cached.png')
+        by_etag = self.client.get('/uploads/cached.png', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_etag.data, b'')
+        self.assertIn('immutable', by_etag.headers['Cache-Control'])
+        
+        by_date = self.client.get('/uploads/cached.png', headers={'If-Modified-Since': first.headers['Last-Modified']})
+        self.assertEqual(by_date.status_code, 304)
+        
+        changed = self.client.get('/uploads/cached.png', headers={'If-None-Match': '"something-else"'})
+        self.assertEqual(changed.status_code, 200)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import os
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from apptest import AppTestCase, png_file
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 256
+
+class IdempotencyTestCase(AppTestCase):
+    def _submit(self, key=None, reward='1'):
+        headers = {'Idempotency-Key': key} if key else {}
+        return super()._submit(headers=headers, reward_amount=reward, screenshot=png_file(PNG))
+
+    def _count_submissions(self):
+        with self.app.app_context():
+            from models import db, Submission
+            return db.session.query(Submission).count()
+
+    def test_retry_returns_the_original_submission(self):
+        """A retry with the same key gets the first response and creates nothing."""
+        first = self._submit('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+
+        retry = self._submit('key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.get_json()['submission_id'], first.get_json()['submission_id'])
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self._count_submissions(), 1)
+
+    def test_replay_stores_no_file(self):
+        """A retry is answered before its file part reaches the upload folder."""
+        import ingest
+
+        first = self._submit('key-1')
+        with patch.object(ingest, 'IngestPart', wraps=ingest.IngestPart) as part:
+            retry = self._submit('key-1')
+        self.assertEqual(retry.get_json()['submission_id'], first.get_json()['submission_id'])
+        part.assert_not_called()
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, '.incoming')), [])
+
+    def test_key_reused_for_a_different_submission(self):
+        """A key sent again with other fields is refused instead of replayed."""
+        first = self._submit('key-1')
+        self.assertEqual(self._submit('key-1', reward='2').status_code, 422)
+        response = super()._submit(headers={'Idempotency-Key': 'key-1'}, project_upload='f' * 32)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self._count_submissions(), 1)
+
+        retry = self._submit('key-1')
+        self.assertEqual(retry.get_json()['submission_id'], first.get_json()['submission_id'])
+
+    def test_different_keys_create_separate_submissions(self):
+        """Keys only match themselves; requests without a key are never deduplicated."""
+        self._submit('key-1')
+        self._submit('key-2')
+        self._submit()
+        self._submit()
+        self.assertEqual(self._count_submissions(), 4)
+
+    def test_failed_attempt_can_be_retried(self):
+        """A rejected submission stores nothing under its key."""
+        self.assertEqual(self._submit('key-1', reward='0').status_code, 400)
+        response = self._submit('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+
+    def test_expired_key_is_not_replayed(self):
+        """After IDEMPOTENCY_TTL the key is treated as new and the old row is removed."""
+        from models import db, IdempotencyKey
+
+        self._submit('key-1')
+        with self.app.app_context():
+            db.session.query(IdempotencyKey).update({'created_at': datetime.utcnow() - timedelta(hours=25)})
+            db.session.commit()
+
+        response = self._submit('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+        self.assertEqual(self._count_submissions(), 2)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(IdempotencyKey).count(), 1)
+
+    def test_concurrent_retry_loses_to_the_first_commit(self):
+        """A request whose key was committed by another request meanwhile replays that response."""
+        import app as app_module
+        from models import db, IdempotencyKey
+
+        with self.app.app_context():
+            db.session.add(IdempotencyKey(
+                key='key-1', status_code=201, response=json.dumps({'message': 'ok', 'submission_id': 999})
+            ))
+            db.session.commit()
+
+        real_find = app_module.find_response
+        calls = []
+
+        def find_after_precheck(*args):
+            # Pretend the key was still unknown when the request started
+            calls.append(args)
+            return None if len(calls) == 1 else real_find(*args)
+
+        with patch('app.find_response', side_effect=find_after_precheck):
+            response = self._submit('key-1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['submission_id'], 999)
+        self.assertEqual(self._count_submissions(), 0)
+
+    def test_invalid_key(self):
+        """Keys longer than 255 characters are rejected."""
+        self.assertEqual(self._submit('k' * 256).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
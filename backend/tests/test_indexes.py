@@ -0,0 +1,115 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+from datetime import datetime
+
+from apptest import AppTestCase
+
+SORTS = ['timestamp', 'reward_amount', 'lumen_name', 'ai_agent']
+SAMPLE_VALUES = {
+    'timestamp': datetime(2024, 1, 1, 12, 0, 0),
+    'reward_amount': 5.0,
+    'lumen_name': 'alice',
+    'ai_agent': 'Cursor',
+}
+
+def listing_statements(dialect_name):
+    """Yield (label, statement, params) for every listing query shape the endpoints run"""
+    from listing import listing_statement
+    from projection import parse_fields
+
+    projections = [parse_fields(None), parse_fields('summary'), parse_fields('lumen_name,reward_amount')]
+    for sort_by in SORTS:
+        for order in ['asc', 'desc']:
+            for fields, summary in projections:
+                fields = tuple(fields) if fields is not None else None
+                label = f'{sort_by} {order} fields={fields and len(fields)} summary={summary}'
+                stmt = listing_statement(sort_by, order, fields, summary, None, None, dialect_name)
+                yield label, stmt, {'limit': 10, 'offset': 20}
+
+                # Keyset pages, including one resuming from a NULL ai_agent
+                stmt = listing_statement(sort_by, order, fields, summary, None, 'value', dialect_name)
+                yield f'{label} cursor', stmt, {
+                    'limit': 11, 'offset': 0, 'cursor_value': SAMPLE_VALUES[sort_by], 'cursor_id': 100
+                }
+                if sort_by == 'ai_agent':
+                    stmt = listing_statement(sort_by, order, fields, summary, None, 'null', dialect_name)
+                    yield f'{label} cursor=None', stmt, {'limit': 11, 'offset': 0, 'cursor_id': 100}
+
+def explain(session, prefix, stmt, params):
+    """Run `prefix` (EXPLAIN ...) on a statement with its parameters bound by the driver"""
+    compiled = stmt.compile(dialect=session.get_bind().dialect)
+    values = compiled.construct_params(params)
+    if compiled.positional:
+        values = tuple(values[name] for name in compiled.positiontup)
+    return session.connection().exec_driver_sql(f'{prefix} {compiled}', values).fetchall()
+
+class SQLiteListingPlanTestCase(AppTestCase):
+    def test_listing_plans_use_index(self):
+        """Every sort_by/order combination is served in index order, without a sort step."""
+        from models import db
+        with self.app.app_context():
+            for label, stmt, params in listing_statements('sqlite'):
+                plan = explain(db.session, 'EXPLAIN QUERY PLAN', stmt, params)
+                details = ' | '.join(row[-1] for row in plan)
+                self.assertNotIn('TEMP B-TREE', details, label)
+                self.assertIn('INDEX ix_submissions_', details, label)
+
+    def test_count_plan_uses_index(self):
+        """The unfiltered COUNT(*) reads an index instead of the table rows."""
+        from models import db
+        from listing import count_statement
+        with self.app.app_context():
+            plan = explain(db.session, 'EXPLAIN QUERY PLAN', count_statement(None), {})
+            self.assertIn('USING COVERING INDEX', ' | '.join(row[-1] for row in plan))
+
+    def test_indexes_added_to_existing_table(self):
+        """Startup creates missing composite indexes on an existing submissions table."""
+        from app import create_app
+        from models import db
+        with self.app.app_context():
+            db.session.execute(db.text('DROP INDEX ix_submissions_reward_amount_id'))
+            db.session.commit()
+            db.engine.dispose()
+
+        app = create_app()
+        with app.app_context():
+            names = [index['name'] for index in db.inspect(db.engine).get_indexes('submissions')]
+            self.assertIn('ix_submissions_reward_amount_id', names)
+            db.engine.dispose()
+
+@unittest.skipUnless(os.environ.get('TEST_POSTGRES_URL'), 'TEST_POSTGRES_URL not set')
+class PostgresListingPlanTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up an app against the PostgreSQL database in TEST_POSTGRES_URL."""
+        from app import create_app
+
+        self.env = patch.dict(os.environ, {'DATABASE_URL': os.environ['TEST_POSTGRES_URL']})
+        self.env.start()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+
+    def tearDown(self):
+        """Clean up test environment."""
+        with self.app.app_context():
+            from models import db
+            db.session.remove()
+            db.engine.dispose()
+        self.env.stop()
+
+    def test_listing_plans_use_index(self):
+        """Every sort_by/order combination has an index-ordered plan without a Sort node."""
+        from models import db
+        with self.app.app_context():
+            # Tiny test tables would otherwise favour a seq scan plus sort
+            db.session.execute(db.text('SET enable_seqscan = off'))
+            db.session.execute(db.text('SET enable_sort = off'))
+            for label, stmt, params in listing_statements('postgresql'):
+                plan = json.dumps(explain(db.session, 'EXPLAIN (FORMAT JSON)', stmt, params)[0][0])
+                self.assertNotIn('"Node Type": "Sort"', plan, label)
+                self.assertIn('ix_submissions_', plan, label)
+            db.session.rollback()
+
+if __name__ == '__main__':
+    unittest.main()
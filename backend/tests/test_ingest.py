@@ -0,0 +1,79 @@
+import hashlib
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase, png_file
+
+PNG = b'\x89PNG\r\n\x1a\n' + os.urandom(200 * 1024)
+
+class IngestTestCase(AppTestCase):
+    def _submit(self, **overrides):
+        data = {
+            'screenshot': png_file(PNG),
+            'additional_screenshots': [png_file(PNG[:1000], 'extra1.png'), png_file(PNG[:2000], 'extra2.png')],
+        }
+        data.update(overrides)
+        return super()._submit(**data)
+
+    def _incoming(self):
+        incoming = os.path.join(self.upload_dir, '.incoming')
+        return os.listdir(incoming) if os.path.isdir(incoming) else []
+
+    def test_parts_are_renamed_not_copied(self):
+        """Files land in the upload folder intact without FileStorage.save() copies."""
+        from werkzeug.datastructures import FileStorage
+
+        with patch.object(FileStorage, 'save', side_effect=AssertionError('copied')):
+            response = self._submit()
+        self.assertEqual(response.status_code, 201)
+
+        from models import db, Submission
+        with self.app.app_context():
+            submission = db.session.get(Submission, response.get_json()['submission_id'])
+            with open(os.path.join(self.upload_dir, submission.screenshot_path), 'rb') as f:
+                self.assertEqual(f.read(), PNG)
+            extras = submission.additional_screenshots_list()
+            self.assertEqual(len(extras), 2)
+            with open(os.path.join(self.upload_dir, extras[1]), 'rb') as f:
+                self.assertEqual(f.read(), PNG[:2000])
+        self.assertEqual(self._incoming(), [])
+
+    def test_rejected_submission_leaves_no_files(self):
+        """Parts of an invalid request are removed when the request ends."""
+        response = self._submit(ai_used='NotAnAI')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._incoming(), [])
+        self.assertEqual([name for name in os.listdir(self.upload_dir) if name != '.incoming'], [])
+
+    def test_part_hashes_while_writing(self):
+        """IngestPart reports size and SHA-256 of what was streamed through it."""
+        from ingest import IngestPart, save_upload
+        from werkzeug.datastructures import FileStorage
+
+        part = IngestPart(self.tmp_dir)
+        for i in range(0, len(PNG), 4096):
+            part.write(PNG[i:i + 4096])
+        part.seek(0)
+        self.assertEqual(part.read(8), PNG[:8])
+
+        destination = os.path.join(self.tmp_dir, 'final.png')
+        size, digest = save_upload(FileStorage(part, 'final.png'), destination)
+        self.assertEqual(size, len(PNG))
+        self.assertEqual(digest, hashlib.sha256(PNG).hexdigest())
+        self.assertFalse(os.path.exists(part.path))
+        with open(destination, 'rb') as f:
+            self.assertEqual(f.read(), PNG)
+
+    def test_save_upload_fallback_for_plain_streams(self):
+        """FileStorage objects not created by IngestRequest are copied and hashed."""
+        from ingest import save_upload
+        from werkzeug.datastructures import FileStorage
+
+        destination = os.path.join(self.tmp_dir, 'copy.png')
+        size, digest = save_upload(FileStorage(io.BytesIO(PNG), 'copy.png'), destination)
+        self.assertEqual((size, digest), (len(PNG), hashlib.sha256(PNG).hexdigest()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from apptest import AppTestCase
+
+class ListingBuilderTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and an admin token."""
+        from models import db, Submission
+        from counters import increment_total
+
+        super().setUp()
+
+        with self.app.app_context():
+            for i in range(30):
+                submission = Submission()
+                submission.lumen_name = f'user{i % 7}'
+                submission.prompt_text = f'prompt number {i}'
+                submission.ai_used = 'Claude'
+                submission.ai_agent = 'Cursor' if i % 2 else None
+                submission.reward_amount = float(i % 5)
+                submission.screenshot_path = f'file{i}.png'
+                db.session.add(submission)
+            increment_total(db.session, 30)
+            db.session.commit()
+
+        self.headers = self._admin_headers()
+
+    def test_endpoints_share_results(self):
+        """The admin and public listings return the same payload for the same arguments."""
+        for query in ['', 'page=2&per_page=7&sort_by=reward_amount&order=asc',
+                      'search=user3', 'cursor=&sort_by=ai_agent&per_page=4',
+                      'fields=summary&sort_by=lumen_name']:
+            admin = self.client.get(f'/api/submissions?{query}', headers=self.headers)
+            public = self.client.get(f'/api/public/submissions?{query}')
+            self.assertEqual(admin.status_code, 200, query)
+            admin, public = admin.get_json(), public.get_json()
+            # The second request may be answered from the search count cache
+            admin['pagination'].pop('total_exact', None)
+            public['pagination'].pop('total_exact', None)
+            self.assertEqual(admin, public, query)
+
+    def test_statements_are_reused(self):
+        """Requests of the same shape reuse one built statement and one SQL string."""
+        from sqlalchemy import event
+        from models import db
+        from listing import listing_statement
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/api/public/submissions?page=1&sort_by=lumen_name')
+            hits = listing_statement.cache_info().hits
+            self.client.get('/api/public/submissions?page=3&sort_by=lumen_name')
+            self.assertEqual(listing_statement.cache_info().hits, hits + 1)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        selects = [sql for sql in statements if 'FROM submissions' in sql]
+        self.assertEqual(len(selects), 2)
+        self.assertEqual(selects[0], selects[1])
+
+    def test_invalid_arguments(self):
+        """Bad cursors, fields and relevance cursors are reported as 400."""
+        for query in ['cursor=garbage', 'fields=nope', 'search=user&sort_by=relevance&cursor=']:
+            response = self.client.get(f'/api/public/submissions?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            response = self.client.get(f'/api/submissions?{query}', headers=self.headers)
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_page_bounds(self):
+        """Out-of-range pages and per_page values behave as before."""
+        data = self.client.get('/api/public/submissions?page=0&per_page=500').get_json()
+        self.assertEqual(data['pagination']['page'], 1)
+        self.assertEqual(data['pagination']['per_page'], 100)
+        self.assertEqual(len(data['submissions']), 30)
+
+        data = self.client.get('/api/public/submissions?page=9').get_json()
+        self.assertEqual(data['submissions'], [])
+        self.assertEqual(data['pagination']['pages'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta
+
+from apptest import AppTestCase
+
+class CursorPaginationTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database."""
+        from models import db, Submission
+        from counters import increment_total
+
+        super().setUp()
+
+        # Duplicate sort values and a NULL ai_agent exercise the id tiebreaker
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        agents = ['Cursor', None, 'Copilot', 'Cursor', None, 'Aider', 'Copilot']
+        with self.app.app_context():
+            for i in range(25):
+                submission = Submission()
+                submission.lumen_name = f'user{i % 6}'
+                submission.prompt_text = f'prompt {i}'
+                submission.ai_used = 'Claude' if i % 2 else 'GPT-5'
+                submission.ai_agent = agents[i % len(agents)]
+                submission.reward_amount = float(i % 4)
+                submission.screenshot_path = f'file{i}.png'
+                submission.timestamp = base + timedelta(minutes=i // 3)
+                db.session.add(submission)
+            # Keep the cached total in step, as submit_form does
+            increment_total(db.session, 25)
+            db.session.commit()
+
+    def _walk(self, **params):
+        """Follow next_cursor until the last page and collect the ids"""
+        ids = []
+        params = dict(params, cursor='', per_page=4)
+        while True:
+            response = self.client.get('/api/public/submissions', query_string=params)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            ids.extend(sub['id'] for sub in data['submissions'])
+            if not data['pagination']['has_more']:
+                self.assertIsNone(data['pagination']['next_cursor'])
+                return ids
+            params['cursor'] = data['pagination']['next_cursor']
+
+    def test_cursor_walk_matches_offset_order(self):
+        """Every sort returns the same rows in the same order as offset pagination."""
+        for sort_by in ['timestamp', 'reward_amount', 'lumen_name', 'ai_agent']:
+            for order in ['asc', 'desc']:
+                response = self.client.get('/api/public/submissions', query_string={
+                    'sort_by': sort_by, 'order': order, 'per_page': 100
+                })
+                expected = [sub['id'] for sub in response.get_json()['submissions']]
+                self.assertEqual(len(expected), 25)
+
+                walked = self._walk(sort_by=sort_by, order=order)
+                self.assertEqual(walked, expected, f'{sort_by} {order}')
+
+    def test_cursor_with_search(self):
+        """Cursor mode composes with the search filter."""
+        walked = self._walk(search='Cursor')
+        # Offset pages of a search default to relevance; cursor pages to timestamp
+        response = self.client.get('/api/public/submissions', query_string={
+            'search': 'Cursor', 'sort_by': 'timestamp', 'per_page': 100
+        })
+        expected = [sub['id'] for sub in response.get_json()['submissions']]
+        self.assertEqual(walked, expected)
+
+    def test_cursor_response_has_no_total(self):
+        """Cursor pages skip the COUNT(*) and report next_cursor instead."""
+        response = self.client.get('/api/public/submissions?cursor=&per_page=10')
+        pagination = response.get_json()['pagination']
+        self.assertNotIn('total', pagination)
+        self.assertTrue(pagination['has_more'])
+        self.assertTrue(pagination['next_cursor'])
+
+    def test_invalid_cursor(self):
+        """Garbage cursors are rejected with 400."""
+        response = self.client.get('/api/public/submissions?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_value_of_wrong_type(self):
+        """A cursor value that does not fit the sort column is rejected with 400."""
+        import base64
+        import json
+        for sort_by, value in [('reward_amount', 'abc'), ('reward_amount', True), ('lumen_name', 5), ('ai_agent', [1])]:
+            raw = json.dumps({'s': sort_by, 'o': 'desc', 'v': value, 'id': 3}).encode('utf-8')
+            cursor = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+            response = self.client.get('/api/public/submissions', query_string={'cursor': cursor, 'sort_by': sort_by})
+            self.assertEqual(response.status_code, 400, f'{sort_by} {value!r}')
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        """A cursor issued for one sort cannot be replayed against another."""
+        response = self.client.get('/api/public/submissions?cursor=&per_page=5&sort_by=lumen_name')
+        cursor = response.get_json()['pagination']['next_cursor']
+
+        response = self.client.get('/api/public/submissions', query_string={
+            'cursor': cursor, 'sort_by': 'reward_amount'
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_offset_pagination_unchanged(self):
+        """Requests without a cursor keep the page/pages/total response."""
+        response = self.client.get('/api/public/submissions?page=2&per_page=10')
+        pagination = response.get_json()['pagination']
+        self.assertEqual(pagination['page'], 2)
+        self.assertEqual(pagination['pages'], 3)
+        self.assertEqual(pagination['total'], 25)
+
+if __name__ == '__main__':
+    unittest.main()
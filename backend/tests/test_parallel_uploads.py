@@ -0,0 +1,74 @@
+import os
+import stat
+import hashlib
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase, png_file
+
+def png(index):
+    return b'\x89PNG\r\n\x1a\n' + f'image {index}'.encode() * 100
+
+class ParallelUploadsTestCase(AppTestCase):
+    def _submit(self, extra_count):
+        return super()._submit(
+            screenshot=png_file(png(0), 'main.png'),
+            additional_screenshots=[png_file(png(i), f'extra{i}.png') for i in range(1, extra_count + 1)],
+        )
+
+    def _submission(self, submission_id):
+        with self.app.app_context():
+            from models import db, Submission
+            return db.session.get(Submission, submission_id).to_dict()
+
+    def _record_fsyncs(self):
+        synced = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            synced.append('dir' if stat.S_ISDIR(os.fstat(fd).st_mode) else 'file')
+            return real_fsync(fd)
+        return synced, patch('os.fsync', fsync)
+
+    def test_additional_screenshots_keep_their_order(self):
+        """Screenshots stored concurrently are recorded in the order they were sent."""
+        response = self._submit(12)
+        self.assertEqual(response.status_code, 201)
+
+        submission = self._submission(response.get_json()['submission_id'])
+        expected = [f"{hashlib.sha256(png(i)).hexdigest()}.png" for i in range(1, 13)]
+        self.assertEqual(submission['additional_screenshots'], expected)
+        self.assertEqual(submission['screenshot_path'], f"{hashlib.sha256(png(0)).hexdigest()}.png")
+        for filename in expected:
+            with open(os.path.join(self.upload_dir, filename), 'rb') as f:
+                self.assertTrue(f.read().startswith(b'\x89PNG'))
+
+    def test_every_file_and_the_folder_synced_once(self):
+        """Each new file is fsynced before it is moved and the folder once at the end."""
+        synced, patcher = self._record_fsyncs()
+        with patcher:
+            response = self._submit(5)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(synced.count('file'), 6)
+        self.assertEqual(synced.count('dir'), 1)
+
+    def test_duplicates_are_not_synced_again(self):
+        """Files already in the blob store are neither moved nor synced."""
+        self.assertEqual(self._submit(3).status_code, 201)
+        synced, patcher = self._record_fsyncs()
+        with patcher:
+            response = self._submit(3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(synced, [])
+
+    def test_fsync_can_be_disabled(self):
+        """UPLOAD_FSYNC=false stores the files without syncing them."""
+        self.app.config['UPLOAD_FSYNC'] = False
+        synced, patcher = self._record_fsyncs()
+        with patcher:
+            response = self._submit(3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(synced, [])
+
+if __name__ == '__main__':
+    unittest.main()
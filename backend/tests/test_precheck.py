@@ -0,0 +1,118 @@
+import io
+import os
+import unittest
+
+from apptest import AppTestCase
+
+BOUNDARY = 'precheckboundary'
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 1024
+LARGE_FILE = b'\x89PNG\r\n\x1a\n' + b'\0' * (5 * 1024 * 1024)
+
+FIELDS = [
+    ('lumen_name', 'Alice'), ('prompt_text', 'Early'), ('ai_used', 'Claude'),
+    ('ai_agent', 'Cursor'), ('reward_amount', '1'),
+]
+
+def multipart(parts):
+    """Encode (name, value) fields and (name, filename, content_type, data) files in order"""
+    body = b''
+    for part in parts:
+        body += f'--{BOUNDARY}\r\n'.encode()
+        if len(part) == 2:
+            body += f'Content-Disposition: form-data; name="{part[0]}"\r\n\r\n{part[1]}\r\n'.encode()
+        else:
+            name, filename, content_type, data = part
+            body += (f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n').encode() + data + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+class CountingStream(io.BytesIO):
+    """Request body that records how much of it the app read"""
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+class PrecheckTestCase(AppTestCase):
+    def _post(self, parts, content_length=None, **headers):
+        body = multipart(parts)
+        stream = CountingStream(body)
+        response = self.client.post('/api/submit', input_stream=stream, headers=dict(
+            headers, **{'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}
+        ), environ_overrides={'CONTENT_LENGTH': str(content_length or len(body))})
+        return response, stream, len(body)
+
+    def _stored_files(self):
+        return [name for name in os.listdir(self.upload_dir) if name != '.incoming']
+
+    def test_invalid_field_stops_the_upload(self):
+        """A bad field sent ahead of the file is rejected before the file is read."""
+        fields = [(name, 'NotAnAI' if name == 'ai_used' else value) for name, value in FIELDS]
+        response, stream, size = self._post(fields + [('screenshot', 'shot.png', 'image/png', LARGE_FILE)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Invalid AI option selected')
+        self.assertLess(stream.bytes_read, 256 * 1024)
+        self.assertGreater(size, 5 * 1024 * 1024)
+        self.assertEqual(self._stored_files(), [])
+
+    def test_file_signature_is_sniffed(self):
+        """A file whose first bytes do not match its declared type is rejected early."""
+        fake = b'GIF89a' + LARGE_FILE
+        response, stream, _ = self._post(FIELDS + [('screenshot', 'shot.png', 'image/png', fake)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'File content does not match its type')
+        self.assertLess(stream.bytes_read, 256 * 1024)
+
+        response, _, _ = self._post(FIELDS + [('project', 'work.zip', 'application/zip', PNG)])
+        self.assertEqual(response.status_code, 400)
+
+    def test_declared_type_checked_from_part_headers(self):
+        """The file name and content type are checked when the part starts."""
+        response, stream, _ = self._post(FIELDS + [('screenshot', 'shot.gif', 'image/gif', LARGE_FILE)])
+        self.assertEqual(response.status_code, 400)
+        self.assertLess(stream.bytes_read, 256 * 1024)
+
+    def test_bad_additional_screenshots_are_dropped(self):
+        """Additional screenshots that fail the checks are skipped, not stored."""
+        from models import db, Submission
+
+        response, _, _ = self._post(FIELDS + [
+            ('screenshot', 'shot.png', 'image/png', PNG),
+            ('additional_screenshots', 'fake.png', 'image/png', b'not an image at all'),
+            ('additional_screenshots', 'other.bmp', 'image/bmp', b'BM' + PNG),
+            ('additional_screenshots', 'real.jpg', 'image/jpeg', b'\xff\xd8\xff\xe0' + b'\0' * 64),
+        ])
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            submission = db.session.get(Submission, response.get_json()['submission_id'])
+            self.assertEqual(len(submission.additional_screenshots_list()), 1)
+            self.assertTrue(submission.additional_screenshots_list()[0].endswith('.jpg'))
+        self.assertEqual(len(self._stored_files()), 2)
+
+    def test_fields_after_files_still_accepted(self):
+        """Fields sent after the file are validated by the view as before."""
+        response, _, _ = self._post([('screenshot', 'shot.png', 'image/png', PNG)] + FIELDS)
+        self.assertEqual(response.status_code, 201)
+
+        fields = [(name, '0' if name == 'reward_amount' else value) for name, value in FIELDS]
+        response, _, _ = self._post([('screenshot', 'shot.png', 'image/png', PNG)] + fields)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Reward amount must be at least 0.01')
+
+    def test_header_precheck(self):
+        """Oversized or non-multipart requests are answered without reading the body."""
+        parts = FIELDS + [('screenshot', 'shot.png', 'image/png', PNG)]
+        response, stream, _ = self._post(parts, content_length=self.app.config['MAX_CONTENT_LENGTH'] + 1)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(stream.bytes_read, 0)
+
+        response = self.client.post('/api/submit', json=dict(FIELDS))
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
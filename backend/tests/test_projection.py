@@ -0,0 +1,91 @@
+import unittest
+
+from apptest import AppTestCase
+
+class SparseFieldsTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database."""
+        from models import db, Submission
+
+        super().setUp()
+
+        with self.app.app_context():
+            for i, prompt in enumerate(['short prompt', 'x' * 5000]):
+                submission = Submission()
+                submission.lumen_name = f'user{i}'
+                submission.prompt_text = prompt
+                submission.ai_used = 'Claude'
+                submission.ai_agent = 'Cursor'
+                submission.reward_amount = float(i + 1)
+                submission.screenshot_path = f'file{i}.png'
+                submission.additional_screenshots = 'a.png,b.png'
+                db.session.add(submission)
+            db.session.commit()
+
+    def _get(self, **params):
+        """Fetch a listing and capture the SQL it ran"""
+        from sqlalchemy import event
+        from models import db
+
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get('/api/public/submissions', query_string=params)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        return response, [sql for sql in statements if 'FROM submissions' in sql]
+
+    def test_default_returns_every_field(self):
+        """Without fields= the response is unchanged."""
+        response, _ = self._get(sort_by='reward_amount', order='asc')
+        submission = response.get_json()['submissions'][0]
+        self.assertEqual(submission['prompt_text'], 'short prompt')
+        self.assertEqual(submission['additional_screenshots'], ['a.png', 'b.png'])
+        self.assertNotIn('prompt_truncated', submission)
+
+    def test_selected_fields_only(self):
+        """Unselected columns are neither fetched nor serialized."""
+        response, statements = self._get(fields='lumen_name,reward_amount')
+        self.assertEqual(response.status_code, 200)
+        for submission in response.get_json()['submissions']:
+            self.assertEqual(set(submission), {'id', 'lumen_name', 'reward_amount'})
+        self.assertTrue(statements)
+        for sql in statements:
+            self.assertNotIn('prompt_text', sql)
+            self.assertNotIn('additional_screenshots', sql)
+
+    def test_summary_truncates_prompt_in_sql(self):
+        """The summary projection only reads the start of prompt_text."""
+        response, statements = self._get(fields='summary', sort_by='reward_amount', order='asc')
+        short, long = response.get_json()['submissions']
+        self.assertEqual(short['prompt_text'], 'short prompt')
+        self.assertFalse(short['prompt_truncated'])
+        self.assertEqual(len(long['prompt_text']), 200)
+        self.assertTrue(long['prompt_truncated'])
+        self.assertEqual(long['screenshot_path'], 'file1.png')
+        self.assertTrue(any('substr(submissions.prompt_text' in sql for sql in statements))
+
+    def test_cursor_with_fields_excluding_sort_column(self):
+        """Cursor pages still work when the sort column is not returned."""
+        response, _ = self._get(fields='lumen_name', sort_by='reward_amount', cursor='', per_page=1)
+        data = response.get_json()
+        self.assertEqual(set(data['submissions'][0]), {'id', 'lumen_name'})
+
+        response, _ = self._get(fields='lumen_name', sort_by='reward_amount',
+                                cursor=data['pagination']['next_cursor'], per_page=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['submissions']), 1)
+
+    def test_unknown_field_rejected(self):
+        """Unknown field names return 400."""
+        response, _ = self._get(fields='lumen_name,password_hash')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password_hash', response.get_json()['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from apptest import AppTestCase
+
+ZIP = b'PK\x03\x04' + os.urandom(300 * 1024)
+
+class ResumableUploadTestCase(AppTestCase):
+    def _create(self, **overrides):
+        data = {'filename': 'big project.zip', 'content_type': 'application/zip', 'size': len(ZIP)}
+        data.update(overrides)
+        return self.client.post('/api/uploads', json=data)
+
+    def _put(self, upload_id, offset, chunk):
+        return self.client.put(f'/api/uploads/{upload_id}', data=chunk, headers={
+            'Upload-Offset': str(offset), 'Content-Type': 'application/offset+octet-stream'
+        })
+
+    def _offset(self, upload_id):
+        response = self.client.get(f'/api/uploads/{upload_id}')
+        self.assertEqual(int(response.headers['Upload-Offset']), response.get_json()['offset'])
+        return response.get_json()['offset']
+
+    def _submit(self, upload_id):
+        return super()._submit(project_upload=upload_id)
+
+    def test_interrupted_upload_resumes(self):
+        """A transfer cut off mid-chunk continues from the server's offset."""
+        from models import db, Submission, ResumableUpload
+
+        response = self._create()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.get_json()['upload_id']
+        self.assertEqual(self._offset(upload_id), 0)
+
+        chunk = 100 * 1024
+        self.assertEqual(self._put(upload_id, 0, ZIP[:chunk]).get_json()['offset'], chunk)
+        # The connection drops after part of the second chunk reached the server
+        self._put(upload_id, chunk, ZIP[chunk:chunk + 30000])
+
+        # A retry of the whole chunk is refused and points at the resume offset
+        response = self._put(upload_id, chunk, ZIP[chunk:2 * chunk])
+        self.assertEqual(response.status_code, 409)
+        offset = response.get_json()['offset']
+        self.assertEqual(offset, self._offset(upload_id))
+
+        while offset < len(ZIP):
+            offset = self._put(upload_id, offset, ZIP[offset:offset + chunk]).get_json()['offset']
+
+        response = self.client.post(f'/api/uploads/{upload_id}/finalize',
+                                    json={'sha256': hashlib.sha256(ZIP).hexdigest()})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['complete'])
+
+        response = self._submit(upload_id)
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            submission = db.session.get(Submission, response.get_json()['submission_id'])
+            self.assertEqual(submission.screenshot_path, f'{hashlib.sha256(ZIP).hexdigest()}.zip')
+            self.assertIsNone(db.session.get(ResumableUpload, upload_id))
+        with open(os.path.join(self.upload_dir, submission.screenshot_path), 'rb') as f:
+            self.assertEqual(f.read(), ZIP)
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, '.resumable')), [])
+
+        # An upload backs exactly one submission
+        self.assertEqual(self._submit(upload_id).status_code, 400)
+
+    def test_finalize_checks(self):
+        """Incomplete or corrupted uploads cannot be finalized or submitted."""
+        upload_id = self._create().get_json()['upload_id']
+        self._put(upload_id, 0, ZIP[:1000])
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/finalize').status_code, 409)
+        self.assertEqual(self._submit(upload_id).status_code, 400)
+
+        self._put(upload_id, 1000, ZIP[1000:])
+        response = self.client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': '0' * 64})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}').status_code, 404)
+
+    def test_upload_must_be_zip(self):
+        """A finalized upload that is not a zip is not stored as a project."""
+        from models import db, Blob
+
+        data = b'not a zip, whatever the name says'
+        upload_id = self._create(size=len(data)).get_json()['upload_id']
+        self._put(upload_id, 0, data)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/finalize').status_code, 200)
+
+        response = self._submit(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ZIP', response.get_json()['error'])
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Blob).count(), 0)
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, '.resumable')), [upload_id])
+
+    def test_chunk_past_declared_size(self):
+        """Bytes beyond the declared size are rejected."""
+        upload_id = self._create(size=10).get_json()['upload_id']
+        response = self._put(upload_id, 0, b'0123456789abc')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self._offset(upload_id), 10)
+
+    def test_create_validation(self):
+        """Only zips within the size limit are accepted."""
+        self.assertEqual(self._create(filename='shot.png', content_type='image/png').status_code, 400)
+        self.assertEqual(self._create(size=0).status_code, 400)
+        self.assertEqual(self._create(size='lots').status_code, 400)
+        self.assertEqual(self._create(size=self.app.config['RESUMABLE_MAX_SIZE'] + 1).status_code, 413)
+
+    def test_abandoned_uploads_expire(self):
+        """Uploads older than RESUMABLE_TTL are removed on the next create."""
+        from models import db, ResumableUpload
+
+        upload_id = self._create().get_json()['upload_id']
+        self._put(upload_id, 0, ZIP[:1000])
+        with self.app.app_context():
+            db.session.get(ResumableUpload, upload_id).created_at = datetime.utcnow() - timedelta(days=2)
+            db.session.commit()
+
+        self._create()
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}').status_code, 404)
+        self.assertNotIn(upload_id, os.listdir(os.path.join(self.upload_dir, '.resumable')))
+
+    def test_reaper_expires_without_new_uploads(self):
+        """The background sweep removes abandoned uploads on its own."""
+        from models import db, ResumableUpload
+
+        upload_id = self._create().get_json()['upload_id']
+        with self.app.app_context():
+            db.session.get(ResumableUpload, upload_id).created_at = datetime.utcnow() - timedelta(days=2)
+            db.session.commit()
+
+        self.app.extensions['upload_reaper'].run()
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}').status_code, 404)
+        self.assertNotIn(upload_id, os.listdir(os.path.join(self.upload_dir, '.resumable')))
+
+    def test_per_client_limit(self):
+        """A client cannot hold more than RESUMABLE_MAX_PER_CLIENT open uploads."""
+        self.app.config['RESUMABLE_MAX_PER_CLIENT'] = 2
+        first = self._create().get_json()['upload_id']
+        self.assertEqual(self._create().status_code, 201)
+        self.assertEqual(self._create().status_code, 429)
+
+        # Another address has its own allowance
+        response = self.client.post('/api/uploads', environ_base={'REMOTE_ADDR': '10.0.0.9'}, json={
+            'filename': 'other.zip', 'content_type': 'application/zip', 'size': len(ZIP)
+        })
+        self.assertEqual(response.status_code, 201)
+
+        self.client.delete(f'/api/uploads/{first}')
+        self.assertEqual(self._create().status_code, 201)
+
+    def test_forwarded_client_address(self):
+        """Behind TRUSTED_PROXY_HOPS proxies, the limit applies to the forwarded client address."""
+        from app import create_app
+        from models import db, ResumableUpload
+
+        self.app.config['RESUMABLE_MAX_PER_CLIENT'] = 1
+        forwarded = {'X-Forwarded-For': '203.0.113.7'}
+        self.assertEqual(self._create().status_code, 201)
+        # Without trusted proxies the header is ignored
+        response = self.client.post('/api/uploads', headers=forwarded, json={
+            'filename': 'project.zip', 'content_type': 'application/zip', 'size': len(ZIP)
+        })
+        self.assertEqual(response.status_code, 429)
+
+        with patch.dict(os.environ, {'TRUSTED_PROXY_HOPS': '1'}):
+            app = create_app()
+        app.config['UPLOAD_FOLDER'] = self.upload_dir
+        app.config['RESUMABLE_MAX_PER_CLIENT'] = 1
+        client = app.test_client()
+        try:
+            for status in (201, 429):
+                response = client.post('/api/uploads', headers=forwarded, json={
+                    'filename': 'project.zip', 'content_type': 'application/zip', 'size': len(ZIP)
+                })
+                self.assertEqual(response.status_code, status)
+            with app.app_context():
+                clients = sorted(upload.client for upload in db.session.query(ResumableUpload))
+                self.assertEqual(clients, ['127.0.0.1', '203.0.113.7'])
+        finally:
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+    def test_pending_bytes_limit(self):
+        """Open uploads together cannot declare more than RESUMABLE_MAX_PENDING bytes."""
+        self.app.config['RESUMABLE_MAX_PENDING'] = len(ZIP) * 2
+        self.assertEqual(self._create().status_code, 201)
+        self.assertEqual(self._create().status_code, 201)
+        response = self._create(size=1)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_delete_upload(self):
+        """Clients can abandon an upload explicitly."""
+        upload_id = self._create().get_json()['upload_id']
+        self.assertEqual(self.client.delete(f'/api/uploads/{upload_id}').status_code, 204)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime
+
+from apptest import AppTestCase, png_file
+
+class RollupTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and an admin token."""
+        super().setUp()
+        self.headers = self._admin_headers()
+
+    def _submit(self, ai_used, ai_agent, reward):
+        response = super()._submit(ai_used=ai_used, ai_agent=ai_agent, reward_amount=str(reward), screenshot=png_file())
+        self.assertEqual(response.status_code, 201)
+
+    def _stats(self, **params):
+        response = self.client.get('/api/stats', query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_stats_follow_submissions(self):
+        """Each submission is folded into the rollups as it commits."""
+        self._submit('Claude', 'Cursor', 2.5)
+        self._submit('Claude', 'Cursor', 1.5)
+        self._submit('GPT-5', 'Copilot', 4)
+
+        stats = self._stats()
+        self.assertEqual(stats['totals'], {'submissions': 3, 'reward_total': 8.0})
+        self.assertEqual(stats['by_ai_used'], [
+            {'ai_used': 'Claude', 'submissions': 2, 'reward_total': 4.0},
+            {'ai_used': 'GPT-5', 'submissions': 1, 'reward_total': 4.0},
+        ])
+        self.assertEqual([row['ai_agent'] for row in stats['by_ai_agent']], ['Copilot', 'Cursor'])
+        today = datetime.utcnow().date().isoformat()
+        self.assertEqual(stats['by_day'], [{'day': today, 'submissions': 3, 'reward_total': 8.0}])
+
+    def test_stats_read_only_rollups(self):
+        """The stats query never touches the submissions table."""
+        from sqlalchemy import event
+        from models import db
+
+        self._submit('Claude', 'Cursor', 1)
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self._stats()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        queries = [sql for sql in statements if 'submission_rollups' in sql]
+        self.assertTrue(queries)
+        self.assertFalse([sql for sql in statements if 'FROM submissions' in sql])
+
+    def test_rebuild_matches_incremental(self):
+        """A rebuild backfills rows inserted without going through submit_form."""
+        from models import db, Submission
+        from rollups import rebuild_rollups
+
+        self._submit('Claude', 'Cursor', 2)
+        with self.app.app_context():
+            for day, agent, reward in [(1, None, 1.0), (1, None, 3.0), (2, 'Aider', 5.0)]:
+                submission = Submission()
+                submission.lumen_name = 'Legacy'
+                submission.prompt_text = 'old row'
+                submission.ai_used = 'LLaMA'
+                submission.ai_agent = agent
+                submission.reward_amount = reward
+                submission.screenshot_path = 'old.png'
+                submission.timestamp = datetime(2023, 5, day, 23, 59)
+                db.session.add(submission)
+            db.session.commit()
+            self.assertEqual(self._stats()['totals']['submissions'], 1)
+
+            rebuild_rollups(db.session)
+
+        stats = self._stats()
+        self.assertEqual(stats['totals'], {'submissions': 4, 'reward_total': 11.0})
+        self.assertIn({'ai_agent': None, 'submissions': 2, 'reward_total': 4.0}, stats['by_ai_agent'])
+        self.assertEqual(stats['by_day'][:2], [
+            {'day': '2023-05-01', 'submissions': 2, 'reward_total': 4.0},
+            {'day': '2023-05-02', 'submissions': 1, 'reward_total': 5.0},
+        ])
+
+        range_stats = self._stats(**{'from': '2023-05-02', 'to': '2023-05-31'})
+        self.assertEqual(range_stats['totals'], {'submissions': 1, 'reward_total': 5.0})
+
+    def test_stats_require_auth_and_valid_dates(self):
+        """Stats are admin only and validate the date range."""
+        self.assertEqual(self.client.get('/api/stats').status_code, 401)
+        response = self.client.get('/api/stats?from=yesterday', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from apptest import AppTestCase
+
+class SearchTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database."""
+        super().setUp()
+        self._add('Alice', 'Build a todo app with React hooks', 'Claude', 'Cursor')
+        self._add('Bob', 'Refactor the payment service', 'GPT-5', 'Copilot')
+        self._add('Carol', 'Write React tests, lots of React tests', 'Gemini', 'Aider')
+        self._add('React Fan', 'Unrelated prompt', 'Other', None)
+
+    def _add(self, name, prompt, ai_used, ai_agent):
+        from models import db, Submission
+        with self.app.app_context():
+            submission = Submission()
+            submission.lumen_name = name
+            submission.prompt_text = prompt
+            submission.ai_used = ai_used
+            submission.ai_agent = ai_agent
+            submission.reward_amount = 1.0
+            submission.screenshot_path = 'file.png'
+            db.session.add(submission)
+            db.session.commit()
+
+    def _search(self, term, **params):
+        response = self.client.get('/api/public/submissions', query_string=dict(params, search=term))
+        self.assertEqual(response.status_code, 200)
+        return [sub['lumen_name'] for sub in response.get_json()['submissions']]
+
+    def test_sqlite_uses_fts5(self):
+        """The SQLite build installs the FTS5 index."""
+        self.assertEqual(self.app.extensions['submission_search'], 'fts5')
+
+    def test_search_covers_prompt_text(self):
+        """prompt_text is searchable."""
+        self.assertEqual(self._search('payment'), ['Bob'])
+
+    def test_prefix_and_multi_term_search(self):
+        """Terms match as prefixes and all terms must match."""
+        self.assertEqual(self._search('copil'), ['Bob'])
+        self.assertEqual(self._search('react tests'), ['Carol'])
+
+    def test_results_ranked_by_relevance(self):
+        """A name match outranks prompt matches when no sort_by is given."""
+        names = self._search('react')
+        self.assertEqual(names[0], 'React Fan')
+        self.assertEqual(sorted(names), ['Alice', 'Carol', 'React Fan'])
+
+    def test_explicit_sort_overrides_relevance(self):
+        """sort_by still applies to search results."""
+        names = self._search('react', sort_by='lumen_name', order='asc')
+        self.assertEqual(names, ['Alice', 'Carol', 'React Fan'])
+
+    def test_index_tracks_inserts(self):
+        """Rows inserted after startup are searchable immediately."""
+        self._add('Dave', 'A brand new zeppelin prompt', 'Claude', 'Cursor')
+        self.assertEqual(self._search('zeppelin'), ['Dave'])
+
+    def test_punctuation_only_search(self):
+        """Input without word characters falls back to the LIKE filter."""
+        self.assertEqual(self._search('!?!'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import gzip
+import os
+import unittest
+
+from apptest import AppTestCase
+
+INDEX = b'<!doctype html><html><body><div id="root"></div></body></html>'
+SCRIPT = b'console.log("gallery");\n' * 200
+SCRIPT_NAME = 'assets/index-4f3a9c1b.js'
+
+class StaticAssetsTestCase(AppTestCase):
+    def app_environ(self):
+        # The build is indexed when the app is created, so it is written first
+        from staticfiles import compress_static
+
+        self.static_dir = os.path.join(self.tmp_dir, 'static')
+        os.makedirs(os.path.join(self.static_dir, 'assets'))
+        with open(os.path.join(self.static_dir, 'index.html'), 'wb') as f:
+            f.write(INDEX)
+        with open(os.path.join(self.static_dir, SCRIPT_NAME), 'wb') as f:
+            f.write(SCRIPT)
+        with open(os.path.join(self.static_dir, 'favicon.ico'), 'wb') as f:
+            f.write(b'\x00' * 64)
+        compress_static(self.static_dir)
+        return {'STATIC_FOLDER': self.static_dir}
+
+    def test_compress_static(self):
+        """Compressible files get a gzip copy; small files are left alone."""
+        self.assertTrue(os.path.exists(os.path.join(self.static_dir, SCRIPT_NAME + '.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.static_dir, 'favicon.ico.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.static_dir, 'index.html.gz')))
+
+    def test_gzip_variant(self):
+        """Clients accepting gzip get the precompressed copy."""
+        response = self.client.get(f'/{SCRIPT_NAME}', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), SCRIPT)
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+
+    def test_identity(self):
+        """Clients without gzip get the original bytes under a different ETag."""
+        plain = self.client.get(f'/{SCRIPT_NAME}')
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.data, SCRIPT)
+        self.assertIn('javascript', plain.headers['Content-Type'])
+
+        compressed = self.client.get(f'/{SCRIPT_NAME}', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotEqual(plain.headers['ETag'], compressed.headers['ETag'])
+
+    def test_hashed_assets_immutable(self):
+        """Hashed build assets are immutable; index.html is revalidated."""
+        asset = self.client.get(f'/{SCRIPT_NAME}')
+        self.assertIn('immutable', asset.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', asset.headers['Cache-Control'])
+
+        index = self.client.get('/')
+        self.assertEqual(index.data, INDEX)
+        self.assertIn('no-cache', index.headers['Cache-Control'])
+        self.assertNotIn('immutable', index.headers['Cache-Control'])
+
+    def test_not_modified(self):
+        """A matching If-None-Match gets 304 without a body."""
+        first = self.client.get(f'/{SCRIPT_NAME}', headers={'Accept-Encoding': 'gzip'})
+        second = self.client.get(f'/{SCRIPT_NAME}', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag'],
+        })
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+    def test_client_routes_get_index(self):
+        """Unknown paths fall back to index.html for client-side routing."""
+        response = self.client.get('/projects/42')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, INDEX)
+        self.assertIn('text/html', response.headers['Content-Type'])
+
+    def test_manifest_built_once(self):
+        """Files added after startup are not looked up on disk."""
+        with open(os.path.join(self.static_dir, 'late.txt'), 'wb') as f:
+            f.write(b'late')
+        response = self.client.get('/late.txt')
+        self.assertEqual(response.data, INDEX)
+
+    def test_traversal(self):
+        """Paths outside the static folder are never served."""
+        response = self.client.get('/../test.db')
+        self.assertNotEqual(response.data[:15], b'SQLite format 3')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,352 @@
+import io
+import os
+import base64
+import shutil
+import hashlib
+import zipfile
+import tempfile
+import unittest
+from urllib.parse import urlencode, urlsplit, parse_qs
+
+try:
+    import boto3
+    from botocore.response import StreamingBody
+    from botocore.stub import Stubber
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+from apptest import AppTestCase
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('README.md', '# Project\n' * 50, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+class MissingObject(Exception):
+    """Shaped like botocore's ClientError for a missing key"""
+
+    def __init__(self):
+        super().__init__('Not Found')
+        self.response = {'Error': {'Code': '404'}}
+
+class LocalObjectStore:
+    """In-memory stand-in for an S3-compatible server (the calls S3Storage makes)"""
+
+    def __init__(self):
+        self.objects = {}
+        self.checksums = {}
+        self.uploads = 0
+
+    def head_object(self, Bucket, Key, ChecksumMode=None):
+        if (Bucket, Key) not in self.objects:
+            raise MissingObject()
+        response = {'ContentLength': len(self.objects[(Bucket, Key)])}
+        if ChecksumMode == 'ENABLED' and (Bucket, Key) in self.checksums:
+            response['ChecksumSHA256'] = self.checksums[(Bucket, Key)]
+        return response
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise MissingObject()
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1]
+        return {'Body': io.BytesIO(data)}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = f.read()
+        self.uploads += 1
+
+    def download_file(self, Bucket, Key, Filename):
+        if (Bucket, Key) not in self.objects:
+            raise MissingObject()
+        with open(Filename, 'wb') as f:
+            f.write(self.objects[(Bucket, Key)])
+
+    def copy(self, CopySource, Bucket, Key, ExtraArgs=None):
+        self.objects[(Bucket, Key)] = self.objects[(CopySource['Bucket'], CopySource['Key'])]
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        query = {k: v for k, v in Params.items() if k not in ('Bucket', 'Key')}
+        return f"https://store.test/{Params['Bucket']}/{Params['Key']}?{urlencode(dict(query, Expires=ExpiresIn))}"
+
+    def put_presigned(self, url, data, headers, verify_checksum=True):
+        """What the bucket does with a client's PUT to a pre-signed URL.
+
+        Without `verify_checksum` it behaves like a server that ignores the
+        checksum header and keeps none.
+        """
+        bucket, key = url.split('?')[0][len('https://store.test/'):].split('/', 1)
+        if parse_qs(urlsplit(url).query)['ContentLength'] != [str(len(data))]:
+            return 403
+        checksum = base64.b64encode(hashlib.sha256(data).digest()).decode('ascii')
+        if verify_checksum:
+            if headers.get('x-amz-checksum-sha256') != checksum:
+                return 400
+            self.checksums[(bucket, key)] = checksum
+        self.objects[(bucket, key)] = data
+        return 200
+
+class StorageTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app storing uploads in an in-memory object store."""
+        from storage import S3Storage
+
+        super().setUp()
+        self.store = LocalObjectStore()
+        self.app.extensions['storage'] = S3Storage(self.store, 'gallery', self.upload_dir, prefix='uploads/')
+
+    def _screenshot_path(self, response):
+        with self.app.app_context():
+            from models import db, Submission
+            return db.session.get(Submission, response.get_json()['submission_id']).screenshot_path
+
+    def _clear_cache(self, filename):
+        os.unlink(os.path.join(self.upload_dir, filename))
+
+    def test_submission_is_stored_in_bucket(self):
+        """Submitted files are uploaded once under their blob name."""
+        response = self._submit(screenshot=(io.BytesIO(PNG), 'shot.png', 'image/png'))
+        self.assertEqual(response.status_code, 201)
+        filename = self._screenshot_path(response)
+        self.assertEqual(self.store.objects[('gallery', f'uploads/{filename}')], PNG)
+
+        response = self._submit(screenshot=(io.BytesIO(PNG), 'again.png', 'image/png'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.store.uploads, 1)
+
+    def test_download_redirects_to_bucket(self):
+        """Originals are fetched from the bucket through a pre-signed URL."""
+        response = self._submit(project=(io.BytesIO(make_zip()), 'project.zip', 'application/zip'))
+        filename = self._screenshot_path(response)
+
+        response = self.client.get(f'/uploads/{filename}')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(f'/gallery/uploads/{filename}?', response.headers['Location'])
+        self.assertIn('ResponseContentDisposition=attachment', response.headers['Location'])
+        self.assertIn('private', response.headers['Cache-Control'])
+
+    def test_zip_members_read_through_cache(self):
+        """A zip missing from the local cache is fetched from the bucket."""
+        response = self._submit(project=(io.BytesIO(make_zip()), 'project.zip', 'application/zip'))
+        filename = self._screenshot_path(response)
+        self._clear_cache(filename)
+
+        response = self.client.get(f'/uploads/{filename}/README.md')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'# Project\n' * 50)
+        self.assertTrue(os.path.exists(os.path.join(self.upload_dir, filename)))
+
+    def test_cache_is_bounded(self):
+        """Cached copies beyond the cache size are evicted and fetched again when needed."""
+        from storage import S3Storage, get_storage
+        self.app.extensions['storage'] = S3Storage(self.store, 'gallery', self.upload_dir, prefix='uploads/',
+                                                   cache_size=150)
+        first = self._screenshot_path(self._submit(screenshot=(io.BytesIO(PNG), 'a.png', 'image/png')))
+        second = self._screenshot_path(self._submit(screenshot=(io.BytesIO(PNG + b'2'), 'b.png', 'image/png')))
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, first)))
+        self.assertTrue(os.path.exists(os.path.join(self.upload_dir, second)))
+
+        with open(get_storage(self.app).local_path(first), 'rb') as f:
+            self.assertEqual(f.read(), PNG)
+
+    def test_missing_object(self):
+        """Files in neither the cache nor the bucket are not found."""
+        from storage import get_storage
+        with self.assertRaises(FileNotFoundError):
+            get_storage(self.app).local_path(f"{'0' * 64}.zip")
+        response = self.client.get(f"/uploads/{'0' * 64}.zip/README.md")
+        self.assertEqual(response.status_code, 404)
+
+    def _direct_upload(self, data):
+        response = self.client.post('/api/uploads/direct', json={
+            'filename': 'project.zip', 'content_type': 'application/zip',
+            'size': len(data), 'sha256': hashlib.sha256(data).hexdigest(),
+        })
+        return response
+
+    def test_direct_upload(self):
+        """A zip PUT straight into the bucket is submitted by upload id without re-uploading it."""
+        data = make_zip()
+        self.assertTrue(self.client.get('/api/uploads/direct').get_json()['enabled'])
+        response = self._direct_upload(data)
+        self.assertEqual(response.status_code, 201)
+        upload = response.get_json()
+        self.assertEqual(upload['method'], 'PUT')
+        self.assertEqual(self.store.put_presigned(upload['url'], data, upload['headers']), 200)
+
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._screenshot_path(response), upload['filename'])
+        self.assertEqual(self.store.uploads, 0)
+        self.assertEqual(list(self.store.objects), [('gallery', f"uploads/{upload['filename']}")])
+        with self.app.app_context():
+            from models import db, Blob, DirectUpload
+            blob = db.session.query(Blob).filter(Blob.filename == upload['filename']).one()
+            self.assertEqual((blob.size, blob.ref_count), (len(data), 1))
+            self.assertEqual(db.session.query(DirectUpload).count(), 0)
+
+        # An upload backs one submission
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+
+        # The same content again has to be uploaded, and then shares the blob
+        upload = self._direct_upload(data).get_json()
+        self.store.put_presigned(upload['url'], data, upload['headers'])
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.store.objects), 1)
+
+    def test_existing_blob_needs_an_upload(self):
+        """Knowing the hash of a stored zip is not enough to submit it."""
+        data = make_zip()
+        response = self._submit(project=(io.BytesIO(data), 'project.zip', 'application/zip'))
+        self.assertEqual(response.status_code, 201)
+
+        upload = self._direct_upload(data).get_json()
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        response = self._submit(direct_upload=f"{hashlib.sha256(data).hexdigest()}.zip")
+        self.assertEqual(response.status_code, 400)
+
+    def test_direct_upload_checksum(self):
+        """The pre-signed URL only accepts the declared content."""
+        data = make_zip()
+        upload = self._direct_upload(data).get_json()
+        other = data[:-1] + bytes([data[-1] ^ 1])
+        self.assertEqual(self.store.put_presigned(upload['url'], other, upload['headers']), 400)
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+
+    def test_direct_upload_checksum_is_verified_on_claim(self):
+        """Bytes that do not hash to the declared SHA-256 never take its blob name."""
+        data = make_zip()
+        upload = self._direct_upload(data).get_json()
+        other = data[:-1] + bytes([data[-1] ^ 1])
+        self.store.put_presigned(upload['url'], other, upload['headers'], verify_checksum=False)
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.store.objects, {})
+
+    def test_direct_upload_size(self):
+        """The pre-signed URL only accepts the declared size, and the claim checks it again."""
+        data = make_zip()
+        upload = self._direct_upload(data).get_json()
+        self.assertEqual(self.store.put_presigned(upload['url'], data + b'more', upload['headers']), 403)
+
+        self.store.objects[('gallery', f"uploads/.direct/{upload['upload_id']}")] = data + b'more'
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.store.objects, {})
+
+    def test_pending_uploads_share_one_limit(self):
+        """Direct and resumable uploads count toward the same RESUMABLE_MAX_PENDING."""
+        data = make_zip()
+        self.app.config['RESUMABLE_MAX_PENDING'] = len(data) * 2
+        self.assertEqual(self._direct_upload(data).status_code, 201)
+        response = self.client.post('/api/uploads', json={
+            'filename': 'project.zip', 'content_type': 'application/zip', 'size': len(data),
+        })
+        self.assertEqual(response.status_code, 201)
+        response = self._direct_upload(data)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '300')
+
+    def test_direct_upload_must_be_zip(self):
+        """Objects that are not zips cannot be submitted as a project."""
+        data = b'not a zip at all'
+        upload = self._direct_upload(data).get_json()
+        self.store.put_presigned(upload['url'], data, upload['headers'])
+        response = self._submit(direct_upload=upload['upload_id'])
+        self.assertEqual(response.status_code, 400)
+        response = self._submit(direct_upload='../database.db')
+        self.assertEqual(response.status_code, 400)
+
+    def test_direct_uploads_are_limited_and_expire(self):
+        """Each client has a few open direct uploads; expired ones lose their staging objects."""
+        from datetime import datetime, timedelta
+        from models import db, DirectUpload
+        from resumable import UploadReaper
+
+        uploads = [self._direct_upload(make_zip()) for _ in range(4)]
+        self.assertEqual([response.status_code for response in uploads], [201, 201, 201, 429])
+        upload = uploads[0].get_json()
+        self.store.put_presigned(upload['url'], make_zip(), upload['headers'])
+
+        with self.app.app_context():
+            db.session.query(DirectUpload).update({'created_at': datetime.utcnow() - timedelta(hours=25)})
+            db.session.commit()
+        UploadReaper(self.app, interval=0).run()
+        self.assertEqual(self.store.objects, {})
+        self.assertEqual(self._direct_upload(make_zip()).status_code, 201)
+
+    def test_local_storage_has_no_direct_uploads(self):
+        """Without a bucket, clients are told to upload through the app."""
+        self.app.extensions['storage'] = None
+        self.assertFalse(self.client.get('/api/uploads/direct').get_json()['enabled'])
+        self.assertEqual(self._direct_upload(make_zip()).status_code, 501)
+
+@unittest.skipIf(boto3 is None, 'boto3 is not installed')
+class S3ClientTestCase(unittest.TestCase):
+    """S3Storage against a real botocore client, with the HTTP calls stubbed"""
+
+    def setUp(self):
+        from botocore.config import Config
+        from storage import S3Storage
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.client = boto3.client(
+            's3', endpoint_url='http://store.test', region_name='us-east-1',
+            aws_access_key_id='key', aws_secret_access_key='secret',
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'}),
+        )
+        self.storage = S3Storage(self.client, 'gallery', self.tmp_dir, prefix='uploads/')
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_upload_url_signs_checksum(self):
+        """The pre-signed PUT only accepts the declared type, size and checksum."""
+        data = make_zip()
+        url, headers = self.storage.upload_url('.direct/abc', 'application/zip', len(data),
+                                               hashlib.sha256(data).hexdigest())
+        query = parse_qs(urlsplit(url).query)
+        self.assertEqual(urlsplit(url).path, '/gallery/uploads/.direct/abc')
+        signed = query['X-Amz-SignedHeaders'][0].split(';')
+        self.assertIn('content-length', signed)
+        self.assertIn('content-type', signed)
+        self.assertIn('x-amz-checksum-sha256', signed)
+        self.assertEqual(headers['x-amz-checksum-sha256'], base64.b64encode(hashlib.sha256(data).digest()).decode())
+
+    def test_sha256_from_verified_checksum(self):
+        """The checksum the bucket kept is asked for explicitly and used as is."""
+        data = make_zip()
+        self.stubber.add_response('head_object', {
+            'ContentLength': len(data), 'ChecksumSHA256': base64.b64encode(hashlib.sha256(data).digest()).decode()
+        }, {'Bucket': 'gallery', 'Key': 'uploads/.direct/abc', 'ChecksumMode': 'ENABLED'})
+        self.assertEqual(self.storage.sha256('.direct/abc'), hashlib.sha256(data).hexdigest())
+        self.stubber.assert_no_pending_responses()
+
+    def test_sha256_without_checksum(self):
+        """Objects stored without a checksum are read and hashed."""
+        data = make_zip()
+        self.stubber.add_response('head_object', {'ContentLength': len(data)},
+                                  {'Bucket': 'gallery', 'Key': 'uploads/.direct/abc', 'ChecksumMode': 'ENABLED'})
+        self.stubber.add_response('get_object', {'Body': StreamingBody(io.BytesIO(data), len(data))},
+                                  {'Bucket': 'gallery', 'Key': 'uploads/.direct/abc'})
+        self.assertEqual(self.storage.sha256('.direct/abc'), hashlib.sha256(data).hexdigest())
+        self.stubber.assert_no_pending_responses()
+
+if __name__ == '__main__':
+    unittest.main()
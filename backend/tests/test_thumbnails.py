@@ -0,0 +1,105 @@
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase, png_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+def make_png(width, height, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+@unittest.skipUnless(Image, 'Pillow is not installed')
+class ThumbnailTestCase(AppTestCase):
+    def app_environ(self):
+        return {'THUMBNAIL_WORKERS': '2'}
+
+    def setUp(self):
+        """Set up an app that generates thumbnails in the background."""
+        super().setUp()
+        self.worker = self.app.extensions['thumbnails']
+
+    def tearDown(self):
+        """Wait for the thumbnail threads before cleaning up."""
+        self.worker.wait()
+        super().tearDown()
+
+    def _submit(self, screenshot, extras=()):
+        response = super()._submit(
+            screenshot=png_file(screenshot),
+            additional_screenshots=[png_file(extra, f'extra{i}.png') for i, extra in enumerate(extras)],
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['submission_id']
+
+    def _listed(self, submission_id):
+        response = self.client.get('/api/public/submissions?per_page=100')
+        return next(sub for sub in response.get_json()['submissions'] if sub['id'] == submission_id)
+
+    def test_thumbnails_for_every_screenshot(self):
+        """Primary and additional screenshots get one thumbnail per size."""
+        from thumbnails import THUMBNAIL_SIZES
+
+        submission_id = self._submit(make_png(1600, 900, 'red'), extras=[make_png(300, 600, 'blue')])
+        self.worker.wait()
+
+        submission = self._listed(submission_id)
+        sources = [submission['screenshot_path']] + submission['additional_screenshots']
+        self.assertEqual(sorted(submission['thumbnails']), sorted(sources))
+
+        primary = submission['thumbnails'][submission['screenshot_path']]
+        self.assertEqual(sorted(primary), sorted(str(size) for size in THUMBNAIL_SIZES))
+        for size in THUMBNAIL_SIZES:
+            response = self.client.get(f"/uploads/{primary[str(size)]}")
+            self.assertEqual(response.status_code, 200)
+            with Image.open(io.BytesIO(response.data)) as thumb:
+                self.assertEqual(thumb.width, size)
+                self.assertEqual(thumb.height, round(900 * size / 1600))
+            response.close()
+
+        # Images smaller than a thumbnail size are not scaled up
+        extra = submission['thumbnails'][submission['additional_screenshots'][0]]
+        with Image.open(os.path.join(self.upload_dir, extra['480'])) as thumb:
+            self.assertEqual(thumb.size, (240, 480))
+
+    def test_thumbnails_change_listing_etag(self):
+        """Recording thumbnails invalidates cached listings."""
+        # Read the ETag before the worker can record anything
+        with patch.object(self.worker, 'submit'):
+            submission_id = self._submit(make_png(640, 480, 'white'))
+        etag = self.client.get('/api/public/submissions').headers['ETag']
+        self.assertEqual(self._listed(submission_id)['thumbnails'], {})
+
+        self.worker.submit(submission_id, [self._listed(submission_id)['screenshot_path']])
+        self.worker.wait()
+        response = self.client.get('/api/public/submissions', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self._listed(submission_id)['thumbnails'])
+
+    def test_undecodable_screenshot_is_skipped(self):
+        """A screenshot Pillow cannot read leaves the submission without thumbnails."""
+        submission_id = self._submit(b'\x89PNG\r\n\x1a\nnot really a png')
+        self.worker.wait()
+        self.assertEqual(self._listed(submission_id)['thumbnails'], {})
+        leftovers = [name for name in os.listdir(self.upload_dir) if name.endswith('.tmp')]
+        self.assertEqual(leftovers, [])
+
+    def test_failed_save_leaves_no_temporary_file(self):
+        """A thumbnail that cannot be written is not left behind half-written."""
+        from thumbnails import generate_thumbnails
+
+        with open(os.path.join(self.upload_dir, 'shot.png'), 'wb') as f:
+            f.write(make_png(640, 480, 'green'))
+        with patch.object(Image.Image, 'save', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                generate_thumbnails(self.upload_dir, 'shot.png')
+        self.assertEqual(os.listdir(self.upload_dir), ['shot.png'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import io
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+SHA = 'cd' * 32
+
+@unittest.skipIf(Image is None, 'Pillow is not installed')
+class VariantsTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app with one large screenshot in a throwaway upload folder."""
+        super().setUp()
+        Image.new('RGB', (2000, 1000), (200, 30, 30)).save(os.path.join(self.upload_dir, f'{SHA}.png'))
+
+    def _image(self, response):
+        return Image.open(io.BytesIO(response.data))
+
+    def test_resized_variant(self):
+        """A variant fits the requested box, keeps the aspect ratio and the source format."""
+        response = self.client.get(f'/uploads/{SHA}.png?w=320')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'image/png')
+        self.assertEqual(self._image(response).size, (320, 160))
+
+        boxed = self._image(self.client.get(f'/uploads/{SHA}.png?w=640&h=160'))
+        self.assertEqual(boxed.size, (320, 160))
+
+    def test_re_encoded_variant(self):
+        """fmt re-encodes the variant."""
+        webp = self.client.get(f'/uploads/{SHA}.png?w=480&fmt=webp')
+        self.assertEqual(webp.headers['Content-Type'], 'image/webp')
+        self.assertEqual(self._image(webp).format, 'WEBP')
+        jpeg = self.client.get(f'/uploads/{SHA}.png?fmt=jpeg')
+        self.assertEqual(self._image(jpeg).format, 'JPEG')
+        self.assertEqual(self._image(jpeg).size, (2000, 1000))
+
+    def test_variants_are_cached(self):
+        """The second request for a variant is served from disk without rendering."""
+        self.client.get(f'/uploads/{SHA}.png?w=320')
+        self.assertTrue(os.path.exists(os.path.join(self.upload_dir, '.variants', f'{SHA}_320x0.png')))
+        with patch('variants.render_variant', side_effect=AssertionError('rendered again')):
+            response = self.client.get(f'/uploads/{SHA}.png?w=320')
+        self.assertEqual(response.status_code, 200)
+
+    def test_caching_headers(self):
+        """Variants are immutable and revalidate with their own ETag."""
+        response = self.client.get(f'/uploads/{SHA}.png?w=160')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.headers['ETag'], f'"{SHA}_160x0"')
+        cached = self.client.get(f'/uploads/{SHA}.png?w=160', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_undecodable_image_serves_original(self):
+        """A truncated or garbage image is served unresized and leaves no temporary file."""
+        with open(os.path.join(self.upload_dir, f'{SHA}.png'), 'rb') as f:
+            truncated = f.read()[:200]
+        corrupt = {'ab' * 32: truncated, 'ef' * 32: b'\x89PNG\r\n\x1a\n' + b'garbage' * 50}
+        for sha, data in corrupt.items():
+            with open(os.path.join(self.upload_dir, f'{sha}.png'), 'wb') as f:
+                f.write(data)
+            response = self.client.get(f'/uploads/{sha}.png?w=320&fmt=webp')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers['Content-Type'], 'image/png')
+            self.assertEqual(response.data, data)
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, '.variants')), [])
+
+        # Over Pillow's decompression bomb limit
+        with patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            response = self.client.get(f'/uploads/{SHA}.png?w=320')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._image(response).size, (2000, 1000))
+
+    def test_invalid_parameters(self):
+        """Sizes and formats outside the allow-lists, and non-images, are rejected."""
+        with open(os.path.join(self.upload_dir, 'project.zip'), 'wb') as f:
+            f.write(b'PK\x05\x06' + b'\0' * 18)
+        self.assertEqual(self.client.get(f'/uploads/{SHA}.png?w=333').status_code, 400)
+        self.assertEqual(self.client.get(f'/uploads/{SHA}.png?h=abc').status_code, 400)
+        self.assertEqual(self.client.get(f'/uploads/{SHA}.png?fmt=gif').status_code, 400)
+        self.assertEqual(self.client.get('/uploads/project.zip?w=320').status_code, 400)
+        self.assertEqual(self.client.get('/uploads/missing.png?w=320').status_code, 404)
+
+    def test_hit_refreshes_recency(self):
+        """Serving a cached variant moves its access time forward, not its modification time."""
+        self.client.get(f'/uploads/{SHA}.png?w=320')
+        path = os.path.join(self.upload_dir, '.variants', f'{SHA}_320x0.png')
+        mtime = os.stat(path).st_mtime
+        os.utime(path, (time.time() - 3600, mtime))
+
+        self.client.get(f'/uploads/{SHA}.png?w=320')
+        self.assertGreater(os.stat(path).st_atime, time.time() - 60)
+        self.assertEqual(os.stat(path).st_mtime, mtime)
+
+    def test_least_recently_used_variants_are_evicted(self):
+        """Going over the size limit deletes the oldest variants first, down to 90% of it."""
+        from variants import VariantCache
+
+        directory = os.path.join(self.upload_dir, '.variants')
+        os.makedirs(directory)
+        now = time.time()
+        for age, name in [(300, 'oldest.png'), (200, 'older.png'), (100, 'recent.png')]:
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(os.path.join(directory, name), (now - age, now - age))
+        with open(os.path.join(directory, 'new.png'), 'wb') as f:
+            f.write(b'x' * 100)
+
+        cache = VariantCache(max_bytes=300)
+        cache.added(directory, 'new.png', 100)
+        self.assertEqual(sorted(os.listdir(directory)), ['new.png', 'recent.png'])
+
+if __name__ == '__main__':
+    unittest.main()
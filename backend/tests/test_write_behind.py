@@ -0,0 +1,198 @@
+import io
+import os
+import hashlib
+import zipfile
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase, png_file
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 256
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('README.md', '# Project\n')
+    return buffer.getvalue()
+
+class WriteBehindTestCase(AppTestCase):
+    def app_environ(self):
+        return {'SUBMIT_WRITE_BEHIND': 'true', 'SUBMIT_QUEUE_PATH': os.path.join(self.tmp_dir, 'queue.db')}
+
+    def setUp(self):
+        """Set up a write-behind app whose writer is driven by the test."""
+        super().setUp()
+        self.writer = self.app.extensions['submission_writer']
+        self.writer.stop()
+
+    def _submit(self, name='Alice', content=PNG, headers=None):
+        return super()._submit(headers=headers, lumen_name=name, reward_amount='2.5', screenshot=png_file(content))
+
+    def _receipt(self, receipt_id):
+        return self.client.get(f'/api/submit/receipts/{receipt_id}')
+
+    def _count(self, model):
+        with self.app.app_context():
+            from models import db
+            return db.session.query(model).count()
+
+    def test_submission_is_acknowledged_before_it_is_written(self):
+        """A queued submission gets 202 and a receipt; the row appears after the flush."""
+        from models import Submission, Blob, Counter
+
+        response = self._submit()
+        self.assertEqual(response.status_code, 202)
+        receipt_id = response.get_json()['receipt_id']
+        self.assertEqual(response.headers['Location'], f'/api/submit/receipts/{receipt_id}')
+        self.assertEqual(self._receipt(receipt_id).get_json()['status'], 'queued')
+        self.assertEqual(self._count(Submission), 0)
+        self.assertEqual(self._count(Blob), 0)
+
+        self.assertEqual(self.writer.flush(), 1)
+        body = self._receipt(receipt_id).get_json()
+        self.assertEqual(body['status'], 'written')
+        with self.app.app_context():
+            from models import db
+            submission = db.session.get(Submission, body['submission_id'])
+            self.assertEqual(submission.lumen_name, 'Alice')
+            self.assertEqual(submission.reward_amount, 2.5)
+            self.assertEqual(db.session.query(Blob).one().ref_count, 1)
+            self.assertEqual(db.session.get(Counter, 'submissions_total').value, 1)
+
+    def test_burst_is_written_in_one_group_commit(self):
+        """Every queued submission is written by a single flush and commit."""
+        from models import db
+
+        receipts = [self._submit(name=f'user{i}').get_json()['receipt_id'] for i in range(5)]
+        with self.app.app_context(), patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+            self.assertEqual(self.writer.flush(), 5)
+        self.assertEqual(commit.call_count, 1)
+
+        ids = [self._receipt(receipt_id).get_json()['submission_id'] for receipt_id in receipts]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_replayed_entries_are_not_written_twice(self):
+        """An entry left in the queue after its batch committed is only dropped."""
+        from models import Submission
+
+        receipt_id = self._submit().get_json()['receipt_id']
+        with patch.object(self.writer.queue, 'finish', side_effect=OSError('crash')):
+            with self.assertRaises(OSError):
+                self.writer.flush()
+
+        with patch('writebehind.CLAIM_TIMEOUT', -1):
+            self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self._count(Submission), 1)
+        self.assertEqual(self._receipt(receipt_id).get_json()['status'], 'written')
+        self.assertEqual(self.writer.flush(), 0)
+
+    def test_failed_entry_does_not_block_the_batch(self):
+        """A queued entry that cannot be inserted is reported without losing the others."""
+        from writebehind import queue_payload
+        from datetime import datetime
+
+        good = self._submit().get_json()['receipt_id']
+        bad = self.writer.queue.enqueue(queue_payload(
+            {'lumen_name': None, 'prompt_text': 'x', 'ai_used': 'Claude', 'ai_agent': 'Cursor', 'reward_amount': 1.0},
+            [('missing.png', 1, 'f' * 64)], datetime.utcnow()
+        ))
+        self.writer.queue.max_attempts = 1
+        self.assertEqual(self.writer.flush(), 2)
+
+        self.assertEqual(self._receipt(good).get_json()['status'], 'written')
+        body = self._receipt(bad).get_json()
+        self.assertEqual(body['status'], 'failed')
+        self.assertIn('error', body)
+
+    def test_failed_entries_are_retried_then_expire(self):
+        """A failing entry is retried a bounded number of times, then dropped after the TTL."""
+        import sqlite3
+        from contextlib import closing
+        from writebehind import queue_payload, CLAIM_TIMEOUT
+        from datetime import datetime
+
+        queue = self.writer.queue
+        queue.max_attempts = 3
+        bad = queue.enqueue(queue_payload(
+            {'lumen_name': None, 'prompt_text': 'x', 'ai_used': 'Claude', 'ai_agent': 'Cursor', 'reward_amount': 1.0},
+            [('missing.png', 1, 'f' * 64)], datetime.utcnow()
+        ))
+
+        def shift(column, seconds):
+            with closing(sqlite3.connect(queue.path, isolation_level=None)) as conn:
+                conn.execute(f'UPDATE entries SET {column} = {column} - ?', (seconds,))
+
+        self.assertEqual(self.writer.flush(), 1)
+        body = self._receipt(bad).get_json()
+        self.assertEqual(body['status'], 'queued')
+        self.assertIn('error', body)
+        # Not retried before its claim expires
+        self.assertEqual(self.writer.flush(), 0)
+        for _ in range(2):
+            shift('claimed_at', CLAIM_TIMEOUT + 1)
+            self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self._receipt(bad).get_json()['status'], 'failed')
+        shift('claimed_at', CLAIM_TIMEOUT + 1)
+        self.assertEqual(self.writer.flush(), 0)
+
+        shift('failed_at', 169 * 3600)
+        queue.finish([], {})
+        self.assertEqual(self._receipt(bad).status_code, 404)
+
+    def test_retry_with_idempotency_key_is_not_queued_again(self):
+        """A retry with the same Idempotency-Key gets the original receipt."""
+        first = self._submit(headers={'Idempotency-Key': 'key-1'})
+        retry = self._submit(headers={'Idempotency-Key': 'key-1'})
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.get_json()['receipt_id'], first.get_json()['receipt_id'])
+        self.assertEqual(retry.headers['Location'], first.headers['Location'])
+        self.assertEqual(self.writer.flush(), 1)
+
+    def test_resumable_project_is_claimed_by_the_request(self):
+        """A queued zip keeps its manifest, and its upload cannot be submitted twice."""
+        from models import db, Blob, ResumableUpload
+
+        data = make_zip()
+        upload_id = self.client.post('/api/uploads', json={
+            'filename': 'project.zip', 'content_type': 'application/zip', 'size': len(data)
+        }).get_json()['upload_id']
+        self.client.put(f'/api/uploads/{upload_id}', data=data, headers={
+            'Upload-Offset': '0', 'Content-Type': 'application/offset+octet-stream'
+        })
+        self.client.post(f'/api/uploads/{upload_id}/finalize', json={'sha256': hashlib.sha256(data).hexdigest()})
+
+        response = super()._submit(project_upload=upload_id)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self._count(ResumableUpload), 0)
+        response = super()._submit(project_upload=upload_id)
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.writer.flush(), 1)
+        with self.app.app_context():
+            blob = db.session.query(Blob).one()
+            self.assertEqual(blob.ref_count, 1)
+            self.assertIn('README.md', blob.manifest)
+
+    def test_old_receipts_expire(self):
+        """Receipts older than the TTL are deleted by the writer."""
+        from datetime import datetime, timedelta
+        from models import db, SubmissionReceipt
+
+        old = self._submit().get_json()['receipt_id']
+        self.writer.flush()
+        with self.app.app_context():
+            db.session.get(SubmissionReceipt, old).created_at = datetime.utcnow() - timedelta(hours=169)
+            db.session.commit()
+
+        new = self._submit(name='Bob').get_json()['receipt_id']
+        self.writer.flush()
+        self.assertEqual(self._receipt(old).status_code, 404)
+        self.assertEqual(self._receipt(new).get_json()['status'], 'written')
+
+    def test_unknown_receipt(self):
+        """Looking up a receipt that was never issued returns 404."""
+        self.assertEqual(self._receipt('0' * 32).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
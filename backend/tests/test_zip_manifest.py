@@ -0,0 +1,102 @@
+import io
+import os
+import json
+import zipfile
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('src/', '')
+        archive.writestr('src/main.py', 'print("hello")\n' * 200, compress_type=zipfile.ZIP_DEFLATED)
+        archive.writestr('data.bin', os.urandom(64), compress_type=zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+class ZipManifestTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and upload folder."""
+        super().setUp()
+        self.zip_data = make_zip()
+
+    def _submit_project(self):
+        response = self._submit(project=(io.BytesIO(self.zip_data), 'project.zip', 'application/zip'))
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            from models import db, Submission
+            return db.session.get(Submission, response.get_json()['submission_id']).screenshot_path
+
+    def _stored_manifest(self, filename):
+        with self.app.app_context():
+            from models import db, Blob
+            blob = db.session.query(Blob).filter(Blob.filename == filename).one()
+            return json.loads(blob.manifest) if blob.manifest else None
+
+    def test_manifest_is_stored_at_ingest(self):
+        """A submitted zip is indexed when it is stored."""
+        filename = self._submit_project()
+        manifest = self._stored_manifest(filename)
+        self.assertEqual(manifest['member_count'], 3)
+        self.assertEqual([entry['name'] for entry in manifest['entries']], ['src/', 'src/main.py', 'data.bin'])
+
+    def test_manifest_endpoint(self):
+        """The endpoint lists members with sizes and compression ratios."""
+        filename = self._submit_project()
+        response = self.client.get(f'/api/files/{filename}/manifest')
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['filename'], filename)
+        self.assertFalse(body['truncated'])
+        entries = {entry['name']: entry for entry in body['entries']}
+        self.assertTrue(entries['src/']['is_dir'])
+        self.assertEqual(entries['src/main.py']['size'], len('print("hello")\n') * 200)
+        self.assertLess(entries['src/main.py']['ratio'], 0.1)
+        self.assertEqual(entries['data.bin']['ratio'], 1.0)
+        self.assertEqual(body['total_size'], sum(entry['size'] for entry in body['entries']))
+
+    def test_unindexed_blob_is_indexed_on_request(self):
+        """A zip stored before indexing gets its manifest on first request."""
+        from models import db, Blob
+
+        filename = self._submit_project()
+        with self.app.app_context():
+            db.session.query(Blob).update({'manifest': None})
+            db.session.commit()
+
+        self.assertEqual(self.client.get(f'/api/files/{filename}/manifest').get_json()['member_count'], 3)
+        self.assertEqual(self._stored_manifest(filename)['member_count'], 3)
+
+    def test_legacy_upload_is_indexed_without_a_blob(self):
+        """Timestamped uploads from before the blob store are read directly."""
+        with open(os.path.join(self.upload_dir, '20240101_project_old.zip'), 'wb') as f:
+            f.write(self.zip_data)
+        response = self.client.get('/api/files/20240101_project_old.zip/manifest')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['member_count'], 3)
+
+    def test_missing_or_invalid_zip(self):
+        """Unknown files, corrupt zips and non-zips have no manifest."""
+        with open(os.path.join(self.upload_dir, 'broken.zip'), 'wb') as f:
+            f.write(b'PK\x03\x04 not really a zip')
+        self.assertEqual(self.client.get('/api/files/missing.zip/manifest').status_code, 404)
+        self.assertEqual(self.client.get('/api/files/broken.zip/manifest').status_code, 404)
+        self.assertEqual(self.client.get('/api/files/image.png/manifest').status_code, 404)
+
+    def test_large_archives_are_truncated(self):
+        """Only the first MAX_MANIFEST_ENTRIES members are listed."""
+        from zipindex import read_manifest
+
+        path = os.path.join(self.upload_dir, 'many.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for i in range(5):
+                archive.writestr(f'file{i}.txt', 'x')
+        with patch('zipindex.MAX_MANIFEST_ENTRIES', 2):
+            manifest = read_manifest(path)
+        self.assertTrue(manifest['truncated'])
+        self.assertEqual(manifest['member_count'], 5)
+        self.assertEqual(len(manifest['entries']), 2)
+
+if __name__ == '__main__':
+    unittest.main()
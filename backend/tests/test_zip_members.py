@@ -0,0 +1,110 @@
+import io
+import os
+import json
+import zipfile
+import unittest
+from unittest.mock import patch
+
+from apptest import AppTestCase
+
+SOURCE = 'print("hello")\n' * 5000
+DATA = os.urandom(3000)
+CONFIG = json.dumps({'name': 'demo'})
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('src/', '')
+        archive.writestr('src/main.py', SOURCE, compress_type=zipfile.ZIP_DEFLATED)
+        archive.writestr('data.bin', DATA, compress_type=zipfile.ZIP_STORED)
+        archive.writestr('config.json', CONFIG, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+class ZipMemberTestCase(AppTestCase):
+    def setUp(self):
+        """Set up an app backed by a throwaway SQLite database and upload folder."""
+        super().setUp()
+        self.filename = self._submit_project(make_zip())
+
+    def _submit_project(self, zip_data):
+        response = self._submit(project=(io.BytesIO(zip_data), 'project.zip', 'application/zip'))
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            from models import db, Submission
+            return db.session.get(Submission, response.get_json()['submission_id']).screenshot_path
+
+    def test_members_are_read_without_zipfile(self):
+        """Deflated and stored members stream from their local headers."""
+        with patch.object(zipfile.ZipFile, 'open', side_effect=AssertionError('extracted')):
+            source = self.client.get(f'/uploads/{self.filename}/src/main.py')
+            data = self.client.get(f'/uploads/{self.filename}/data.bin')
+        self.assertEqual(source.status_code, 200)
+        self.assertEqual(source.data.decode(), SOURCE)
+        self.assertEqual(source.headers['Content-Length'], str(len(SOURCE)))
+        self.assertEqual(data.data, DATA)
+        self.assertEqual(data.headers['Content-Type'], 'application/octet-stream')
+
+    def test_content_type_and_disposition(self):
+        """Safe types are shown inline; anything else is a sandboxed download."""
+        config = self.client.get(f'/uploads/{self.filename}/config.json')
+        self.assertEqual(config.headers['Content-Type'], 'application/json')
+        self.assertEqual(config.headers['Content-Disposition'], 'inline')
+        self.assertEqual(config.get_json(), {'name': 'demo'})
+
+        source = self.client.get(f'/uploads/{self.filename}/src/main.py')
+        self.assertEqual(source.headers['Content-Disposition'], 'attachment; filename="main.py"')
+        self.assertEqual(source.headers['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(source.headers['Content-Security-Policy'], 'sandbox')
+
+    def test_caching_headers(self):
+        """Members of content-addressed zips are immutable and revalidate with their ETag."""
+        response = self.client.get(f'/uploads/{self.filename}/config.json')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        cached = self.client.get(f'/uploads/{self.filename}/config.json', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b'')
+
+    def test_legacy_upload(self):
+        """Timestamped uploads from before the blob store are served too, without immutable caching."""
+        with open(os.path.join(self.upload_dir, '20240101_project_old.zip'), 'wb') as f:
+            f.write(make_zip())
+        response = self.client.get('/uploads/20240101_project_old.zip/data.bin')
+        self.assertEqual(response.data, DATA)
+        self.assertNotIn('immutable', response.headers['Cache-Control'])
+
+    def test_missing_members(self):
+        """Unknown members, directories and non-zip files are not found."""
+        self.assertEqual(self.client.get(f'/uploads/{self.filename}/nope.txt').status_code, 404)
+        self.assertEqual(self.client.get(f'/uploads/{self.filename}/src/').status_code, 404)
+        self.assertEqual(self.client.get('/uploads/missing.zip/a.txt').status_code, 404)
+        self.assertEqual(self.client.get('/uploads/image.png/a.txt').status_code, 404)
+
+    def test_member_beyond_a_truncated_manifest(self):
+        """Members the stored manifest does not list are found in the central directory."""
+        from models import db, Blob
+        from zipindex import read_manifest
+
+        with patch('zipindex.MAX_MANIFEST_ENTRIES', 1):
+            truncated = read_manifest(os.path.join(self.upload_dir, self.filename))
+        self.assertTrue(truncated['truncated'])
+        with self.app.app_context():
+            db.session.query(Blob).update({'manifest': json.dumps(truncated)})
+            db.session.commit()
+        response = self.client.get(f'/uploads/{self.filename}/config.json')
+        self.assertEqual(response.get_json(), {'name': 'demo'})
+
+    def test_encrypted_member(self):
+        """Encrypted members are refused before any of the body is sent."""
+        path = os.path.join(self.upload_dir, 'locked.zip')
+        data = bytearray(make_zip())
+        with zipfile.ZipFile(io.BytesIO(bytes(data))) as archive:
+            offset = archive.getinfo('src/main.py').header_offset
+        data[offset + 6] |= 0x1  # encrypted bit of the local header's flags
+        with open(path, 'wb') as f:
+            f.write(bytes(data))
+        self.assertEqual(self.client.get('/uploads/locked.zip/src/main.py').status_code, 415)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Background thumbnail generation for submitted screenshots.
+
+After a submission commits, submit_form hands its screenshot filenames to
+a ThumbnailWorker. A small thread pool scales each image down to the
+THUMBNAIL_SIZES widths next to the original in UPLOAD_FOLDER (and stores
+them in the storage backend alongside it), then records
+{source filename: {size: thumbnail filename}} on the submission and bumps
+the listing generation so cached listings pick the thumbnails up.
+
+Pillow is optional: without it (or with THUMBNAIL_WORKERS=0) no
+thumbnails are generated and clients keep loading the originals.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import update
+
+from models import db, Submission
+from counters import bump_generation
+from storage import get_storage
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - depends on the deployment
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Bounding box widths (and heights) of the generated thumbnails
+THUMBNAIL_SIZES = (160, 480)
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_format():
+    """(Pillow format, extension) used for thumbnails"""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+
+def thumbnail_filename(filename, size, extension):
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}_w{size}.{extension}"
+
+
+def generate_thumbnails(upload_folder, filename):
+    """Write every thumbnail size for one image; returns {size: filename}.
+
+    Thumbnails that already exist are reused, so screenshots shared through
+    the blob store are only ever scaled once.
+    """
+    image_format, extension = thumbnail_format()
+    targets = {
+        str(size): thumbnail_filename(filename, size, extension) for size in THUMBNAIL_SIZES
+    }
+    missing = [
+        size for size in THUMBNAIL_SIZES
+        if not os.path.exists(os.path.join(upload_folder, targets[str(size)]))
+    ]
+    if not missing:
+        return targets
+
+    with Image.open(os.path.join(upload_folder, filename)) as image:
+        # Let JPEG decode at reduced scale when the largest thumbnail allows it
+        image.draft('RGB', (max(missing), max(missing)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'PA') or 'transparency' in image.info else 'RGB')
+        if image_format == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+
+        # Scale the largest size from the original and each smaller one from the previous
+        for size in sorted(missing, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)
+            path = os.path.join(upload_folder, targets[str(size)])
+            # Written under a hidden temporary name so readers and cache eviction never see a partial file
+            fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, image_format, quality=THUMBNAIL_QUALITY)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    return targets
+
+
+class ThumbnailWorker:
+    """Thread pool that generates and records thumbnails outside the request"""
+
+    def __init__(self, app, max_workers=2, on_update=None):
+        self.app = app
+        self.on_update = on_update
+        self.enabled = Image is not None and max_workers > 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnails') if self.enabled else None
+        self._pending = set()
+        self._lock = threading.Lock()
+        if Image is None:
+            logger.warning("Pillow is not installed; screenshot thumbnails are disabled")
+
+    def submit(self, submission_id, filenames):
+        """Queue thumbnail generation for a committed submission"""
+        if not self.enabled or not filenames:
+            return None
+        future = self._executor.submit(self._run, submission_id, list(filenames))
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def wait(self, timeout=None):
+        """Block until every queued job has finished"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def _run(self, submission_id, filenames):
+        storage = get_storage(self.app)
+        thumbnails = {}
+        for filename in filenames:
+            try:
+                # Fetches the original into the upload folder if it is stored elsewhere
+                storage.local_path(filename)
+                targets = generate_thumbnails(storage.folder, filename)
+                for thumbnail in targets.values():
+                    storage.publish(thumbnail)
+                thumbnails[filename] = targets
+            except Exception as e:
+                logger.error(f"Error generating thumbnails for {filename}: {str(e)}")
+        if not thumbnails:
+            return
+
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(Submission).where(Submission.id == submission_id)
+                    .values(thumbnails=json.dumps(thumbnails))
+                )
+                bump_generation(db.session)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error recording thumbnails for submission {submission_id}: {str(e)}")
+                db.session.rollback()
+                return
+            finally:
+                db.session.remove()
+        if self.on_update:
+            self.on_update()
@@ -0,0 +1,159 @@
+"""
+Validation shared by the single and bulk submission endpoints.
+
+Each check raises SubmissionError with the message returned to the
+client, so /api/submit and /api/submit/bulk report identical errors.
+"""
+
+REQUIRED_FIELDS = ['lumen_name', 'prompt_text', 'ai_used', 'ai_agent', 'reward_amount']
+VALID_AI_OPTIONS = ['GPT-5', 'Claude', 'LLaMA', 'Gemini', 'Perplexity', 'Other']
+
+SCREENSHOT_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+SCREENSHOT_CONTENT_TYPES = ['image/png', 'image/jpeg']
+PROJECT_EXTENSIONS = {'zip'}
+PROJECT_CONTENT_TYPES = ['application/zip', 'application/x-zip-compressed']
+
+# Leading bytes of PNG/JPEG images and (possibly empty or spanned) zip archives
+IMAGE_SIGNATURES = (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff')
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06', b'PK\x07\x08')
+SNIFF_BYTES = 8
+
+
+class SubmissionError(ValueError):
+    """Raised for submission data that should produce a 400 response"""
+
+
+def check_field(name, value):
+    """Check one text field as soon as it is known"""
+    if name in REQUIRED_FIELDS and (value is None or not str(value).strip()):
+        raise SubmissionError(f'{name} is required')
+
+    if name == 'reward_amount':
+        try:
+            reward_amount = float(value)
+        except (TypeError, ValueError):
+            raise SubmissionError('Invalid reward amount')
+        if reward_amount < 0.01:
+            raise SubmissionError('Reward amount must be at least 0.01')
+    elif name == 'ai_used' and value not in VALID_AI_OPTIONS:
+        raise SubmissionError('Invalid AI option selected')
+
+
+def validate_fields(data):
+    """Check the text fields of a submission; returns the values to store.
+
+    `data` is request.form or one bulk manifest item; reward_amount is
+    returned as a float.
+    """
+    for field in REQUIRED_FIELDS:
+        value = data.get(field)
+        if value is None or not str(value).strip():
+            raise SubmissionError(f'{field} is required')
+    check_field('reward_amount', data['reward_amount'])
+    check_field('ai_used', data['ai_used'])
+
+    return {
+        'lumen_name': str(data['lumen_name']),
+        'prompt_text': str(data['prompt_text']),
+        'ai_used': data['ai_used'],
+        'ai_agent': str(data['ai_agent']),
+        'reward_amount': float(data['reward_amount']),
+    }
+
+
+def _extension(filename):
+    if not filename or '.' not in filename:
+        return None
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def check_file_type(filename, content_type, file_type):
+    """Check a primary file's name and declared type; returns its extension"""
+    file_ext = _extension(filename)
+    if file_type == 'screenshot':
+        if file_ext not in SCREENSHOT_EXTENSIONS:
+            raise SubmissionError('Invalid file type. Only .jpg, .jpeg, .png files allowed')
+        # Additional security check for file content
+        if content_type not in SCREENSHOT_CONTENT_TYPES:
+            raise SubmissionError('Invalid file content type')
+    else:  # project file
+        if file_ext not in PROJECT_EXTENSIONS:
+            raise SubmissionError('Invalid file type. Only .zip files allowed')
+        if content_type not in PROJECT_CONTENT_TYPES:
+            raise SubmissionError('Invalid file content type. Only ZIP files are allowed')
+    return file_ext
+
+
+def validate_file(file, file_type):
+    """Check the primary screenshot or project zip; returns its extension"""
+    if not file or not file.filename:
+        raise SubmissionError('No file selected')
+    return check_file_type(file.filename, file.content_type, file_type)
+
+
+def additional_screenshot_extension(file):
+    """Extension of an acceptable additional screenshot, or None to skip it"""
+    if not file or not file.filename:
+        return None
+    file_ext = _extension(file.filename)
+    if file_ext not in SCREENSHOT_EXTENSIONS or file.content_type not in SCREENSHOT_CONTENT_TYPES:
+        return None
+    return file_ext
+
+
+def content_matches(file_type, head):
+    """Whether the first bytes of a file carry the signature of its type"""
+    signatures = ZIP_SIGNATURES if file_type == 'project' else IMAGE_SIGNATURES
+    return head.startswith(signatures)
+
+
+class SubmissionPrecheck:
+    """Checks an /api/submit body while it is still being received.
+
+    The multipart parser calls file_started() when a file part begins,
+    with the fields received so far, and file_head() with its first
+    SNIFF_BYTES bytes. Raising SubmissionError stops the upload there;
+    returning False drops that file part (invalid additional screenshots
+    are skipped, as after parsing). Fields sent after the files are only
+    checked by the view.
+
+    `on_fields` is called with the fields sent ahead of the files once they
+    have been checked, before the first file part is stored; `fields` keeps
+    them (None until a file part starts).
+    """
+
+    def __init__(self, on_fields=None):
+        self.on_fields = on_fields
+        self.fields = None
+
+    @property
+    def fields_checked(self):
+        return self.fields is not None
+
+    def file_started(self, fields, name, filename, content_type):
+        if not self.fields_checked:
+            for field_name, value in fields:
+                check_field(field_name, value)
+            self.fields = list(fields)
+            if self.on_fields is not None:
+                self.on_fields(self.fields)
+
+        if name in ('screenshot', 'project'):
+            if filename:
+                check_file_type(filename, content_type, name)
+            return True
+        if name == 'additional_screenshots':
+            return _extension(filename) in SCREENSHOT_EXTENSIONS and content_type in SCREENSHOT_CONTENT_TYPES
+        return True
+
+    def file_head(self, name, filename, head):
+        if not filename:
+            # Empty file inputs are sent as parts without a filename
+            return True
+        if name in ('screenshot', 'project'):
+            if not content_matches(name, head):
+                raise SubmissionError('File content does not match its type')
+            return True
+        if name == 'additional_screenshots':
+            return content_matches('screenshot', head)
+        return True
@@ -0,0 +1,131 @@
+"""
+Resized variants of uploaded images: /uploads/<filename>?w=&h=&fmt=.
+
+`w` and `h` bound the variant (either may be left out) and must come from
+VARIANT_SIZES; `fmt` re-encodes it as webp, jpeg or png. Images are only
+ever scaled down, keeping their aspect ratio.
+
+A variant is rendered on its first request and kept under
+UPLOAD_FOLDER/.variants/, a least-recently-used cache (diskcache.py)
+bounded to VARIANT_CACHE_SIZE bytes. Variant names are derived from the source's name,
+which never changes content, so they are cached as immutable like the
+originals.
+
+Pillow is optional: without it the original is served instead, as it is
+for a source Pillow cannot decode (see RENDER_ERRORS).
+"""
+import os
+import tempfile
+
+from diskcache import DiskCache
+from thumbnails import THUMBNAIL_QUALITY
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    # Raised by render_variant for a corrupt, truncated or oversized source
+    RENDER_ERRORS = (OSError, UnidentifiedImageError, Image.DecompressionBombError)
+except ImportError:  # pragma: no cover - depends on the deployment
+    Image = None
+    RENDER_ERRORS = (OSError,)
+
+VARIANTS_DIR = '.variants'
+# Widths and heights clients may ask for
+VARIANT_SIZES = (160, 320, 480, 640, 960, 1280, 1920)
+# fmt parameter: (Pillow format, file extension)
+VARIANT_FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg'), 'jpg': ('JPEG', 'jpg'), 'png': ('PNG', 'png')}
+SOURCE_EXTENSIONS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'webp': 'webp'}
+
+
+class VariantError(ValueError):
+    """Raised for variant parameters that should produce a 400 response"""
+
+
+def parse_variant(args, filename):
+    """(width, height, format) requested by `args`, or None for the original.
+
+    Width or height is None when not given. Raises VariantError for values
+    outside the allow-lists or for files that are not images.
+    """
+    if not any(name in args for name in ('w', 'h', 'fmt')):
+        return None
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if extension not in SOURCE_EXTENSIONS:
+        raise VariantError('Only images can be resized')
+
+    sizes = []
+    for name in ('w', 'h'):
+        value = args.get(name)
+        if not value:
+            sizes.append(None)
+            continue
+        try:
+            size = int(value)
+        except ValueError:
+            size = None
+        if size not in VARIANT_SIZES:
+            raise VariantError(f"{name} must be one of {', '.join(map(str, VARIANT_SIZES))}")
+        sizes.append(size)
+
+    fmt = (args.get('fmt') or SOURCE_EXTENSIONS[extension]).lower()
+    if fmt not in VARIANT_FORMATS:
+        raise VariantError(f"fmt must be one of {', '.join(sorted(VARIANT_FORMATS))}")
+    return sizes[0], sizes[1], fmt
+
+
+def variant_filename(filename, width, height, fmt):
+    stem = filename.rsplit('.', 1)[0]
+    return f"{stem}_{width or 0}x{height or 0}.{VARIANT_FORMATS[fmt][1]}"
+
+
+def render_variant(source, destination, width, height, fmt):
+    """Write the variant of `source` to `destination`; returns its size in bytes"""
+    image_format = VARIANT_FORMATS[fmt][0]
+    # Unbounded dimensions only need to be larger than any allowed size
+    box = (width or 100000, height or 100000)
+    with Image.open(source) as image:
+        image.draft('RGB', box)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'PA') or 'transparency' in image.info else 'RGB')
+        if image_format == 'JPEG' and image.mode == 'RGBA':
+            image = image.convert('RGB')
+        image.thumbnail(box, Image.LANCZOS)
+
+        # Rendered under a hidden temporary name so readers and eviction never see a partial file
+        fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=os.path.dirname(destination))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, image_format, quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return os.path.getsize(destination)
+
+
+class VariantCache(DiskCache):
+    """Size-bounded LRU cache of rendered variants on disk"""
+
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes)
+        self.enabled = Image is not None and max_bytes > 0
+
+    def get(self, upload_folder, filename, width, height, fmt):
+        """Path of the variant relative to `upload_folder`, rendering it if needed.
+
+        Raises FileNotFoundError when the source does not exist.
+        """
+        directory = os.path.join(upload_folder, VARIANTS_DIR)
+        name = variant_filename(filename, width, height, fmt)
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            source = os.path.join(upload_folder, filename)
+            if not os.path.isfile(source):
+                raise
+            os.makedirs(directory, exist_ok=True)
+            self.added(directory, name, render_variant(source, path, width, height, fmt))
+        else:
+            self.touch(path, stat)
+        return f"{VARIANTS_DIR}/{name}"
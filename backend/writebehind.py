@@ -0,0 +1,284 @@
+"""
+Write-behind mode for /api/submit (SUBMIT_WRITE_BEHIND=true).
+
+A validated submission is appended to a local SQLite queue file, which is
+synced before the request returns 202 with a receipt id. A background
+SubmissionWriter drains the queue in batches: each batch becomes one
+multi-row INSERT and one commit of the main database, so a burst of
+submissions costs one commit (one fsync on PostgreSQL) instead of one each.
+
+Files are still stored by the request; the writer adds their blob
+references (and the manifests of new zips) together with the rows. The
+receipt ids are written to `submission_receipts` in the same transaction,
+so a batch replayed after a crash is skipped instead of inserted twice,
+and GET /api/submit/receipts/<id> can report the submission id. Receipts
+older than SUBMIT_RECEIPT_TTL hours are deleted by the writer.
+
+An entry that cannot be written is retried once its claim expires, up to
+SUBMIT_QUEUE_ATTEMPTS times in all; it is then marked failed and kept
+(to report its error) for SUBMIT_RECEIPT_TTL hours before it is dropped.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+
+from models import db, SubmissionReceipt
+from blobs import reference_blobs
+from bulk import insert_submissions
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which an entry claimed by a writer that never finished it
+# (e.g. a killed worker process) may be claimed again; also the delay
+# before a failed attempt is retried
+CLAIM_TIMEOUT = 60
+
+
+class SubmissionQueue:
+    """Durable queue of submissions waiting to be written, in a SQLite file.
+
+    Several processes may share one file: writers claim entries before
+    working on them, and a claim that is not released expires. An entry
+    is tried `max_attempts` times; failed entries are dropped
+    `failed_ttl` hours after their last attempt.
+    """
+
+    def __init__(self, path, max_attempts=5, failed_ttl=168):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.failed_ttl = failed_ttl
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' receipt_id TEXT UNIQUE NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                " status TEXT NOT NULL DEFAULT 'queued',"  # queued, claimed or failed
+                ' claimed_at REAL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0,'
+                ' error TEXT,'
+                ' failed_at REAL,'
+                ' created_at REAL NOT NULL)'
+            )
+            # Queue files created before retries were counted
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(entries)')}
+            if 'attempts' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            if 'failed_at' not in columns:
+                conn.execute('ALTER TABLE entries ADD COLUMN failed_at REAL')
+            conn.execute('COMMIT')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        # An acknowledged submission must survive a crash
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+
+    @staticmethod
+    def new_receipt_id():
+        return uuid.uuid4().hex
+
+    def enqueue(self, payload, receipt_id=None):
+        """Append one submission; returns its receipt id once it is on disk"""
+        receipt_id = receipt_id or self.new_receipt_id()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT INTO entries (receipt_id, payload, created_at) VALUES (?, ?, ?)',
+                (receipt_id, json.dumps(payload), time.time())
+            )
+        return receipt_id
+
+    def status(self, receipt_id):
+        """(status, error) of an entry still in the queue, or None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT status, error FROM entries WHERE receipt_id = ?', (receipt_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return ('failed' if row[0] == 'failed' else 'queued'), row[1]
+
+    def claim(self, limit):
+        """Claim up to `limit` entries in queue order; returns [(receipt_id, payload)]"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT receipt_id, payload FROM entries"
+                " WHERE status = 'queued' OR (status = 'claimed' AND claimed_at < ?)"
+                " ORDER BY seq LIMIT ?",
+                (now - CLAIM_TIMEOUT, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE entries SET status = 'claimed', claimed_at = ? WHERE receipt_id = ?",
+                [(now, receipt_id) for receipt_id, _ in rows]
+            )
+            conn.execute('COMMIT')
+        return [(receipt_id, json.loads(payload)) for receipt_id, payload in rows]
+
+    def finish(self, written, failed):
+        """Drop written entries and record the error of failed ones.
+
+        A failed entry stays claimed, so it is retried when the claim
+        expires, until its last attempt marks it failed.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('DELETE FROM entries WHERE receipt_id = ?', [(r,) for r in written])
+            conn.executemany(
+                "UPDATE entries SET attempts = attempts + 1, error = ?, claimed_at = ?,"
+                " status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'claimed' END,"
+                " failed_at = CASE WHEN attempts + 1 >= ? THEN ? END"
+                " WHERE receipt_id = ?",
+                [(error, now, self.max_attempts, self.max_attempts, now, receipt_id)
+                 for receipt_id, error in failed.items()]
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE status = 'failed' AND failed_at < ?",
+                (now - self.failed_ttl * 3600,)
+            )
+            conn.execute('COMMIT')
+
+
+def queue_payload(fields, stored, timestamp, screenshots=()):
+    """Queue entry for a submission whose files are stored but not referenced.
+
+    `stored` is the store_blobs(reference=False) result with the primary
+    file first.
+    """
+    additional = [blob[0] for blob in stored[1:]]
+    return {
+        'row': dict(
+            fields,
+            screenshot_path=stored[0][0],
+            additional_screenshots=','.join(additional) if additional else None,
+            timestamp=timestamp.isoformat()
+        ),
+        'blobs': [list(blob) for blob in stored],
+        'screenshots': list(screenshots),
+    }
+
+
+class SubmissionWriter:
+    """Background thread writing queued submissions in group commits.
+
+    `on_commit` is called with [(submission_id, screenshot filenames)]
+    after each committed batch. Receipts older than `receipt_ttl` hours
+    are deleted with the batches.
+    """
+
+    def __init__(self, app, queue, batch_size=100, delay=0.05, on_commit=None, receipt_ttl=168):
+        self.app = app
+        self.queue = queue
+        self.batch_size = batch_size
+        self.delay = delay
+        self.on_commit = on_commit
+        self.receipt_ttl = receipt_ttl
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='submission-writer', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Tell the writer a submission was queued"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """Stop the thread; entries still queued are written by the next writer"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stopped:
+            # Entries queued by other processes are picked up by the poll
+            if self._wake.wait(timeout=1.0):
+                # Let the rest of a burst arrive so it shares the commit
+                time.sleep(self.delay)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Error flushing submission queue: {str(e)}")
+
+    def flush(self):
+        """Write one batch of queued submissions; returns the number of entries handled"""
+        with self._lock:
+            entries = self.queue.claim(self.batch_size)
+            if not entries:
+                return 0
+            with self.app.app_context():
+                try:
+                    written, failed, created = self._write_batch(entries)
+                finally:
+                    db.session.remove()
+            self.queue.finish(written, failed)
+        logger.info(f"Wrote {len(created)} queued submissions, {len(failed)} failed")
+        if created and self.on_commit:
+            self.on_commit(created)
+        return len(entries)
+
+    def _write_batch(self, entries):
+        done = set(db.session.execute(
+            select(SubmissionReceipt.receipt_id)
+            .where(SubmissionReceipt.receipt_id.in_([receipt_id for receipt_id, _ in entries]))
+        ).scalars())
+        # Already written before a crash: only the queue entry is left to drop
+        pending = [(receipt_id, payload) for receipt_id, payload in entries if receipt_id not in done]
+        if not pending:
+            return list(done), {}, []
+
+        try:
+            created = self._write(pending)
+            return [receipt_id for receipt_id, _ in entries], {}, created
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Queued batch failed ({str(e)}), writing entries one by one")
+
+        written, failed, created = list(done), {}, []
+        for entry in pending:
+            try:
+                created.extend(self._write([entry]))
+                written.append(entry[0])
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Queued submission {entry[0]} failed: {str(e)}")
+                failed[entry[0]] = str(e)
+        return written, failed, created
+
+    def _write(self, entries):
+        rows = []
+        for _, payload in entries:
+            row = dict(payload['row'])
+            row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+            rows.append(row)
+        ids = insert_submissions(db.session, rows)
+        reference_blobs(db.session, [tuple(blob) for _, payload in entries for blob in payload['blobs']])
+        # Long after its entry left the queue a receipt cannot be replayed
+        db.session.execute(
+            delete(SubmissionReceipt)
+            .where(SubmissionReceipt.created_at < datetime.utcnow() - timedelta(hours=self.receipt_ttl))
+        )
+        db.session.add_all([
+            SubmissionReceipt(receipt_id=receipt_id, submission_id=submission_id)
+            for (receipt_id, _), submission_id in zip(entries, ids)
+        ])
+        db.session.commit()
+        return [(submission_id, payload['screenshots']) for (_, payload), submission_id in zip(entries, ids)]
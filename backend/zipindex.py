@@ -0,0 +1,175 @@
+"""
+Manifests of uploaded project zips.
+
+read_manifest() lists a zip's members from its central directory alone
+(nothing is extracted or decompressed), so a project's contents can be
+browsed without downloading it. Manifests are stored on the zip's blob
+when it is first stored; zips stored before that are indexed on first
+request.
+
+open_member() streams one member using the offsets in the manifest: it
+seeks to the member's local header and reads (and inflates) only that
+member's bytes.
+"""
+import json
+import logging
+import os
+import struct
+import zipfile
+import zlib
+from datetime import datetime
+
+from models import Blob
+
+logger = logging.getLogger(__name__)
+
+# Members listed per manifest; larger archives are marked truncated
+MAX_MANIFEST_ENTRIES = 10000
+
+# Fixed part of a local file header: signature, version, flags, method,
+# time, date, crc, sizes, name length and extra field length
+LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+READ_CHUNK = 64 * 1024
+
+
+class ZipMemberError(ValueError):
+    """Raised for a member that cannot be served from its zip"""
+
+
+def read_manifest(path, full=False):
+    """Manifest of the zip at `path`, or None if it is not a readable zip.
+
+    Entries keep each member's local header offset, CRC and compression
+    method next to the sizes, enough to read the member without parsing
+    the central directory again. Only MAX_MANIFEST_ENTRIES members are
+    listed unless `full` is set.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = archive.infolist()
+    except (zipfile.BadZipFile, OSError, ValueError):
+        return None
+
+    entries = []
+    limit = len(members) if full else MAX_MANIFEST_ENTRIES
+    for info in members[:limit]:
+        try:
+            modified = datetime(*info.date_time).isoformat()
+        except ValueError:
+            modified = None
+        entries.append({
+            'name': info.filename,
+            'size': info.file_size,
+            'compressed_size': info.compress_size,
+            # Compressed size as a fraction of the original
+            'ratio': round(info.compress_size / info.file_size, 3) if info.file_size else 1.0,
+            'is_dir': info.is_dir(),
+            'modified': modified,
+            'crc': info.CRC,
+            'method': info.compress_type,
+            'header_offset': info.header_offset,
+        })
+
+    return {
+        'member_count': len(members),
+        'total_size': sum(info.file_size for info in members),
+        'compressed_size': sum(info.compress_size for info in members),
+        'truncated': len(members) > limit,
+        'entries': entries,
+    }
+
+
+def get_manifest(session, upload_folder, filename, storage=None):
+    """Stored manifest for an uploaded zip, indexing it first if needed.
+
+    Returns None when the file is missing or not a zip. The caller commits
+    when a manifest was stored. With `storage`, a zip that has to be
+    indexed is read from there instead of `upload_folder`.
+    """
+    blob = session.query(Blob).filter(Blob.filename == filename).first()
+    if blob is not None and blob.manifest:
+        return json.loads(blob.manifest)
+
+    if storage is not None:
+        try:
+            path = storage.local_path(filename)
+        except FileNotFoundError:
+            return None
+    else:
+        path = os.path.join(upload_folder, filename)
+    manifest = read_manifest(path)
+    if manifest is not None and blob is not None:
+        blob.manifest = json.dumps(manifest)
+    return manifest
+
+
+def find_member(manifest, path, name):
+    """Manifest entry of member `name`, or None.
+
+    Members beyond a truncated manifest are looked up in the full central
+    directory of the zip at `path`.
+    """
+    for entry in manifest['entries']:
+        if entry['name'] == name:
+            return entry
+    if manifest['truncated']:
+        full = read_manifest(path, full=True)
+        if full is not None:
+            return next((entry for entry in full['entries'] if entry['name'] == name), None)
+    return None
+
+
+def open_member(path, entry):
+    """Iterator over the uncompressed bytes of one member.
+
+    The local header is checked before this returns, so unreadable members
+    raise ZipMemberError instead of failing mid-response.
+    """
+    if entry['method'] not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        raise ZipMemberError('Unsupported compression method')
+    f = open(path, 'rb')
+    try:
+        f.seek(entry['header_offset'])
+        header = f.read(LOCAL_HEADER.size)
+        if len(header) != LOCAL_HEADER.size:
+            raise ZipMemberError('Truncated local file header')
+        signature, _, flags, _, _, _, _, _, _, name_length, extra_length = LOCAL_HEADER.unpack(header)
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise ZipMemberError('Bad local file header')
+        if flags & 0x1:
+            raise ZipMemberError('Encrypted members cannot be served')
+        # The local extra field may differ from the central directory's
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+    except Exception:
+        f.close()
+        raise
+    return _read_member(f, entry)
+
+
+def _read_member(f, entry):
+    with f:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if entry['method'] == zipfile.ZIP_DEFLATED else None
+        remaining = entry['compressed_size']
+        # Never produce more than the central directory promised
+        left = entry['size']
+        crc = 0
+        while left > 0:
+            if decompressor is not None and decompressor.unconsumed_tail:
+                data = decompressor.decompress(decompressor.unconsumed_tail, min(left, READ_CHUNK))
+            elif remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = decompressor.decompress(chunk, min(left, READ_CHUNK)) if decompressor is not None else chunk[:left]
+            else:
+                break
+            if data:
+                left -= len(data)
+                crc = zlib.crc32(data, crc)
+                yield data
+            elif decompressor is not None and decompressor.eof:
+                break
+        if left or crc != entry['crc']:
+            logger.error(f"Zip member {entry['name']} is corrupt: {left} bytes missing, crc {crc:08x}")
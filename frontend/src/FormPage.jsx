@@ -1,5 +1,5 @@
-import React, { useState } from 'react';
-import { submitForm } from './api';
+import React, { useEffect, useRef, useState } from 'react';
+import { submitForm, uploadDirect, uploadResumable } from './api';
 import API_BASE from './apiConfig';
 
 const FormPage = () => {
@@ -22,6 +22,17 @@ const SimpleFormPage = () => {
   const [errors, setErrors] = useState({});
   const [successMessage, setSuccessMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [uploadProgress, setUploadProgress] = useState(null);
+  // Sent with every attempt at the same submission; a new one once anything changes
+  const idempotencyKey = useRef(null);
+  // The project zip uploaded for that submission ([field, reference]), so a
+  // retry sends the same request instead of uploading the zip again
+  const projectUpload = useRef(null);
+
+  useEffect(() => {
+    idempotencyKey.current = null;
+    projectUpload.current = null;
+  }, [formData, file, additionalScreenshots]);
 
   const handleChange = (e) => {
     const { name, value } = e.target;
@@ -150,8 +161,8 @@ const SimpleFormPage = () => {
           newErrors.screenshot = 'File must be a ZIP archive';
         }
         
-        if (file.size > 50 * 1024 * 1024) {
-          newErrors.screenshot = 'ZIP file size must be less than 50MB';
+        if (file.size > 500 * 1024 * 1024) {
+          newErrors.screenshot = 'ZIP file size must be less than 500MB';
         }
       }
     }
@@ -177,14 +188,31 @@ const SimpleFormPage = () => {
       data.append('ai_used', formData.ai_used);
       data.append('ai_agent', formData.ai_agent);
       data.append('reward_amount', parseFloat(formData.reward_amount));
-      data.append(fileType, file);
+      if (fileType === 'project') {
+        // Large zips go up first, straight to storage or in resumable chunks;
+        // the form only references them
+        if (!projectUpload.current) {
+          setUploadProgress(0);
+          const directUpload = await uploadDirect(file, setUploadProgress);
+          projectUpload.current = directUpload
+            ? ['direct_upload', directUpload]
+            : ['project_upload', await uploadResumable(file, setUploadProgress)];
+          setUploadProgress(null);
+        }
+        data.append(...projectUpload.current);
+      } else {
+        data.append(fileType, file);
+      }
       
       // Append additional screenshots if any
       additionalScreenshots.forEach((screenshot, index) => {
         data.append('additional_screenshots', screenshot);
       });
       
-      const response = await submitForm(data);
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+      }
+      const response = await submitForm(data, idempotencyKey.current);
       setSuccessMessage(response.message);
       
       // Reset form
@@ -205,6 +233,10 @@ const SimpleFormPage = () => {
       
     } catch (error) {
       console.error('Submission error:', error);
+      if (error.response?.status === 400) {
+        // Rejected, e.g. because the upload expired: upload the zip again next time
+        projectUpload.current = null;
+      }
       if (error.response?.data?.error) {
         setErrors({ form: error.response.data.error });
       } else {
@@ -212,6 +244,7 @@ const SimpleFormPage = () => {
       }
     } finally {
       setIsLoading(false);
+      setUploadProgress(null);
     }
   };
 
@@ -363,7 +396,7 @@ const SimpleFormPage = () => {
                 <p className="text-xs text-gray-500">
                   {fileType === 'screenshot' 
                     ? 'PNG, JPG up to 10MB' 
-                    : 'ZIP files up to 50MB'}
+                    : 'ZIP files up to 500MB'}
                 </p>
               </div>
             </div>
@@ -539,7 +572,9 @@ const SimpleFormPage = () => {
                     <circle className="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" strokeWidth="4"></circle>
                     <path className="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
                   </svg>
-                  Submitting Project...
+                  {uploadProgress !== null
+                    ? `Uploading ZIP... ${Math.round(uploadProgress * 100)}%`
+                    : 'Submitting Project...'}
                 </>
               ) : (
                 'Submit Project'
@@ -171,6 +171,13 @@ const PublicSubmissionsPage = () => {
     return path.split(/[\/\\]/).pop();
   };
 
+  // Prefer a generated thumbnail of the given width when the backend has one
+  const getPreviewFilename = (submission, path, size) => {
+    const filename = getFilenameFromPath(path);
+    const thumbnails = submission.thumbnails && submission.thumbnails[filename];
+    return (thumbnails && thumbnails[size]) || filename;
+  };
+
   return (
     <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
       {/* Project Details Modal */}
@@ -531,7 +538,7 @@ const PublicSubmissionsPage = () => {
                       {getFileType(submission.screenshot_path) === 'screenshot' ? (
                         <div className="rounded-lg overflow-hidden border border-gray-200 mb-2">
                           <img 
-                            src={`${API_BASE}/uploads/${getFilenameFromPath(submission.screenshot_path)}`} 
+                            src={`${API_BASE}/uploads/${getPreviewFilename(submission, submission.screenshot_path, 480)}`} 
                             alt="Project preview"
                             className="w-full h-36 object-cover transition-transform duration-300 hover:scale-105"
                             onError={(e) => {
@@ -570,7 +577,7 @@ const PublicSubmissionsPage = () => {
                               <div key={index} className="rounded-lg overflow-hidden border border-gray-200 w-16 h-16">
                                 {getFileType(screenshot) === 'screenshot' ? (
                                   <img 
-                                    src={`${API_BASE}/uploads/${getFilenameFromPath(screenshot)}`} 
+                                    src={`${API_BASE}/uploads/${getPreviewFilename(submission, screenshot, 160)}`} 
                                     alt={`Additional preview ${index + 1}`}
                                     className="w-full h-full object-cover transition-transform duration-300 hover:scale-105"
                                     onError={(e) => {
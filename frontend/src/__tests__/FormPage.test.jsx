@@ -3,7 +3,9 @@ import FormPage from '../FormPage';
 
 // Mock the api module
 jest.mock('../api', () => ({
-  submitForm: jest.fn()
+  submitForm: jest.fn(),
+  uploadResumable: jest.fn(),
+  uploadDirect: jest.fn()
 }));
 
 test('renders form title', () => {
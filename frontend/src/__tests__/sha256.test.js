@@ -0,0 +1,27 @@
+import { Sha256, hashFile } from '../sha256';
+
+const bytes = (text) => new TextEncoder().encode(text);
+
+describe('Sha256', () => {
+  test('matches known digests', () => {
+    expect(new Sha256().hex()).toBe('e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855');
+    expect(new Sha256().update(bytes('abc')).hex())
+      .toBe('ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad');
+  });
+
+  test('gives the same digest however the input is split', () => {
+    const text = 'abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq';
+    const hash = new Sha256();
+    for (let i = 0; i < text.length; i += 5) {
+      hash.update(bytes(text.slice(i, i + 5)));
+    }
+    expect(hash.hex()).toBe('248d6a61d20638b8e5c026930c3e6039a33ce45964ff2167f6ecedd419db06c1');
+  });
+
+  test('hashes a file in slices', async () => {
+    const data = bytes('abc'.repeat(1000));
+    // Just the part of the File interface hashFile uses
+    const file = { size: data.length, slice: (start, end) => ({ arrayBuffer: async () => data.slice(start, end).buffer }) };
+    expect(await hashFile(file, 64)).toBe(new Sha256().update(data).hex());
+  });
+});
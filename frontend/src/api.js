@@ -1,5 +1,6 @@
 import axios from 'axios';
 import API_BASE from './apiConfig';
+import { hashFile } from './sha256';
 
 // Create axios instance with default config
 const api = axios.create({
@@ -53,11 +54,14 @@ export const register = async (username, password) => {
 };
 
 // Submission API
-export const submitForm = async (formData) => {
+// Pass the same idempotencyKey when retrying a submission so the server
+// returns the original result instead of creating it twice.
+export const submitForm = async (formData, idempotencyKey) => {
   try {
     const response = await api.post('/submit', formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
+        ...(idempotencyKey && { 'Idempotency-Key': idempotencyKey }),
       },
       timeout: 60000, // Increase timeout to 60 seconds for file uploads
     });
@@ -71,7 +75,10 @@ export const submitForm = async (formData) => {
     } else if (error.response) {
       // Server responded with error status
       const errorMessage = error.response.data?.error || error.response.statusText;
-      throw new Error(`Server error (${error.response.status}): ${errorMessage}`);
+      const serverError = new Error(`Server error (${error.response.status}): ${errorMessage}`);
+      // Callers can tell a rejected submission from a failed one
+      serverError.response = error.response;
+      throw serverError;
     } else if (error.request) {
       // Request was made but no response received
       throw new Error('Network error: Unable to reach the server. Please check your connection and try again.');
@@ -82,6 +89,83 @@ export const submitForm = async (formData) => {
   }
 };
 
+// Resumable upload API: sends a project zip in chunks and resumes from the
+// server's offset after a failed chunk instead of starting over.
+// Returns the upload id to pass to /submit as `project_upload`.
+const MAX_CHUNK_RETRIES = 5;
+
+export const uploadResumable = async (file, onProgress) => {
+  const { data: upload } = await api.post('/uploads', {
+    filename: file.name,
+    content_type: file.type || 'application/zip',
+    size: file.size,
+  });
+
+  let offset = upload.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    const chunk = file.slice(offset, offset + upload.chunk_size);
+    try {
+      const { data } = await api.put(`/uploads/${upload.upload_id}`, chunk, {
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(offset),
+        },
+        timeout: 60000,
+      });
+      offset = data.offset;
+      failures = 0;
+      if (onProgress) onProgress(offset / file.size);
+    } catch (error) {
+      if (error.response?.status === 404 || error.response?.status === 413 || ++failures > MAX_CHUNK_RETRIES) {
+        throw error;
+      }
+      // Ask the server how much actually arrived and continue from there
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      try {
+        const { data } = await api.get(`/uploads/${upload.upload_id}`);
+        offset = data.offset;
+      } catch (statusError) {
+        // Keep the current offset; the next PUT reports the right one on a mismatch
+      }
+    }
+  }
+
+  await api.post(`/uploads/${upload.upload_id}/finalize`, {});
+  return upload.upload_id;
+};
+
+// Direct upload API: with bucket storage the zip goes straight to the
+// bucket through a pre-signed URL bound to its SHA-256, never through the
+// server. Returns the upload id to pass to /submit as `direct_upload`, or null
+// when direct uploads are unavailable (use uploadResumable instead). The
+// file is hashed slice by slice, so it is never held in memory whole.
+export const uploadDirect = async (file, onProgress) => {
+  try {
+    const { data: options } = await api.get('/uploads/direct');
+    if (!options.enabled || file.size > options.max_size) return null;
+  } catch (error) {
+    return null;
+  }
+
+  const sha256 = await hashFile(file);
+  const { data: upload } = await api.post('/uploads/direct', {
+    filename: file.name,
+    content_type: file.type || 'application/zip',
+    size: file.size,
+    sha256,
+  });
+  await axios.put(upload.url, file, {
+    headers: upload.headers,
+    timeout: 0,
+    onUploadProgress: (event) => {
+      if (onProgress && event.total) onProgress(event.loaded / event.total);
+    },
+  });
+  if (onProgress) onProgress(1);
+  return upload.upload_id;
+};
+
 export const getSubmissions = async (params = {}) => {
   const response = await api.get('/submissions', { params });
   return response.data;
@@ -4,6 +4,7 @@ import API_BASE from '../apiConfig';
 const ProjectDetailsModal = ({ submission, onClose }) => {
   const [currentImageIndex, setCurrentImageIndex] = useState(0);
   const [autoAdvance, setAutoAdvance] = useState(false);
+  const [manifest, setManifest] = useState(null);
   
   // Combine primary file with additional screenshots
   // Handle cases where additional_screenshots might be undefined or not an array
@@ -185,6 +186,33 @@ const ProjectDetailsModal = ({ submission, onClose }) => {
     if (!path) return '';
     return path.split(/[\/\\]/).pop();
   };
+
+  // List the project zip's contents from its manifest, without downloading it
+  const projectZip = otherFiles.find(file => getFilenameFromPath(file.path).toLowerCase().endsWith('.zip'));
+  const projectZipName = projectZip ? getFilenameFromPath(projectZip.path) : null;
+  useEffect(() => {
+    setManifest(null);
+    if (!projectZipName) return;
+    let cancelled = false;
+    fetch(`${API_BASE}/api/files/${encodeURIComponent(projectZipName)}/manifest`)
+      .then(response => (response.ok ? response.json() : null))
+      .then(data => { if (!cancelled) setManifest(data); })
+      .catch(() => {});
+    return () => { cancelled = true; };
+  }, [projectZipName]);
+
+  const formatBytes = (bytes) => {
+    if (bytes < 1024) return `${bytes} B`;
+    if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+    return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+  };
+
+  // Prefer a generated thumbnail of the given width when the backend has one
+  const getPreviewFilename = (path, size) => {
+    const filename = getFilenameFromPath(path);
+    const thumbnails = submission.thumbnails && submission.thumbnails[filename];
+    return (thumbnails && thumbnails[size]) || filename;
+  };
   
   return (
     <div className="fixed inset-0 bg-black bg-opacity-75 flex items-center justify-center z-50 p-4">
@@ -216,7 +244,7 @@ const ProjectDetailsModal = ({ submission, onClose }) => {
                     {getFileType(allFiles[currentImageIndex].path) === 'screenshot' ? (
                       <div className="bg-gray-100 rounded-lg overflow-auto max-h-[70vh] flex items-center justify-center relative">
                         <img 
-                          src={`${API_BASE}/uploads/${getFilenameFromPath(allFiles[currentImageIndex].path)}`} 
+                          src={`${API_BASE}/uploads/${getFilenameFromPath(allFiles[currentImageIndex].path)}?w=1280`} 
                           alt={`Screenshot ${currentImageIndex + 1}`}
                           className="max-w-full max-h-full object-contain"
                           onError={(e) => {
@@ -298,7 +326,7 @@ const ProjectDetailsModal = ({ submission, onClose }) => {
                         >
                           {getFileType(file.path) === 'screenshot' ? (
                             <img 
-                              src={`${API_BASE}/uploads/${getFilenameFromPath(file.path)}`} 
+                              src={`${API_BASE}/uploads/${getPreviewFilename(file.path, 160)}`} 
                               alt={`Thumbnail ${index + 1}`}
                               className="w-full h-full object-cover"
                               onError={(e) => {
@@ -432,6 +460,34 @@ const ProjectDetailsModal = ({ submission, onClose }) => {
                     ))}
                   </div>
                 </div>
+                
+                {/* Project Contents */}
+                {manifest && (
+                  <div>
+                    <h3 className="text-lg font-semibold text-gray-900 mb-3">Project Contents</h3>
+                    <p className="text-sm text-gray-500 mb-2">
+                      {manifest.member_count} files, {formatBytes(manifest.total_size)} ({formatBytes(manifest.compressed_size)} compressed)
+                    </p>
+                    <div className="bg-gray-50 rounded-lg p-3 max-h-64 overflow-y-auto">
+                      {manifest.entries.filter(entry => !entry.is_dir).map(entry => (
+                        <div key={entry.name} className="flex justify-between text-sm py-1">
+                          <a
+                            href={`${API_BASE}/uploads/${projectZipName}/${entry.name.split('/').map(encodeURIComponent).join('/')}`}
+                            target="_blank"
+                            rel="noopener noreferrer"
+                            className="text-blue-600 hover:underline truncate mr-4"
+                          >
+                            {entry.name}
+                          </a>
+                          <span className="text-gray-500 whitespace-nowrap">{formatBytes(entry.size)}</span>
+                        </div>
+                      ))}
+                      {manifest.truncated && (
+                        <p className="text-xs text-gray-400 mt-2">Showing the first {manifest.entries.length} entries</p>
+                      )}
+                    </div>
+                  </div>
+                )}
               </div>
             </div>
           </div>